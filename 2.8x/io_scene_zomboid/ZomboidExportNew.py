@@ -0,0 +1,1558 @@
+# Author: Jab (or 40BlocksUnder) | Joshua Edwards
+# Link for more info: http://theindiestone.com/forums/index.php/topic/12864-blender
+# Exports models to Zomboid format.
+
+import cProfile, io, json, math, os, re, weakref, bmesh, bpy
+import numpy as np
+from bpy_extras.io_utils import ExportHelper
+from bpy.props import StringProperty, BoolProperty, EnumProperty, IntProperty, FloatProperty
+from bpy.types import Operator
+from mathutils import Vector, Euler, Quaternion, Matrix
+
+from .shared import INDEX_EXTENSION, INDEX_VERSION, VERBOSITY_ITEMS, StageStats, OperatorCounter, bone_id_table, file_sha1, get_logger, profiling_requested, write_profile
+
+log = get_logger("zomboid.export")
+
+ANIMATION_ITEMS = (
+    ('NONE',   "None",          "Do not write animation clips"),
+    ('ACTIVE', "Active Action", "Write the armature's current action"),
+    ('ALL',    "All Actions",   "Write every action that animates pose bones"),
+)
+
+
+class ZomboidExport(Operator, ExportHelper):
+    bl_idname    = "zomboid.export_model"
+    bl_label     = "Export a Zomboid Model"
+    filename_ext = ".txt"
+    filter_glob: StringProperty(
+            default="*.txt",
+            options={'HIDDEN'},
+            )
+
+    optimize_vertex_cache: BoolProperty(
+            name="Optimize Vertex Cache",
+            description="Reorder triangles for the GPU vertex cache and vertices by first use (same model, different order).",
+            default=False,
+            )
+
+    weld_vertices: BoolProperty(
+            name="Weld Vertices",
+            description="Merge vertices whose position, normal and UV agree within the tolerances below and whose bone weights are equal.",
+            default=False,
+            )
+
+    weld_distance: FloatProperty(
+            name="Weld Distance",
+            description="Largest distance between welded positions.",
+            default=1e-4,
+            min=0.0,
+            precision=6,
+            )
+
+    weld_normal: FloatProperty(
+            name="Weld Normal Tolerance",
+            description="Largest difference between welded normals (length of their difference).",
+            default=0.01,
+            min=0.0,
+            precision=4,
+            )
+
+    weld_uv: FloatProperty(
+            name="Weld UV Tolerance",
+            description="Largest difference between welded UV coordinates.",
+            default=1e-4,
+            min=0.0,
+            precision=6,
+            )
+
+    strip_degenerate: BoolProperty(
+            name="Strip Degenerate Faces",
+            description="Drop triangles with repeated vertices or (almost) no area, and vertices no triangle uses.",
+            default=False,
+            )
+
+    degenerate_area: FloatProperty(
+            name="Minimum Face Area",
+            description="Triangles with a smaller area count as degenerate.",
+            default=1e-10,
+            min=0.0,
+            precision=10,
+            )
+
+    max_influences: IntProperty(
+            name="Max Bone Influences",
+            description="Keep at most this many of the heaviest bone weights per vertex.",
+            default=4,
+            min=1,
+            max=4,
+            )
+
+    min_weight: FloatProperty(
+            name="Min Bone Weight",
+            description="Drop bone weights below this value. Vertices that lose weights are renormalized.",
+            default=0.0,
+            min=0.0,
+            max=1.0,
+            )
+
+    drop_unused_bones: BoolProperty(
+            name="Drop Unused Bones",
+            description="Leave out bones that no vertex is weighted to and that have no such child (renumbers bone ids).",
+            default=False,
+            )
+
+    lod_count: IntProperty(
+            name="LOD Levels",
+            description="Also write this many reduced copies of the mesh as <name>_lod1.txt, <name>_lod2.txt, ...",
+            default=0,
+            min=0,
+            max=8,
+            )
+
+    lod_ratio: FloatProperty(
+            name="LOD Ratio",
+            description="Triangles each LOD level keeps of the level before it.",
+            default=0.5,
+            min=0.05,
+            max=0.95,
+            )
+
+    position_precision: IntProperty(
+            name="Position Decimals",
+            description="Decimals written for vertex positions (trailing zeros are left out).",
+            default=8,
+            min=1,
+            max=8,
+            )
+
+    normal_precision: IntProperty(
+            name="Normal Decimals",
+            description="Decimals written for normals and tangents.",
+            default=8,
+            min=1,
+            max=8,
+            )
+
+    uv_precision: IntProperty(
+            name="UV Decimals",
+            description="Decimals written for texture coordinates.",
+            default=8,
+            min=1,
+            max=8,
+            )
+
+    weight_precision: IntProperty(
+            name="Weight Decimals",
+            description="Decimals written for bone weights.",
+            default=8,
+            min=1,
+            max=8,
+            )
+
+    export_skeleton: BoolProperty(
+            name="Export Skeleton",
+            description="Write the bone hierarchy and matrices when the mesh is skinned to a Zomboid armature.",
+            default=True,
+            )
+
+    export_animations: EnumProperty(
+            name="Export Animations",
+            description="Which actions of the armature to write as animation clips (needs the skeleton).",
+            items=ANIMATION_ITEMS,
+            default='ACTIVE',
+            )
+
+    write_index: BoolProperty(
+            name="Write Index",
+            description="Write a .idx file next to the model with section offsets and counts, so imports can skip straight to what they need.",
+            default=False,
+            )
+
+    write_stats: BoolProperty(
+            name="Write Stage Report",
+            description="Write per-stage timings and element counters to a JSON file next to the model.",
+            default=False,
+            )
+
+    memory_profile: BoolProperty(
+            name="Profile Memory",
+            description="Trace memory per stage and check mesh data is released (also ZOMBOID_MEMORY_PROFILE=1).",
+            default=False,
+            options={'HIDDEN'},
+            )
+
+    verbosity: EnumProperty(
+            name="Log Level",
+            description="How much to print to the system console.",
+            items=VERBOSITY_ITEMS,
+            default='WARNING',
+            )
+
+    count_operators: BoolProperty(
+            name="Count Operators",
+            description="Count bpy.ops calls, depsgraph updates and undo pushes into the stage report (also ZOMBOID_COUNT_OPS=1).",
+            default=False,
+            options={'HIDDEN'},
+            )
+
+    cprofile: BoolProperty(
+            name="Profile",
+            description="Run the export under cProfile and save .pstats/.profile.txt next to the model (also ZOMBOID_PROFILE=1).",
+            default=False,
+            options={'HIDDEN'},
+            )
+
+    #use_setting = BoolProperty(
+    #        name="Example Boolean",
+    #        description="Example Tooltip",
+    #        default=True,
+    #        )
+
+    #type = EnumProperty(
+    #        name="Example Enum",
+    #        description="Choose between two items",
+    #        items=(('OPT_A', "First Option", "Description one"),
+    #               ('OPT_B', "Second Option", "Description two")),
+    #        default='OPT_A',
+    #        )
+    
+    
+    def prepare_mesh(self):
+        
+        self.object_original = self.object
+        # Grab the name of the selected object
+        self.mesh_name = self.object_original.name
+        
+        # Copy the object and its mesh to modify without affecting the actual
+        # model. The copy is never linked to the scene.
+        object = self.object = self.object_original.copy()
+        mesh   = self.mesh   = object.data = self.object_original.data.copy()
+        
+        # In order to be a valid format, the mesh needs to be
+        #    in triangulated.
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+        bmesh.ops.triangulate(bm, faces=bm.faces[:], quad_method='BEAUTY', ngon_method='BEAUTY')
+        bm.to_mesh(mesh)
+        bm.free()
+        
+        # Grab the count of vertices.
+        self.mesh_vertex_count = len(object.data.vertices)
+        
+        # Create a boolean for asking if the mesh has uv map data 
+        has_uv_mapping = self.mesh_has_uv_mapping = len(mesh.uv_layers) > 0
+        
+        # Assign UV Map data if it exists.
+        if has_uv_mapping:
+            self.vertex_stride_element_count += 1
+            #self.uv_texture = mesh.uv_textures.active.data[:]
+            self.uv_layer   = mesh.uv_layers.active.data[:]
+            
+        # Calculate face normals (Blender 4.1 and later keep them up to date).
+        if hasattr(mesh, "calc_normals_split"):
+            mesh.calc_normals_split()
+        
+        self.mesh_loops = mesh.loops
+        
+        for modifier in object.modifiers:
+            if modifier.type == 'ARMATURE':
+                if object.parent.type == 'ARMATURE':
+                    if object.parent['ZOMBOID_ARMATURE'] == 1:
+                        self.vertex_stride_element_count += 3
+                        self.armature = object.parent.data
+                        self.armature_object = object.parent
+                        self.mesh_has_bone_weights  = True
+                        self.mesh_has_tangent_array = True
+                        log.info("Armature modifier detected. Exporting with bone weights.")
+            
+        
+        
+        
+    def process_mesh(self):
+        
+        self.global_matrix = Matrix()
+        self.mesh_matrix   = self.object.matrix_world
+
+        object = self.object
+        mesh   = self.mesh
+        
+        mesh.update(calc_edges=True, calc_edges_loose=True)
+        
+        # Vertex attributes, one row per Blender vertex.
+        vertices = MeshBuffer(len(mesh.vertices))
+        vertices.positions = foreach_array(mesh.vertices, "co", 3)
+        vertices.normals   = foreach_array(mesh.vertices, "normal", 3)
+        if self.mesh_has_bone_weights:
+            vertices.weights, vertices.bone_ids, vertices.influences = weight_arrays(object, mesh, bone_id_table(object.parent))
+        
+        # Every face corner becomes a vertex of its own (the mesh is
+        # triangulated, so corners are 3 per polygon in loop order) ...
+        loop_starts    = foreach_array(mesh.polygons, "loop_start", 1, np.int32)
+        corner_loops   = (loop_starts[:, None] + np.arange(3)).ravel()
+        corner_verts   = foreach_array(mesh.loops, "vertex_index", 1, np.int32)[corner_loops]
+        corners        = vertices.take(corner_verts)
+        corners.triangles = np.arange(len(corner_loops)).reshape(-1, 3)
+        
+        # If UV mapping, then add this data (from the last UV map).
+        if self.mesh_has_uv_mapping:
+            corners.uvs = foreach_array(mesh.uv_layers[-1].data, "uv", 2)[corner_loops]
+            if self.mesh_has_tangent_array:
+                # MikkTSpace tangents of the same UV map, per face corner.
+                mesh.calc_tangents(uvmap=mesh.uv_layers[-1].name)
+                corners.tangents = foreach_array(mesh.loops, "tangent", 3)[corner_loops]
+        
+        # ... and corners with the same position and UV are merged again.
+        self.buffer = deduplicate(corners)
+        
+                    
+    def reorder_for_vertex_cache(self, buffer, prefix=''):
+        # Forsyth triangle order, then vertices renumbered by first use.
+        count     = buffer.vertex_count()
+        before    = cache_statistics(buffer.triangles.tolist(), count)
+        
+        order     = forsyth_triangle_order(buffer.triangles.tolist(), count)
+        triangles = buffer.triangles[order]
+        first_use = np.full(count, triangles.size)
+        np.minimum.at(first_use, triangles.ravel(), np.arange(triangles.size))
+        # Vertices no face uses keep their relative order at the end.
+        buffer    = buffer.reordered(np.argsort(first_use, kind='stable'), triangles)
+        
+        after = cache_statistics(buffer.triangles.tolist(), count)
+        self.stats.count(prefix + 'acmr_before', before[0])
+        self.stats.count(prefix + 'atvr_before', before[1])
+        self.stats.count(prefix + 'acmr_after', after[0])
+        self.stats.count(prefix + 'atvr_after', after[1])
+        log.info("Vertex cache: ACMR %.3f -> %.3f, ATVR %.3f -> %.3f", before[0], after[0], before[1], after[1])
+        return buffer
+    
+    def build_lod(self, buffer, level):
+        # Next level of the LOD chain: buffer collapsed to lod_ratio of its
+        # triangles, then merged and (optionally) cache ordered like LOD 0.
+        target = max(1, int(buffer.face_count() * self.lod_ratio))
+        with self.stats.stage('decimate'):
+            decimated = decimate(buffer, target)
+        with self.stats.stage('deduplicate'):
+            lod = deduplicate(decimated.corners())
+        if self.optimize_vertex_cache:
+            with self.stats.stage('optimize_vertex_cache'):
+                lod = self.reorder_for_vertex_cache(lod, 'lod%d_' % level)
+        
+        self.stats.count('lod%d_vertices' % level, lod.vertex_count())
+        self.stats.count('lod%d_faces' % level, lod.face_count())
+        if lod.face_count() > target:
+            log.warning("LOD %d stopped at %d faces (target %d): no more collapses keep the mesh valid.", level, lod.face_count(), target)
+        log.info("LOD %d: %d vertices, %d faces", level, lod.vertex_count(), lod.face_count())
+        return lod
+    
+    def prepare_skeleton(self):
+        # Bone hierarchy and matrices of the armature the mesh is skinned to,
+        # as (bones, 4, 4) arrays with rows in file order. Armatures made by
+        # ZomboidImport carry the original matrices; others derive them from
+        # the rest pose (bind pose as parent-relative rest, offsets as the
+        # inverted rest).
+        armature = self.armature_object
+        bone_ids = bone_id_table(armature)
+        count    = len(bone_ids)
+        names    = [None] * count
+        for bone_name, index in bone_ids.items():
+            if 0 <= index < count:
+                names[index] = bone_name
+        if count == 0 or None in names or any(armature.data.bones.get(bone_name) is None for bone_name in names):
+            log.warning("Bone ids of %s do not cover 0..%d, skipping the skeleton.", armature.name, count - 1)
+            return False
+        
+        bones   = [armature.data.bones[bone_name] for bone_name in names]
+        parents = [-1] * count
+        for index in range(1, count):
+            parent = bones[index].parent
+            parents[index] = bone_ids.get(parent.name, 0) if parent else 0
+        
+        rest = np.array([np.array(bone.matrix_local) for bone in bones])
+        bind, offsets = cached_matrices(armature, "ZOMBOID_BIND_POSE", count), cached_matrices(armature, "ZOMBOID_SKIN_OFFSETS", count)
+        if bind is None or offsets is None:
+            rest_inverse = np.linalg.inv(rest)
+            parent_rest_inverse = rest_inverse[np.maximum(parents, 0)]
+            parent_rest_inverse[0] = np.identity(4)
+            bind    = parent_rest_inverse @ rest
+            offsets = rest_inverse
+        
+        inverses = np.linalg.inv(np.stack((bind, offsets, rest)))
+        self.bone_names            = names
+        self.bone_parents          = parents
+        self.bind_matrices         = bind
+        self.inverse_bind_matrices = inverses[0]
+        self.offset_matrices       = offsets
+        # Blender pose (armature space) -> skeleton world pose.
+        self.pose_to_world         = inverses[2] @ inverses[1]
+        self.pose_bone_ids         = np.array([bone_ids.get(pose_bone.name, -1) for pose_bone in armature.pose.bones])
+        return True
+    
+    def prune_skeleton(self):
+        # Keeps the root, the bones vertices are weighted to and their
+        # ancestors, renumbered in file order; bone ids in the buffer follow.
+        buffer = self.buffer
+        count  = len(self.bone_names)
+        used   = np.arange(buffer.weights.shape[1]) < buffer.influences[:, None]
+        keep   = np.zeros(count, dtype=bool)
+        keep[0] = True
+        keep[buffer.bone_ids[used]] = True
+        parents = np.array(self.bone_parents)
+        while True:
+            missing = parents[keep]
+            missing = missing[(missing >= 0) & ~keep[np.maximum(missing, 0)]]
+            if len(missing) == 0:
+                break
+            keep[missing] = True
+        
+        remap = np.full(count, -1, dtype=np.int64)
+        remap[keep] = np.arange(np.count_nonzero(keep))
+        self.bone_names            = [name for name, kept in zip(self.bone_names, keep) if kept]
+        self.bone_parents          = [int(remap[parent]) if parent >= 0 else parent for parent, kept in zip(self.bone_parents, keep) if kept]
+        self.bind_matrices         = self.bind_matrices[keep]
+        self.inverse_bind_matrices = self.inverse_bind_matrices[keep]
+        self.offset_matrices       = self.offset_matrices[keep]
+        self.pose_to_world         = self.pose_to_world[keep]
+        self.pose_bone_ids         = np.where(self.pose_bone_ids >= 0, remap[self.pose_bone_ids], -1)
+        buffer.bone_ids            = np.where(used, remap[buffer.bone_ids], 0)
+        self.stats.count('bones_dropped', count - len(self.bone_names))
+        log.info("Dropped %d unused bones.", count - len(self.bone_names))
+    
+    def sample_animations(self, context):
+        # Evaluates each chosen action once per frame for all bones and returns
+        # (name, duration, times, locations, rotations) per clip.
+        armature = self.armature_object
+        if self.export_animations == 'ACTIVE':
+            action  = armature.animation_data.action if armature.animation_data else None
+            actions = [action] if action else []
+        else:
+            actions = sorted((action for action in bpy.data.actions if animates_pose_bones(action)), key=lambda action: action.name)
+        if not actions:
+            return []
+        
+        scene      = context.scene
+        fps        = scene.render.fps / scene.render.fps_base
+        pose_bones = armature.pose.bones
+        ids        = self.pose_bone_ids
+        known      = ids >= 0
+        buffer     = np.empty(len(pose_bones) * 16, dtype=np.float32)
+        created    = armature.animation_data is None
+        if created:
+            armature.animation_data_create()
+        old_action = armature.animation_data.action
+        old_frame  = scene.frame_current
+        
+        clips = []
+        try:
+            for action in actions:
+                armature.animation_data.action = action
+                start, end = (int(round(frame)) for frame in action.frame_range)
+                frames     = range(start, end + 1)
+                poses      = np.tile(np.identity(4), (len(frames), len(self.bone_names), 1, 1))
+                for frame_index, frame in enumerate(frames):
+                    scene.frame_set(frame)
+                    # Matrices come out column-major.
+                    pose_bones.foreach_get("matrix", buffer)
+                    poses[frame_index, ids[known]] = buffer.reshape(-1, 4, 4).transpose(0, 2, 1)[known]
+                locs, rots = self.local_poses(poses)
+                times      = [(frame - start) / fps for frame in frames]
+                duration   = (end - start) / fps
+                # Clips made by ZomboidImport keep the file's timing.
+                stored     = action.get("ZOMBOID_FRAME_TIMES")
+                if stored is not None and len(stored) == len(frames):
+                    times    = list(stored)
+                    duration = action.get("ZOMBOID_DURATION", duration)
+                clips.append((action.name, duration, times, locs, rots))
+        finally:
+            armature.animation_data.action = old_action
+            # Leave an armature without animation data the way it was found.
+            if created:
+                armature.animation_data_clear()
+            scene.frame_set(old_frame)
+        return clips
+    
+    def local_poses(self, poses):
+        # (frames, bones, 4, 4) armature space poses -> parent-relative
+        # locations (frames, bones, 3) and x, y, z, w rotations (frames, bones, 4),
+        # the inverse of what ZomboidImport does with the keyframes.
+        world   = poses @ self.pose_to_world
+        parents = np.array(self.bone_parents)
+        local   = np.linalg.inv(world)[:, np.maximum(parents, 0)] @ world
+        local[:, parents < 0] = world[:, parents < 0]
+        rots    = matrix_quaternion_array(local[..., :3, :3])
+        return local[..., :3, 3], rots[..., [1, 2, 3, 0]]
+    
+    def write_header(self, file):
+        write_comment(file, "Project Zomboid Skinned Mesh")
+        
+        write_comment(file, "File Version:")
+        write_line(file, 1.0)
+        
+        write_comment(file, "Model Name:")
+        write_line(file, self.mesh_name)
+        
+        # The stride belongs to the header, as in ZomboidImport.read_header.
+        write_comment(file, "Vertex Stride Element Count:")
+        write_line(file, self.vertex_stride_element_count)
+        
+        # This seems to be 76 in all files.
+        write_comment(file, "Vertex Stride Size (in bytes):")
+        write_line(file, 76)
+        
+        write_comment(file, "Vertex Stride Data:")
+        write_comment(file, "(Int)    Offset"    )
+        write_comment(file, "(String) Type"      )
+        
+        offset = 0
+        if self.mesh_has_vertex_array:
+            write_line(file, offset                          )
+            write_line(file, self.vertex_array_name          )
+            offset += self.offset_vertex_array
+        if self.mesh_has_normal_array:
+            write_line(file, offset                          )
+            write_line(file, self.normal_array_name          )
+            offset += self.offset_normal_array
+        if self.mesh_has_tangent_array:
+            write_line(file, offset                          )
+            write_line(file, self.tangent_array_name         )
+            offset += self.offset_tangent_array
+        if self.mesh_has_uv_mapping:
+            write_line(file, offset                          )
+            write_line(file, self.texture_coord_array_name   )
+            offset += self.offset_texture_coord_array
+        if self.mesh_has_bone_weights:
+            write_line(file, offset  )
+            write_line(file, self.blend_weight_array_name    )
+            offset += self.offset_blend_weight_array
+            write_line(file, offset )
+            write_line(file, self.blend_index_array_name     )
+            offset += self.offset_blend_index_array
+        
+        del offset
+        
+    def write_vertex_buffer(self, file, buffer):
+        
+        write_comment(file, "Vertex Count:")
+        write_line(file, buffer.vertex_count())
+        
+        write_comment(file, "Vertex Buffer:")
+        columns = []
+        for array, decimals in self.vertex_columns(buffer):
+            columns.append(format_rows(array, decimals))
+        if self.mesh_has_bone_weights:
+            # At least 4 influences, more if a vertex has them.
+            widths = np.maximum(buffer.influences, 4).tolist()
+            columns.append(format_row_lists([row[:width] for row, width in zip(buffer.weights.tolist(), widths)], self.weight_precision))
+            columns.append([", ".join([str(index) for index in row[:width]]) for row, width in zip(buffer.bone_ids.tolist(), widths)])
+        write_rows(file, [line for vertex in zip(*columns) for line in vertex])
+        
+    def vertex_columns(self, buffer):
+        # (array, decimals) of each float element of the stride, in order.
+        columns = []
+        if self.mesh_has_vertex_array:
+            columns.append((buffer.positions, self.position_precision))
+        if self.mesh_has_normal_array:
+            columns.append((buffer.normals, self.normal_precision))
+        if self.mesh_has_tangent_array:
+            columns.append((buffer.tangents, self.normal_precision))
+        if self.mesh_has_uv_mapping:
+            columns.append((np.column_stack((buffer.uvs[:, 0], 1.0 - buffer.uvs[:, 1])), self.uv_precision))
+        return columns
+    
+    def count_precision(self, buffer, filepath, prefix=''):
+        # File size and the largest rounding error of each element written.
+        names = [name for name, has in (('position', self.mesh_has_vertex_array), ('normal', self.mesh_has_normal_array),
+                                         ('tangent', self.mesh_has_tangent_array), ('uv', self.mesh_has_uv_mapping)) if has]
+        columns = self.vertex_columns(buffer)
+        if self.mesh_has_bone_weights:
+            used = np.arange(buffer.weights.shape[1]) < buffer.influences[:, None]
+            names.append('weight')
+            columns.append((buffer.weights[used], self.weight_precision))
+        for name, (array, decimals) in zip(names, columns):
+            self.stats.count(prefix + name + '_max_error', rounding_error(array, decimals))
+        self.stats.count(prefix + 'file_bytes', os.path.getsize(filepath))
+    
+    def write_faces(self, file, buffer):
+        
+        write_comment(file, "Number of Faces:")
+        write_line(file, buffer.face_count())
+        
+        write_comment(file, "Face Data:")
+        write_rows(file, ["%d, %d, %d" % tuple(triangle) for triangle in buffer.triangles.tolist()])
+    
+    def write_skeleton(self, file):
+        count = len(self.bone_names)
+        write_comment(file, "Number of Bones:")
+        write_line(file, count)
+        
+        write_comment(file, "Skeleton Hierarchy:")
+        write_rows(file, ["%d\n%d\n%s" % (index, self.bone_parents[index], self.bone_names[index]) for index in range(0, count)])
+        
+        write_comment(file, "Bind Pose:")
+        write_matrices(file, self.bind_matrices)
+        write_comment(file, "Inv Bind Pose:")
+        write_matrices(file, self.inverse_bind_matrices)
+        write_comment(file, "Skin Offset Matrices:")
+        write_matrices(file, self.offset_matrices)
+    
+    def write_animations(self, file, clips):
+        write_comment(file, "Number of Animations:")
+        write_line(file, len(clips))
+        
+        for name, duration, times, locs, rots in clips:
+            write_comment(file, "Animation Name:")
+            write_line(file, name)
+            write_comment(file, "Animation Duration:")
+            write_line(file, format_rows(np.array([[duration]]))[0])
+            write_comment(file, "Keyframe Count:")
+            write_line(file, len(times) * len(self.bone_names))
+            
+            count     = len(self.bone_names)
+            time_rows = format_rows(np.array(times, dtype=np.float64).reshape(-1, 1))
+            loc_rows  = format_rows(locs.reshape(-1, 3))
+            rot_rows  = format_rows(rots.reshape(-1, 4))
+            rows = []
+            for frame_index, time in enumerate(time_rows):
+                for index, bone_name in enumerate(self.bone_names):
+                    rows.append(str(index))
+                    rows.append(bone_name)
+                    rows.append(time)
+                    rows.append(loc_rows[frame_index * count + index])
+                    rows.append(rot_rows[frame_index * count + index])
+            write_rows(file, rows)
+    
+    def write_model(self, filepath, buffer, has_skeleton, clips):
+        sections = dict() # KEY: SECTION NAME, VALUE: BYTE OFFSET
+        with io.open(filepath, 'w') as file:
+            sections['header'] = file.tell()
+            with self.stats.stage('write_header'):
+                self.write_header(file)
+            sections['vertex_buffer'] = file.tell()
+            with self.stats.stage('write_vertex_buffer'):
+                self.write_vertex_buffer(file, buffer)
+            sections['faces'] = file.tell()
+            with self.stats.stage('write_faces'):
+                self.write_faces(file, buffer)
+            if has_skeleton:
+                sections['skeleton'] = file.tell()
+                with self.stats.stage('write_skeleton'):
+                    self.write_skeleton(file)
+                sections['animations'] = file.tell()
+                with self.stats.stage('write_animations'):
+                    self.write_animations(file, clips)
+        if self.write_index:
+            with self.stats.stage('write_index'):
+                self.write_model_index(filepath, buffer, sections, has_skeleton, clips)
+    
+    def stride_names(self):
+        names = [name for name, has in ((self.vertex_array_name,        self.mesh_has_vertex_array),
+                                        (self.normal_array_name,        self.mesh_has_normal_array),
+                                        (self.tangent_array_name,       self.mesh_has_tangent_array),
+                                        (self.texture_coord_array_name, self.mesh_has_uv_mapping)) if has]
+        if self.mesh_has_bone_weights:
+            names += [self.blend_weight_array_name, self.blend_index_array_name]
+        return names
+    
+    def write_model_index(self, filepath, buffer, sections, has_skeleton, clips):
+        # The .idx sidecar ZomboidImport uses to seek to sections. It is only
+        # trusted while the model's size and mtime (or else SHA-1) still match.
+        stat  = os.stat(filepath)
+        index = {
+            "version"    : INDEX_VERSION,
+            "model"      : os.path.basename(filepath),
+            "name"       : self.mesh_name,
+            "size"       : stat.st_size,
+            "mtime_ns"   : stat.st_mtime_ns,
+            "sha1"       : file_sha1(filepath),
+            "stride"     : self.stride_names(),
+            "sections"   : sections,
+            "counts"     : {
+                "vertices"   : buffer.vertex_count(),
+                "faces"      : buffer.face_count(),
+                "bones"      : len(self.bone_names) if has_skeleton else 0,
+                "animations" : len(clips) if has_skeleton else 0,
+            },
+            "bones"      : list(self.bone_names) if has_skeleton else [],
+            "influences" : np.bincount(buffer.influences).tolist() if self.mesh_has_bone_weights else [],
+            "clips"      : [{"name": name, "duration": duration, "keyframes": len(times) * len(self.bone_names)}
+                             for name, duration, times, locs, rots in clips] if has_skeleton else [],
+        }
+        with io.open(filepath + INDEX_EXTENSION, 'w') as file:
+            json.dump(index, file, indent=1)
+    
+    def execute(self, context):
+        log.setLevel(self.verbosity)
+        trace_memory = profiling_requested(self.memory_profile, "ZOMBOID_MEMORY_PROFILE")
+        self.stats   = StageStats(self.bl_idname, trace_memory=trace_memory)
+        profiler     = None
+        if profiling_requested(self.cprofile, "ZOMBOID_PROFILE"):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        counter      = None
+        if profiling_requested(self.count_operators, "ZOMBOID_COUNT_OPS"):
+            counter = OperatorCounter(self.stats)
+            counter.start()
+        try:
+            result = self.export_model(context)
+            self.release_mesh_data()
+        finally:
+            if counter:
+                counter.stop()
+            if profiler:
+                profiler.disable()
+            self.stats.finish()
+        
+        if profiler:
+            write_profile(profiler, self.filepath, self.stats)
+        
+        if self.write_stats or trace_memory or counter:
+            self.stats.write_json(self.filepath + ".stats.json")
+        self.report({'INFO'}, self.stats.summary())
+        
+        return result
+    
+    def release_mesh_data(self):
+        # The mesh buffer is only needed while writing; the operator
+        # instance outlives execute, so drop it explicitly.
+        reference   = weakref.ref(self.buffer) if self.buffer is not None else None
+        self.buffer = None
+        if self.stats.trace_memory and reference is not None:
+            self.stats.check_released('buffer', reference)
+    
+    def export_model(self, context):
+        
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode = 'OBJECT')
+        
+        object = self.object = context.active_object
+        
+        # Checks to see if selection is avaliable AND a Mesh.
+        if object == None:
+            log.warning("No mesh selected.")
+            return {'FINISHED'}
+        if object.type != 'MESH':
+            log.warning("Object selected is not a mesh: %s", object.type)
+            return {'FINISHED'}
+        
+        
+        try:
+            with self.stats.stage('prepare_mesh'):
+                self.prepare_mesh()
+            
+            with self.stats.stage('process_mesh'):
+                self.process_mesh()
+            
+            if self.weld_vertices:
+                with self.stats.stage('weld_vertices'):
+                    self.buffer, vertices_saved, faces_removed = weld_vertices(self.buffer, self.weld_distance, self.weld_normal, self.weld_uv)
+                self.stats.count('welded_vertices_saved', vertices_saved)
+                self.stats.count('welded_faces_removed', faces_removed)
+                log.info("Welding saved %d vertices (%d faces collapsed).", vertices_saved, faces_removed)
+            
+            if self.strip_degenerate:
+                with self.stats.stage('strip_degenerate'):
+                    self.buffer, faces_removed, vertices_removed = strip_degenerate(self.buffer, self.degenerate_area)
+                self.stats.count('degenerate_faces_removed', faces_removed)
+                self.stats.count('unused_vertices_removed', vertices_removed)
+                log.info("Removed %d degenerate faces and %d unused vertices.", faces_removed, vertices_removed)
+            
+            if self.mesh_has_bone_weights:
+                with self.stats.stage('limit_influences'):
+                    self.buffer, pruned = limit_influences(self.buffer, self.max_influences, self.min_weight)
+                self.stats.count('weights_pruned_vertices', pruned)
+                histogram = np.bincount(self.buffer.influences, minlength=self.max_influences + 1)
+                for influences, vertices in enumerate(histogram.tolist()):
+                    self.stats.count('influences_%d' % influences, vertices)
+            
+            self.stats.count('vertices', self.buffer.vertex_count())
+            self.stats.count('faces', self.buffer.face_count())
+            if self.armature is not None:
+                self.stats.count('bones', len(self.armature.bones))
+            
+            if self.optimize_vertex_cache:
+                with self.stats.stage('optimize_vertex_cache'):
+                    self.buffer = self.reorder_for_vertex_cache(self.buffer)
+            
+            has_skeleton = False
+            clips        = []
+            if self.mesh_has_bone_weights and self.export_skeleton:
+                with self.stats.stage('prepare_skeleton'):
+                    has_skeleton = self.prepare_skeleton()
+                if has_skeleton and self.drop_unused_bones:
+                    with self.stats.stage('prune_skeleton'):
+                        self.prune_skeleton()
+                if has_skeleton and self.export_animations != 'NONE':
+                    with self.stats.stage('sample_animations'):
+                        clips = self.sample_animations(context)
+                    self.stats.count('animations', len(clips))
+                    self.stats.count('keyframes', sum(len(clip[2]) for clip in clips) * len(self.bone_names))
+            
+            with self.stats.stage('write'):
+                self.write_model(self.filepath, self.buffer, has_skeleton, clips)
+            self.count_precision(self.buffer, self.filepath)
+            
+            # LOD chain: each level reduces the one before it and is written
+            # next to the model with the same skeleton and clips.
+            buffer = self.buffer
+            for level in range(1, self.lod_count + 1):
+                with self.stats.stage('lod%d' % level):
+                    buffer = self.build_lod(buffer, level)
+                    with self.stats.stage('write'):
+                        self.write_model(lod_filepath(self.filepath, level), buffer, has_skeleton, clips)
+                self.stats.count('lod%d_file_bytes' % level, os.path.getsize(lod_filepath(self.filepath, level)))
+        finally:
+            # Remove the working copy, if one was made.
+            original = self.object_original
+            if original is not None:
+                if self.object != original:
+                    bpy.data.objects.remove(self.object)
+                if self.mesh is not None and self.mesh != original.data:
+                    bpy.data.meshes.remove(self.mesh)
+                self.object = original
+                self.mesh   = original.data
+        
+        # Reset the object selection.
+        self.object_original.select_set(True)
+        context.view_layer.objects.active = self.object_original
+        self.object_original = True
+        
+        return {'FINISHED'}
+
+    def __init__(self):
+        self.buffer                             = None
+        
+        self.global_matrix                      = None
+        self.stats                              = None
+        
+        self.object_original                    = None
+        self.object                             = None
+        self.armature                           = None
+        self.armature_object                    = None
+        
+        self.bone_names                         = []
+        self.bone_parents                       = []
+        self.bind_matrices                      = None
+        self.inverse_bind_matrices              = None
+        self.offset_matrices                    = None
+        self.pose_to_world                      = None
+        self.pose_bone_ids                      = None
+        self.mesh                               = None
+        self.mesh_name                          = "Untitled_Mesh"
+        self.mesh_matrix                        = None
+        self.mesh_loops                         = None
+        
+        self.vertex_array_name                  = 'VertexArray'
+        self.normal_array_name                  = 'NormalArray'
+        self.tangent_array_name                 = 'TangentArray'
+        self.texture_coord_array_name           = 'TextureCoordArray'
+        self.blend_weight_array_name            = 'BlendWeightArray'
+        self.blend_index_array_name             = 'BlendIndexArray'
+        
+        self.mesh_vertex_count                  = 0
+        
+        self.offset_vertex_array                = 12
+        self.offset_normal_array                = 12
+        self.offset_tangent_array               = 12
+        self.offset_texture_coord_array         = 8
+        self.offset_blend_weight_array          = 16
+        self.offset_blend_index_array           = 0
+        
+        self.vertex_stride_element_count        = 2
+        self.mesh_has_vertex_array              = True
+        self.mesh_has_normal_array              = True
+        self.mesh_has_tangent_array             = False
+        self.mesh_has_uv_mapping                = False
+        self.mesh_has_bone_weights              = False
+
+
+class MeshBuffer:
+    """
+    Export vertices as parallel arrays, one row per vertex, plus the
+    (faces, 3) index buffer. weights and bone_ids have at least 4 slots per
+    vertex, padded with -1.0 and 0; influences counts the used slots.
+    """
+    
+    ATTRIBUTES = ('positions', 'normals', 'tangents', 'uvs', 'weights', 'bone_ids', 'influences')
+    
+    def __init__(self, count=0):
+        self.positions                          = np.zeros((count, 3))
+        self.normals                            = np.zeros((count, 3))
+        self.tangents                           = np.zeros((count, 3))
+        self.uvs                                = np.zeros((count, 2))
+        self.weights                            = np.full((count, 4), -1.0)
+        self.bone_ids                           = np.zeros((count, 4), dtype=np.int64)
+        self.influences                         = np.zeros(count, dtype=np.int64)
+        self.triangles                          = np.zeros((0, 3), dtype=np.int64)
+    
+    def vertex_count(self):
+        return len(self.positions)
+    
+    def face_count(self):
+        return len(self.triangles)
+    
+    def take(self, indices):
+        # The vertices at indices, without faces.
+        buffer = MeshBuffer()
+        for name in self.ATTRIBUTES:
+            setattr(buffer, name, getattr(self, name)[indices])
+        return buffer
+    
+    def corners(self):
+        # One vertex per face corner, as deduplicate() expects.
+        corners = self.take(self.triangles.ravel())
+        corners.triangles = np.arange(self.triangles.size).reshape(-1, 3)
+        return corners
+    
+    def reordered(self, vertex_order, triangles):
+        # Keeps the vertices in vertex_order, renumbered by their position
+        # in it; triangles may only use kept vertices.
+        buffer = self.take(vertex_order)
+        remap  = np.full(self.vertex_count(), -1, dtype=np.int64)
+        remap[vertex_order] = np.arange(len(vertex_order))
+        buffer.triangles = remap[triangles]
+        return buffer
+
+
+def menu_func_export(self, context):
+    self.layout.operator(ZomboidExport.bl_idname, text="Export Project Zomboid (.txt)")
+
+classes = (
+    ZomboidExport,
+)
+
+def register():
+    #bpy.utils.register_class(ZomboidExport)
+    #bpy.types.INFO_MT_file_export.append(menu_func_export)
+    for c in classes:
+        bpy.utils.register_class(c)
+    bpy.types.TOPBAR_MT_file_export.append(menu_func_export)
+def unregister():
+    #bpy.utils.unregister_class(ZomboidExport)
+    #bpy.types.INFO_MT_file_export.remove(menu_func_export)
+    for c in reversed(classes):
+        bpy.utils.unregister_class(c)
+    bpy.types.TOPBAR_MT_file_export.remove(menu_func_export)
+
+
+#####################################################################################
+###                                                                               ###
+###   File I/O methods                                                            ###
+###                                                                               ###
+#####################################################################################         
+
+
+# Writes a line to the file.
+def write_line(file, line, new_line=True):
+    
+    # Converts any arbitrary primitives into a String just in-case.
+    finished_line = str(line)
+    
+    # If new_line is true, add a newline marker at the end.
+    if new_line:
+        finished_line = finished_line + "\n"
+    
+    # Write the line to a file.
+    file.write(finished_line)
+    
+def write(file, line):
+    write_line(file, line, new_line=False)
+    
+    
+# Writes a comment to the file.
+def write_comment(file, comment):
+    
+    final_comment = "# " + str(comment)
+    
+    write_line(file, final_comment)
+    
+    
+def write_array(file, array):
+    string = ""
+    
+    for element in array:
+        string += str(element) + ", "
+    
+    write_line(file, string[:-2])
+   
+    
+# Bulk formatter: writes a list of already formatted lines in one call.
+def write_rows(file, rows):
+    if rows:
+        file.write("\n".join(rows) + "\n")
+
+
+# Trailing zeros of fixed-point numbers in comma separated rows, then the
+# '.' of numbers that had only zeros after it.
+TRAILING_ZEROS = re.compile(r"0+(?=[,\n])")
+TRAILING_POINT = re.compile(r"\.(?=[,\n])")
+
+
+def shorten_decimals(rows):
+    text = TRAILING_POINT.sub("", TRAILING_ZEROS.sub("", "\n".join(rows) + "\n"))
+    return text.replace("-0,", "0,").replace("-0\n", "0\n")[:-1].split("\n")
+
+
+# Formats (rows, columns) floats with a fixed number of decimals, then drops
+# what carries no information: 1.50000000 -> 1.5, 2.00000000 -> 2, -0.0 -> 0.
+def format_rows(array, decimals=8):
+    if len(array) == 0:
+        return []
+    row_format = ", ".join(["%%.%df" % decimals] * array.shape[1])
+    return shorten_decimals([row_format % tuple(row) for row in array.tolist()])
+
+
+def format_row_lists(rows, decimals=8):
+    # Like format_rows, for rows of different lengths.
+    if not rows:
+        return []
+    value_format = "%%.%df" % decimals
+    return shorten_decimals([", ".join([value_format % value for value in row]) for row in rows])
+
+
+def rounding_error(array, decimals):
+    # Largest difference between the values and what is read back.
+    if np.size(array) == 0:
+        return 0.0
+    return float(np.max(np.abs(np.round(array, decimals) - array)))
+
+
+# Writes (count, 4, 4) matrices as bone index + 4 rows each.
+def write_matrices(file, matrices):
+    matrix_rows = format_rows(matrices.reshape(-1, 4))
+    rows = []
+    for index in range(0, len(matrices)):
+        rows.append(str(index))
+        rows.extend(matrix_rows[index * 4:index * 4 + 4])
+    write_rows(file, rows)
+    
+#####################################################################################
+###                                                                               ###
+###   Helper Methods                                                              ###
+###                                                                               ###
+##################################################################################### 
+
+
+def weight_arrays(object, mesh, bone_ids):
+    """
+    Bone weights, bone ids and influence counts per vertex from its vertex
+    groups: every weight above zero, in group order, padded to 4 slots with
+    -1.0 and 0. Groups that are not bones of the armature are skipped.
+    """
+    group_bone_ids = [bone_ids.get(group.name) for group in object.vertex_groups]
+    skipped        = [group.name for group, bone_id in zip(object.vertex_groups, group_bone_ids) if bone_id is None]
+    if skipped:
+        log.warning("Vertex groups without a bone are not exported: %s", ", ".join(skipped))
+    
+    rows = []
+    for vertex in mesh.vertices:
+        # possible weights are out of range
+        row = [(g.group, g.weight) for g in vertex.groups
+               if g.weight > 0.0 and g.group < len(group_bone_ids) and group_bone_ids[g.group] is not None]
+        row.sort()
+        rows.append(row)
+    
+    width      = max([4] + [len(row) for row in rows])
+    weights    = np.full((len(rows), width), -1.0)
+    bone_ids   = np.zeros((len(rows), width), dtype=np.int64)
+    influences = np.zeros(len(rows), dtype=np.int64)
+    for index, row in enumerate(rows):
+        influences[index] = len(row)
+        for slot, (group, weight) in enumerate(row):
+            weights[index, slot]  = weight
+            bone_ids[index, slot] = group_bone_ids[group]
+    return weights, bone_ids, influences
+
+
+def foreach_array(collection, attribute, width, dtype=np.float32):
+    # One foreach_get call; (len, width) array, flat for width 1. Blender
+    # stores floats as float32, they are widened so they print as before.
+    values = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attribute, values)
+    values = values.astype(np.float64 if values.dtype.kind == 'f' else np.int64)
+    return values if width == 1 else values.reshape(-1, width)
+
+
+def deduplicate(corners):
+    """
+    Merges face corners into export vertices. Corners whose position and UV
+    agree to 4 decimals (what the str(Vector) key used to compare) share a
+    vertex, vertices are numbered in first-seen order and the first corner's
+    normal and weights win.
+    """
+    keys = np.rint(np.column_stack((corners.positions, corners.uvs)) * 10000.0).astype(np.int64)
+    keys = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+    unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    
+    order = np.argsort(first)
+    rank  = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    
+    buffer = corners.take(first[order])
+    buffer.triangles = rank[inverse.ravel()][corners.triangles]
+    return buffer
+
+
+# Half of the 27 neighbouring grid cells (plus the cell itself): every pair
+# of adjacent cells is visited once.
+HALF_NEIGHBOURHOOD = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1) if (x, y, z) >= (0, 0, 0)]
+
+
+def spatial_hash(cells):
+    # (n, 3) integer grid cells -> int64 keys. Collisions only add candidate
+    # pairs, which the tolerance tests then reject.
+    return (cells[:, 0] * 73856093) ^ (cells[:, 1] * 19349663) ^ (cells[:, 2] * 83492791)
+
+
+def weld_vertices(buffer, distance, normal_epsilon, uv_epsilon):
+    """
+    Merges vertices whose positions lie within distance, normals within
+    normal_epsilon and UVs within uv_epsilon of each other, and whose bone
+    weights and ids are equal. Candidates come from a spatial hash grid with
+    cells of size distance, so only neighbouring cells are compared. Merging
+    is transitive; each group keeps its first vertex. Faces that collapse
+    onto a repeated vertex are dropped. Returns (buffer, vertices saved,
+    faces removed).
+    """
+    count = buffer.vertex_count()
+    if count == 0:
+        return buffer, 0, 0
+    cells  = np.floor(buffer.positions / max(distance, 1e-12)).astype(np.int64)
+    keys, cell_of = np.unique(spatial_hash(cells), return_inverse=True)
+    cell_of = cell_of.ravel()
+    order   = np.argsort(cell_of, kind='stable')
+    starts  = np.searchsorted(cell_of[order], np.arange(len(keys) + 1))
+    
+    firsts  = []
+    seconds = []
+    for offset in HALF_NEIGHBOURHOOD:
+        neighbour = spatial_hash(cells + offset)
+        cell      = np.minimum(np.searchsorted(keys, neighbour), len(keys) - 1)
+        vertices  = np.flatnonzero(keys[cell] == neighbour)
+        cell      = cell[vertices]
+        sizes     = starts[cell + 1] - starts[cell]
+        ends      = np.cumsum(sizes)
+        first     = np.repeat(vertices, sizes)
+        second    = order[np.repeat(starts[cell], sizes) + np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - sizes, sizes)]
+        pair      = first < second if offset == (0, 0, 0) else first != second
+        firsts.append(first[pair])
+        seconds.append(second[pair])
+    a = np.concatenate(firsts)
+    b = np.concatenate(seconds)
+    
+    close = ((np.linalg.norm(buffer.positions[a] - buffer.positions[b], axis=1) <= distance)
+           & (np.linalg.norm(buffer.normals[a] - buffer.normals[b], axis=1) <= normal_epsilon)
+           & (np.abs(buffer.uvs[a] - buffer.uvs[b]).max(axis=1) <= uv_epsilon)
+           & (buffer.influences[a] == buffer.influences[b])
+           & np.all(buffer.weights[a] == buffer.weights[b], axis=1)
+           & np.all(buffer.bone_ids[a] == buffer.bone_ids[b], axis=1))
+    a = a[close]
+    b = b[close]
+    
+    # Connected components by propagating the smallest vertex id.
+    labels = np.arange(count)
+    while True:
+        merged = labels.copy()
+        np.minimum.at(merged, a, labels[b])
+        np.minimum.at(merged, b, labels[a])
+        merged = merged[merged]
+        if np.array_equal(merged, labels):
+            break
+        labels = merged
+    
+    kept      = np.unique(labels)
+    triangles = np.searchsorted(kept, labels)[buffer.triangles]
+    collapsed = (triangles[:, 0] == triangles[:, 1]) | (triangles[:, 1] == triangles[:, 2]) | (triangles[:, 2] == triangles[:, 0])
+    welded    = buffer.take(kept)
+    welded.triangles = triangles[~collapsed]
+    return welded, count - len(kept), int(np.count_nonzero(collapsed))
+
+
+def strip_degenerate(buffer, area_epsilon):
+    # Drops triangles with a repeated index or an area up to area_epsilon,
+    # then vertices no triangle uses. Returns (buffer, faces removed,
+    # vertices removed); kept vertices and faces stay in order.
+    triangles = buffer.triangles
+    corners   = buffer.positions[triangles]
+    area      = 0.5 * np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1)
+    repeated  = (triangles[:, 0] == triangles[:, 1]) | (triangles[:, 1] == triangles[:, 2]) | (triangles[:, 2] == triangles[:, 0])
+    keep      = ~repeated & (area > area_epsilon)
+    
+    used = np.zeros(buffer.vertex_count(), dtype=bool)
+    used[triangles[keep].ravel()] = True
+    kept = np.flatnonzero(used)
+    return buffer.reordered(kept, triangles[keep]), int(np.count_nonzero(~keep)), buffer.vertex_count() - len(kept)
+
+
+def limit_influences(buffer, max_influences, min_weight):
+    """
+    Keeps the max_influences heaviest bone weights of each vertex that are
+    at least min_weight (always at least the heaviest one). Vertices that
+    lost a weight are renormalized to sum to 1; kept weights stay in their
+    original order. Returns (buffer, vertices changed).
+    """
+    weights  = buffer.weights
+    slots    = weights.shape[1]
+    used     = np.arange(slots) < buffer.influences[:, None]
+    heaviest = np.argsort(np.where(used, -weights, np.inf), axis=1, kind='stable')
+    rank     = np.empty_like(heaviest)
+    np.put_along_axis(rank, heaviest, np.arange(slots)[None, :], axis=1)
+    keep     = used & (rank < max_influences) & (weights >= min_weight)
+    empty    = used.any(axis=1) & ~keep.any(axis=1)
+    keep[empty, heaviest[empty, 0]] = True
+    pruned   = (used & ~keep).any(axis=1)
+    
+    # Kept slots first, in their original order, padded to 4 slots.
+    influences = np.count_nonzero(keep, axis=1)
+    width      = max(4, int(influences.max()) if len(influences) else 0)
+    order      = np.argsort(~keep, axis=1, kind='stable')[:, :width]
+    filled     = np.arange(width) < influences[:, None]
+    limited    = np.where(filled, np.take_along_axis(weights, order, axis=1), -1.0)
+    bone_ids   = np.where(filled, np.take_along_axis(buffer.bone_ids, order, axis=1), 0)
+    
+    totals = np.where(filled, limited, 0.0).sum(axis=1)
+    scale  = np.where(pruned & (totals > 0.0), 1.0 / np.where(totals > 0.0, totals, 1.0), 1.0)
+    limited = np.where(filled, limited * scale[:, None], -1.0)
+    
+    buffer.weights    = limited
+    buffer.bone_ids   = bone_ids
+    buffer.influences = influences
+    return buffer, int(np.count_nonzero(pruned))
+
+
+def lod_filepath(filepath, level):
+    root, extension = os.path.splitext(filepath)
+    return "%s_lod%d%s" % (root, level, extension)
+
+
+def decimate(buffer, target_faces, weight_penalty=1.0, trace=None):
+    """
+    Quadric error metric edge collapse (Garland and Heckbert) until at most
+    target_faces remain or no collapse is allowed. Collapses are half-edge:
+    a vertex merges into a neighbour, which keeps its own position, UV and
+    weights, so nothing is interpolated.
+    
+    Vertices on edges without exactly two faces never move. That covers open
+    borders and every UV seam, as the buffer is already split there. Merging
+    vertices with different bone weights costs weight_penalty times the
+    summed weight difference, in units of the mean squared edge length.
+    Collapses that would pinch the surface or flip a face are skipped.
+    
+    Collapses run in rounds. Each round costs every edge at once and takes
+    the edges that are the cheapest within their two-ring, so no two of them
+    share a face and they can all be applied together. trace, if given, is
+    called after every round with the number of faces left.
+    """
+    count = buffer.vertex_count()
+    if buffer.face_count() <= target_faces:
+        return buffer
+    positions = buffer.positions.astype(np.float64)
+    triangles = buffer.triangles.astype(np.int64)
+    
+    # Error quadric per vertex: the planes of its faces, area weighted.
+    corners  = positions[triangles]
+    normals  = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths  = np.linalg.norm(normals, axis=1)
+    unit     = normals / np.where(lengths > 0.0, lengths, 1.0)[:, None]
+    planes   = np.column_stack((unit, -(unit * corners[:, 0]).sum(axis=1)))
+    quadrics = np.zeros((count, 4, 4))
+    for corner in range(3):
+        np.add.at(quadrics, triangles[:, corner], planes[:, :, None] * planes[:, None, :] * (lengths * 0.5)[:, None, None])
+    
+    edges, edge_faces = mesh_edges(triangles, count)
+    locked = np.zeros(count, dtype=bool)
+    locked[edges[edge_faces != 2].ravel()] = True
+    scale  = weight_penalty * float(np.mean(np.sum((positions[edges[:, 0]] - positions[edges[:, 1]]) ** 2, axis=1)))
+    
+    slots   = np.arange(buffer.weights.shape[1]) < buffer.influences[:, None]
+    bone_ids = np.where(slots, buffer.bone_ids, -1)
+    weights = np.where(slots, buffer.weights, 0.0)
+    
+    # source * count + target of collapses the link or flip check turned
+    # down; they stay out until a collapse changes the faces around them.
+    blocked = np.zeros(0, dtype=np.int64)
+    # Both directions' cost per edge, kept between rounds for the edges
+    # whose quadrics did not change.
+    known      = np.zeros(0, dtype=np.int64)
+    known_cost = np.zeros((0, 2))
+    dirty      = np.ones(count, dtype=bool)
+    while len(triangles) > target_faces:
+        edges, edge_faces = mesh_edges(triangles, count)
+        keys  = edges[:, 0] * count + edges[:, 1]
+        stale = dirty[edges].any(axis=1)
+        costs = np.empty((len(edges), 2))
+        costs[~stale] = known_cost[np.searchsorted(known, keys[~stale])]
+        costs[stale]  = collapse_costs(quadrics, positions, bone_ids, weights, edges[stale], scale)
+        known, known_cost = keys, costs.copy()
+        dirty[:] = False
+        
+        costs[locked[edges]]   = np.inf
+        costs[edge_faces != 2] = np.inf
+        costs[np.isin(keys, blocked), 0] = np.inf
+        costs[np.isin(edges[:, 1] * count + edges[:, 0], blocked), 1] = np.inf
+        
+        # The cheaper direction of every edge, ranked by cost.
+        size      = len(edges)
+        backwards = costs[:, 1] < costs[:, 0]
+        cost      = np.where(backwards, costs[:, 1], costs[:, 0])
+        source    = np.where(backwards, edges[:, 1], edges[:, 0])
+        target    = np.where(backwards, edges[:, 0], edges[:, 1])
+        ranked    = np.flatnonzero(np.isfinite(cost))
+        if not len(ranked):
+            break
+        ranked = ranked[np.argsort(cost[ranked], kind='stable')]
+        rank   = np.full(size, size, dtype=np.int64)
+        rank[ranked] = np.arange(len(ranked))
+        
+        # An edge is taken when it has the lowest rank of every free edge
+        # touching a face around either end, so two taken edges never share
+        # a face. Edges next to the taken ones stop being free; repeating
+        # that until nothing is left gives a maximal set for the round.
+        free    = np.isfinite(cost)
+        claimed = np.zeros(count, dtype=bool)
+        chosen  = []
+        while True:
+            free_rank = np.where(free, rank, size)
+            lowest    = np.full(count, size, dtype=np.int64)
+            np.minimum.at(lowest, edges[:, 0], free_rank)
+            np.minimum.at(lowest, edges[:, 1], free_rank)
+            nearby    = np.full(count, size, dtype=np.int64)
+            around    = lowest[triangles]
+            np.minimum.at(nearby, triangles.ravel(), np.repeat(np.minimum(np.minimum(around[:, 0], around[:, 1]), around[:, 2]), 3))
+            taken = ranked[free[ranked] & (nearby[source[ranked]] == rank[ranked]) & (nearby[target[ranked]] == rank[ranked])]
+            if not len(taken):
+                break
+            chosen.append(taken)
+            ends = np.zeros(count, dtype=bool)
+            ends[source[taken]] = ends[target[taken]] = True
+            touching = ends[triangles]
+            claimed[triangles[touching[:, 0] | touching[:, 1] | touching[:, 2]].ravel()] = True
+            free &= ~(claimed[edges[:, 0]] | claimed[edges[:, 1]])
+        chosen = np.concatenate(chosen)
+        chosen = chosen[np.argsort(rank[chosen])]
+        
+        allowed  = link_condition(edges, count, source[chosen], target[chosen])
+        allowed &= ~collapse_flips(triangles, positions, count, source[chosen], target[chosen])
+        rejected = chosen[~allowed]
+        blocked  = np.concatenate((blocked, source[rejected] * count + target[rejected]))
+        # Every collapse of an interior edge removes its two faces.
+        chosen = chosen[allowed][:(len(triangles) - target_faces + 1) // 2]
+        if not len(chosen):
+            if not len(rejected):
+                break
+            continue
+        
+        sources = source[chosen]
+        targets = target[chosen]
+        moved   = np.zeros(count, dtype=bool)
+        moved[sources] = True
+        changed = np.zeros(count, dtype=bool)
+        changed[triangles[moved[triangles].any(axis=1)].ravel()] = True
+        blocked = blocked[~(changed[blocked // count] | changed[blocked % count])]
+        
+        remap = np.arange(count)
+        remap[sources] = targets
+        triangles = remap[triangles]
+        triangles = triangles[(triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 2] != triangles[:, 0])]
+        quadrics[targets] += quadrics[sources]
+        dirty[targets]     = True
+        if trace is not None:
+            trace(len(triangles))
+    
+    return buffer.reordered(np.unique(triangles), triangles)
+
+
+def mesh_edges(triangles, count):
+    # Unique (low, high) vertex pairs of the triangles, and how many faces use each.
+    pairs = np.sort(triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    keys, used = np.unique(pairs[:, 0] * count + pairs[:, 1], return_counts=True)
+    return np.column_stack((keys // count, keys % count)), used
+
+
+def collapse_costs(quadrics, positions, bone_ids, weights, edges, scale):
+    # (edges, 2) costs of collapsing the first end onto the second and back:
+    # the quadric error at the kept end plus the weight penalty.
+    a, b  = edges[:, 0], edges[:, 1]
+    both  = quadrics[a] + quadrics[b]
+    costs = np.empty((len(edges), 2))
+    for column, kept in enumerate((b, a)):
+        x = np.column_stack((positions[kept], np.ones(len(kept))))
+        costs[:, column] = np.maximum(np.einsum('ni,nij,nj->n', x, both, x), 0.0)
+    same = (bone_ids[a][:, :, None] == bone_ids[b][:, None, :]) & (bone_ids[a][:, :, None] >= 0)
+    wa, wb = weights[a], weights[b]
+    difference = np.abs(wa - np.einsum('nij,nj->ni', same, wb)).sum(axis=1) + (wb * ~same.any(axis=1)).sum(axis=1)
+    return costs + scale * difference[:, None]
+
+
+def link_condition(edges, count, source, target):
+    # True where the edge's ends share exactly the two tips of its faces as
+    # neighbours; any other common neighbour would pinch the surface.
+    adjacent = np.sort(np.concatenate((edges[:, 0] * count + edges[:, 1], edges[:, 1] * count + edges[:, 0])))
+    first    = np.searchsorted(adjacent, source * count)
+    last     = np.searchsorted(adjacent, source * count + count)
+    owner    = np.repeat(np.arange(len(source)), last - first)
+    index    = np.arange(len(owner)) - np.repeat(np.cumsum(last - first) - (last - first), last - first) + np.repeat(first, last - first)
+    keys     = target[owner] * count + adjacent[index] % count
+    found    = np.searchsorted(adjacent, keys)
+    shared   = adjacent[np.minimum(found, len(adjacent) - 1)] == keys
+    return np.bincount(owner[shared], minlength=len(source)) == 2
+
+
+def collapse_flips(triangles, positions, count, source, target):
+    # True where moving the source onto the target turns over or flattens one
+    # of the source's faces that stay.
+    collapse = np.full(count, -1, dtype=np.int64)
+    collapse[source] = np.arange(len(source))
+    face, corner = np.nonzero(collapse[triangles] >= 0)
+    owner  = collapse[triangles[face, corner]]
+    keep   = ~(triangles[face] == target[owner][:, None]).any(axis=1)
+    face, corner, owner = face[keep], corner[keep], owner[keep]
+    before = positions[triangles[face]]
+    after  = before.copy()
+    after[np.arange(len(face)), corner] = positions[target[owner]]
+    n = np.cross(before[:, 1] - before[:, 0], before[:, 2] - before[:, 0])
+    m = np.cross(after[:, 1] - after[:, 0], after[:, 2] - after[:, 0])
+    bad = ((n * m).sum(axis=1) <= 0.0) | ((m * m).sum(axis=1) <= 1e-24)
+    return np.bincount(owner[bad], minlength=len(source)) > 0
+
+
+# Post-transform vertex cache model used by the optimizer and its statistics.
+VERTEX_CACHE_SIZE = 32
+
+
+def cache_statistics(triangles, vertex_count, cache_size=VERTEX_CACHE_SIZE):
+    # (ACMR, ATVR) of a triangle list for a FIFO cache: vertex shader runs
+    # per triangle, and per vertex (1.0 is ideal).
+    cache  = []
+    cached = set()
+    misses = 0
+    for triangle in triangles:
+        for vert_id in triangle:
+            if vert_id in cached:
+                continue
+            misses += 1
+            cache.append(vert_id)
+            cached.add(vert_id)
+            if len(cache) > cache_size:
+                cached.discard(cache.pop(0))
+    return misses / float(max(1, len(triangles))), misses / float(max(1, vertex_count))
+
+
+def forsyth_triangle_order(triangles, vertex_count, cache_size=VERTEX_CACHE_SIZE, trace=None):
+    """
+    Tom Forsyth's linear-speed vertex cache optimisation. Returns the
+    triangle indices in draw order. Each step draws the best scored
+    triangle touching the simulated LRU cache; vertex scores favour recent
+    cache entries and vertices with few triangles left. trace, if given,
+    is called after every step with the order so far and the vertex and
+    triangle scores.
+    """
+    decay_power   = 1.5
+    last_score    = 0.75
+    valence_scale = 2.0
+    valence_power = -0.5
+    
+    position_score = [last_score] * 3 + [
+        (1.0 - (position - 3) / float(cache_size - 3)) ** decay_power for position in range(3, cache_size)]
+    valence_score = [0.0] + [valence_scale * count ** valence_power for count in range(1, 64)]
+    
+    vertex_triangles = [[] for index in range(vertex_count)]
+    for triangle_index, triangle in enumerate(triangles):
+        for vert_id in triangle:
+            vertex_triangles[vert_id].append(triangle_index)
+    remaining = [len(vertex_tris) for vertex_tris in vertex_triangles]
+    position  = [-1] * vertex_count
+    
+    def vertex_score(vert_id):
+        count = remaining[vert_id]
+        if count == 0:
+            return -1.0
+        score = valence_score[count] if count < 64 else valence_scale * count ** valence_power
+        if position[vert_id] >= 0:
+            score += position_score[position[vert_id]]
+        return score
+    
+    score          = [vertex_score(vert_id) for vert_id in range(vertex_count)]
+    triangle_score = [sum(score[vert_id] for vert_id in triangle) for triangle in triangles]
+    added          = [False] * len(triangles)
+    order          = []
+    cache          = []
+    cursor         = 0
+    best           = -1
+    
+    while len(order) < len(triangles):
+        if best < 0:
+            # Nothing in the cache touches a free triangle: take the next one in input order.
+            while added[cursor]:
+                cursor += 1
+            best = cursor
+        
+        added[best] = True
+        order.append(best)
+        triangle = triangles[best]
+        for vert_id in triangle:
+            remaining[vert_id] -= 1
+            vertex_triangles[vert_id].remove(best)
+        
+        # Move the triangle's vertices to the front of the LRU cache.
+        cache   = list(triangle) + [vert_id for vert_id in cache if vert_id not in triangle]
+        evicted = cache[cache_size:]
+        for vert_id in evicted:
+            position[vert_id] = -1
+        del cache[cache_size:]
+        
+        # Evicted vertices lose their position score, so they are rescored too.
+        touched = set(cache) | set(evicted)
+        for index, vert_id in enumerate(cache):
+            position[vert_id] = index
+        best       = -1
+        best_score = -1.0
+        for vert_id in touched:
+            new_score = vertex_score(vert_id)
+            delta     = new_score - score[vert_id]
+            score[vert_id] = new_score
+            for triangle_index in vertex_triangles[vert_id]:
+                triangle_score[triangle_index] += delta
+        for vert_id in cache:
+            for triangle_index in vertex_triangles[vert_id]:
+                if triangle_score[triangle_index] > best_score:
+                    best_score = triangle_score[triangle_index]
+                    best       = triangle_index
+        if trace is not None:
+            trace(order, score, triangle_score)
+    return order
+
+
+def cached_matrices(armature, key, count):
+    # (count, 4, 4) matrices stored flat on the armature at import, or None.
+    values = armature.get(key)
+    if values is None or len(values) != count * 16:
+        return None
+    return np.array(list(values), dtype=np.float64).reshape(count, 4, 4)
+
+
+def animates_pose_bones(action):
+    return any(fcurve.data_path.startswith("pose.bones[") for fcurve in action.fcurves)
+
+
+def matrix_quaternion_array(matrices):
+    # (..., 3, 3) rotation matrices -> (..., 4) w, x, y, z unit quaternions,
+    # each element taking the numerically safest of the four branches.
+    m = matrices
+    trace = m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2]
+    candidates = np.empty(m.shape[:-2] + (4, 4))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.sqrt(np.maximum(1.0 + trace, 0.0)) * 2.0
+        candidates[..., 0, :] = np.stack((0.25 * s, (m[..., 2, 1] - m[..., 1, 2]) / s, (m[..., 0, 2] - m[..., 2, 0]) / s, (m[..., 1, 0] - m[..., 0, 1]) / s), axis=-1)
+        s = np.sqrt(np.maximum(1.0 + m[..., 0, 0] - m[..., 1, 1] - m[..., 2, 2], 0.0)) * 2.0
+        candidates[..., 1, :] = np.stack(((m[..., 2, 1] - m[..., 1, 2]) / s, 0.25 * s, (m[..., 0, 1] + m[..., 1, 0]) / s, (m[..., 0, 2] + m[..., 2, 0]) / s), axis=-1)
+        s = np.sqrt(np.maximum(1.0 - m[..., 0, 0] + m[..., 1, 1] - m[..., 2, 2], 0.0)) * 2.0
+        candidates[..., 2, :] = np.stack(((m[..., 0, 2] - m[..., 2, 0]) / s, (m[..., 0, 1] + m[..., 1, 0]) / s, 0.25 * s, (m[..., 1, 2] + m[..., 2, 1]) / s), axis=-1)
+        s = np.sqrt(np.maximum(1.0 - m[..., 0, 0] - m[..., 1, 1] + m[..., 2, 2], 0.0)) * 2.0
+        candidates[..., 3, :] = np.stack(((m[..., 1, 0] - m[..., 0, 1]) / s, (m[..., 0, 2] + m[..., 2, 0]) / s, (m[..., 1, 2] + m[..., 2, 1]) / s, 0.25 * s), axis=-1)
+    branch = np.argmax(np.stack((trace, m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]), axis=-1), axis=-1)
+    q = np.take_along_axis(candidates, branch[..., None, None], axis=-2)[..., 0, :]
+    q = q * np.where(q[..., :1] < 0.0, -1.0, 1.0)
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+matrix_3_transform_z_positive = Matrix((( 1, 0, 0 )   ,( 0, 0,-1 )   ,( 0, 1, 0 )                  ))
+matrix_4_transform_z_positive = Matrix((( 1, 0, 0, 0 ),( 0, 0,-1, 0 ),( 0, 1, 0, 0 ),( 0, 0, 0, 1 )))
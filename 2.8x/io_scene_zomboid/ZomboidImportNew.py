@@ -0,0 +1,1627 @@
+# Author: Jab (or 40BlocksUnder) | Joshua Edwards
+# Link for more info: http://theindiestone.com/forums/index.php/topic/12864-blender
+# Imports models from Zomboid format.
+
+import cProfile,hashlib,io,json,logging,math,os,weakref,bmesh,bpy
+import numpy as np
+
+from bpy import context
+from bpy.types import Operator
+from bpy.props import FloatVectorProperty
+from bpy_extras.object_utils import AddObjectHelper, object_data_add
+from mathutils import Vector, Euler, Quaternion, Matrix
+from bpy_extras.io_utils import ImportHelper
+from bpy.props import StringProperty, BoolProperty, EnumProperty
+from bpy.types import Operator
+from math import pi
+
+from .shared import INDEX_EXTENSION, INDEX_VERSION, VERBOSITY_ITEMS, StageStats, OperatorCounter, bone_id_table, file_sha1, get_logger, profiling_requested, write_profile
+
+log = get_logger("zomboid.import")
+
+
+class ZomboidImport(Operator, ImportHelper):
+    """This appears in the tooltip of the operator and in the generated docs"""
+    
+    # important since its how bpy.ops.import_test.some_data is constructed
+    bl_idname    = "zomboid.import_model"
+    bl_label     = "Import a Zomboid Model"
+    filename_ext = ".txt"
+    filter_glob: StringProperty(
+            default="*.txt",
+            options={'HIDDEN'},
+            )
+    
+    load_model: BoolProperty(
+        name="Load Model",
+        description="Whether or not to import the model mesh.",
+        default=True,
+        )
+        
+    optimize_model: BoolProperty(
+        name="Optimize Model",
+        description="Removing double vertex groups, merging them, and converting Triangular polygons to quads.",
+        default=False,
+        )
+    
+    load_armature: BoolProperty(
+        name="Load Armature",
+        description="Whether or not to import the armature, if present.",
+        default=True,
+        )
+    
+    load_weights: BoolProperty(
+        name="Load Bone Weights",
+        description="Load Bone weights if PZ armature is detected. (RECOMENDED!)",
+        default=True,
+        )
+    
+    load_animations: BoolProperty(
+        name="Load Animations (WIP!)",
+        description="Whether or not to import animations. (Not done yet!)",
+        default=True,
+        )
+    
+    lock_model_on_armature_detection: BoolProperty(
+        name="Lock Model Transforms If Armature Present",
+        description="Whether or not to lock the model, if an armature is present.",
+        default=True,
+        )
+        
+    should_optimize_armature: BoolProperty(
+        name="Optimize Armature (Biped Models)",
+        description="Optimizes the imported Armature for animation purposes.",
+        default=False,
+        )
+    
+    reuse_armature: BoolProperty(
+        name="Reuse Matching Armature",
+        description="Parent the model to an armature already in the scene if it has the same skeleton, instead of creating a new one.",
+        default=True,
+        )
+    
+    unique_mesh: BoolProperty(
+        name="Unique Mesh Data",
+        description="Always create new mesh data, even if the same model was imported into this scene before.",
+        default=False,
+        )
+    
+    use_index: BoolProperty(
+        name="Use Index File",
+        description="Seek straight to the needed sections when an up to date .idx file from the exporter is next to the model.",
+        default=True,
+        )
+    
+    write_stats: BoolProperty(
+        name="Write Stage Report",
+        description="Write per-stage timings and element counters to a JSON file next to the model.",
+        default=False,
+        )
+    
+    memory_profile: BoolProperty(
+        name="Profile Memory",
+        description="Trace memory per stage and check parse data is released (also ZOMBOID_MEMORY_PROFILE=1).",
+        default=False,
+        options={'HIDDEN'},
+        )
+    
+    verbosity: EnumProperty(
+        name="Log Level",
+        description="How much to print to the system console.",
+        items=VERBOSITY_ITEMS,
+        default='WARNING',
+        )
+    
+    count_operators: BoolProperty(
+        name="Count Operators",
+        description="Count bpy.ops calls, depsgraph updates and undo pushes into the stage report (also ZOMBOID_COUNT_OPS=1).",
+        default=False,
+        options={'HIDDEN'},
+        )
+    
+    cprofile: BoolProperty(
+        name="Profile",
+        description="Run the import under cProfile and save .pstats/.profile.txt next to the model (also ZOMBOID_PROFILE=1).",
+        default=False,
+        options={'HIDDEN'},
+        )
+    
+
+    # Get the current scene
+    #scene = context.scene
+
+#####################################################################################
+###                                                                               ###
+###   File I/O                                                                    ###
+###                                                                               ###
+#####################################################################################      
+
+    def read_header(self,file):
+        read_model_header(file, self.z_mesh)
+
+
+    def read_vertex_buffer(self,file):
+        z = self.z_mesh
+        z.vertex_count = read_int(file)
+        for x in range(0,int(z.vertex_count)):
+            for element in range(0,z.element_count):
+                e = z.stride_type[element]
+                if e == "VertexArray":
+                    line = read_line(file)
+                    vs = line.split(', ')
+                    z.vertices.append(Vector((float(vs[0]), float(vs[1]), float(vs[2]))))
+                elif e == "TextureCoordArray":
+                    line = read_line(file)
+                    vs = line.split(', ')
+                    z.uvs.append(Vector((float(vs[0]),float(1) - float(vs[1]))))
+                elif e == "BlendWeightArray":
+                    weights = read_line(file)
+                    split   = weights.split(", ")
+                    array   = []
+                    for s in split:
+                        array.append(float(s))
+                    z.weight_values.append(array)
+                elif e == "BlendIndexArray":
+                    indexes = read_line(file)
+                    split   = indexes.split(", ")
+                    array   = []
+                    for s in split:
+                        array.append(int(s))
+                    z.weight_indexes.append(array)
+                else:
+                    line = read_line(file)
+    
+                    
+    def read_faces(self,file):
+        z = self.z_mesh
+        z.face_count = read_int(file)
+        for x in range(0, z.face_count):     
+            face        = read_line(file)    
+            vertices    = face.split(", ")
+            vertices[0] = int(vertices[0])
+            vertices[1] = int(vertices[1])
+            vertices[2] = int(vertices[2])
+            z.faces.append([vertices[0], vertices[1], vertices[2]])
+            if z.has_texture:
+                z.face_uvs.append([z.uvs[vertices[0]],z.uvs[vertices[1]],z.uvs[vertices[2]]])
+
+
+    def read_skeleton(self,file):                                       
+        z = self.z_mesh
+        skeleton = z.skeleton
+        skeleton.bone_count = read_int(file)
+        for index in range(0, skeleton.bone_count):                 
+            bone_index                       = read_int (file)     
+            bone_parent_index                = read_int (file)     
+            bone_name                        = read_line(file)     
+            skeleton.bone_index [bone_name ] = bone_index          
+            skeleton.bone_name  [bone_index] = bone_name           
+            skeleton.bone_parent[bone_index] = bone_parent_index   
+        skeleton.bind_matrices   = read_matrix_array(file, skeleton.bone_count)
+        # The inverse bind pose block is derived below instead of parsed.
+        skip_matrix_array(file, skeleton.bone_count)
+        skeleton.offset_matrices = read_matrix_array(file, skeleton.bone_count)
+        
+        # One batched inversion for both: inverse bind pose and rest pose.
+        inverses = np.linalg.inv(np.stack((skeleton.bind_matrices, skeleton.offset_matrices)))
+        skeleton.inverse_bind_matrices = inverses[0]
+        skeleton.rest_matrices         = inverses[1]
+       
+
+    def read_animations(self,file):    
+        z = self.z_mesh
+        skeleton = z.skeleton
+        z.animation_count = read_int(file)
+        debug = log.isEnabledFor(logging.DEBUG)
+        for animation_index in range(0,z.animation_count):
+            animation_name        = read_line(file)
+            animation_time        = read_float(file)
+            animation_frame_count = read_int(file)
+            if debug:
+                log.debug("Reading animation: %s (%d keyframes)", animation_name, animation_frame_count)
+            
+            key_frames            = []
+            frame                 = Frame()
+            current_index         = -1
+            last_index            = -1
+            first                 = False
+            
+            animation = Animation(animation_name,animation_time,animation_frame_count)
+            z.animations.append(animation)
+            
+            for keyframe_index in range(0, animation_frame_count):     
+                current_index     = read_int(file)
+                if current_index < last_index:
+                    for index, kf in enumerate(key_frames):
+                        frame.bones.append(kf.bone_index)
+                        frame.bone_names.append(kf.bone_name)
+                        frame.times.append(kf.time)
+                        frame.bone_locs[kf.bone_name] = kf.loc
+                        frame.bone_rots[kf.bone_name] = kf.rot
+                    
+                    frame.key_frames = key_frames
+                    animation.frames.append(frame)
+                    key_frames = []
+                    frame = Frame()
+                    
+                last_index = current_index
+                
+                bone_name  = read_line(file)
+                frame_time = read_float(file)
+                loc        = read_vector(file)
+                rot        = read_quaternion(file) 
+                mat        = rot.to_matrix().to_4x4() * Matrix.Translation(loc).to_4x4()
+
+                key_frame     = KeyFrame(current_index,bone_name,frame_time,mat)
+                key_frame.loc = loc
+                key_frame.rot = rot
+                key_frames.append(key_frame)
+                
+            
+            for kf in key_frames:
+                frame.bones.append(kf.bone_index)
+                frame.bone_names.append(kf.bone_name)
+                frame.times.append(kf.time)
+                frame.bone_locs[kf.bone_name] = kf.loc
+                frame.bone_rots[kf.bone_name] = kf.rot
+
+            frame.key_frames = key_frames
+            animation.frames.append(frame)
+
+#####################################################################################
+###                                                                               ###
+###   Blender methods                                                             ###
+###                                                                               ###
+#####################################################################################
+
+    def create_mesh(self):
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        for object in bpy.context.selected_objects:
+            object.select_set(False)
+        
+        z = self.z_mesh
+        self.scene = bpy.context.scene
+        
+        registry = MeshRegistry(self.scene)
+        if not self.unique_mesh:
+            shared = registry.get(z.hash)
+            if shared:
+                log.info("Linking to existing mesh data %s", shared.name)
+                self.link_mesh(shared)
+                self.stats.count('meshes_reused')
+                return
+        
+        z.mesh = bpy.data.meshes.new(name=z.name)
+        z.mesh.from_pydata(z.vertices, z.edges, z.faces)
+        z.mesh.update(calc_edges=True, calc_edges_loose=True)
+        # Safety Duplicate Name Check.
+        z.name = z.mesh.name
+        
+        # UV Assignments, one per face corner in loop order.
+        if z.has_texture:
+            uv_layer = z.mesh.uv_layers.new()
+            uv_layer.data.foreach_set("uv", np.asarray(z.face_uvs, dtype=np.float32).ravel())
+        
+        # Object, armature parent, modifier and (empty) vertex groups.
+        self.link_mesh(z.mesh)
+        
+        if z.has_armature:
+            # Weight Assignments
+            with self.stats.stage('assign_weights'):
+                bone_ids = bone_id_table(z.skeleton.object)
+                groups   = dict() # KEY: BONE_ID
+                for bone in z.skeleton.armature.bones:
+                    groups[bone_ids[bone.name]] = z.object.vertex_groups[bone.name]
+                
+                for vertex_index, vertex_weight_ids in enumerate(z.weight_indexes):
+                    vertex_weights = z.weight_values[vertex_index]
+                    for offset, vert_weight_id in enumerate(vertex_weight_ids):
+                        # Unused slots are padded with a weight of -1.0.
+                        if vertex_weights[offset] < 0.0:
+                            continue
+                        vertex_group = groups.get(vert_weight_id)
+                        if vertex_group is not None:
+                            vertex_group.add([vertex_index], vertex_weights[offset], 'REPLACE')
+                self.stats.count('vertex_groups', len(groups))
+        
+        if self.optimize_model:
+            bpy.ops.object.mode_set(mode = 'EDIT')
+            bpy.ops.mesh.remove_doubles()
+            bpy.ops.mesh.tris_convert_to_quads()
+            bpy.ops.object.mode_set(mode = 'OBJECT')
+        
+        z.mesh["ZOMBOID_MESH_HASH"] = z.hash
+        registry.add(z.mesh, z.hash)
+
+
+    def link_mesh(self, mesh):
+        # A new object on the mesh data. For mesh data imported before, the
+        # weights already live in the mesh, so only the object side (groups,
+        # parent, modifier) is needed, in the order create_mesh makes it.
+        z        = self.z_mesh
+        z.mesh   = mesh
+        z.object = bpy.data.objects.new(z.name, mesh)
+        bpy.context.collection.objects.link(z.object)
+        z.name   = z.object.name
+        
+        if z.has_armature:
+            if self.lock_model_on_armature_detection:
+                z.object.lock_location = z.object.lock_rotation = z.object.lock_scale = [True, True, True]
+            armature = z.skeleton.object
+            z.object.parent = armature
+            z.object.matrix_parent_inverse = armature.matrix_world.inverted()
+            modifier = z.object.modifiers.new(armature.name, 'ARMATURE')
+            modifier.object = armature
+            for bone in z.skeleton.armature.bones:
+                z.object.vertex_groups.new(name=bone.name)
+        
+        z.object.select_set(True)
+        bpy.context.view_layer.objects.active = z.object
+
+
+    def create_armature(self):
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        for object in bpy.context.selected_objects:
+            object.select_set(False)
+        
+        z                        = self.z_mesh
+        skeleton                 = z.skeleton
+        skeleton.name            = z.name + "_armature"
+        skeleton.armature        = bpy.data.armatures.new(skeleton.name)
+        skeleton.object = bpy.data.objects.new(skeleton.name, skeleton.armature)
+        skeleton.name   = skeleton.object.name 
+        
+        bpy.context.collection.objects.link(skeleton.object)
+        bpy.context.view_layer.objects.active = skeleton.object
+        
+        skeleton.object.select_set(True)
+        skeleton.object.show_in_front = True
+        
+        # Edit bones only exist in edit mode, so this is the one mode switch left.
+        bpy.ops.object.mode_set(mode='EDIT')
+        edit_bones = skeleton.armature.edit_bones
+        
+        debug = log.isEnabledFor(logging.DEBUG)
+        for bone_index in range(0, skeleton.bone_count):
+        
+            bone_name = skeleton.bone_name[bone_index]
+            bone = edit_bones.new(bone_name)
+        
+            if debug:
+                log.debug("Creating bone: %s", bone_name)
+        
+            if bone_index != 0:
+                bone.parent = skeleton.bones[skeleton.bone_parent[bone_index]]
+                
+            skeleton.bones[bone_index] = skeleton.bones[bone_name] = bone
+            bone.head = Vector((0, 0, 0    ))
+            
+            mat = Matrix(skeleton.rest_matrices[bone_index].tolist())
+            skeleton.bind_pose[bone_name] = mat
+            bone.matrix = mat
+            bone.tail = Vector((bone.head.x, bone.head.y + 0.075, bone.head.z)) 
+        
+        bpy.ops.object.mode_set(mode='OBJECT')
+        
+        skeleton.object["ZOMBOID_ARMATURE"] = 1 
+        skeleton.object["ZOMBOID_SKELETON_HASH"] = skeleton.hash
+        skeleton.object["ZOMBOID_BONE_IDS"] = {skeleton.bone_name[index]: index for index in range(0, skeleton.bone_count)}
+        # The file's matrices, so ZomboidExport can write the skeleton back unchanged.
+        skeleton.object["ZOMBOID_BIND_POSE"]    = skeleton.bind_matrices.ravel().tolist()
+        skeleton.object["ZOMBOID_SKIN_OFFSETS"] = skeleton.offset_matrices.ravel().tolist()
+        
+        z.load_armature = True
+        
+        
+    def create_animations(self):
+        z = self.z_mesh
+        s = z.skeleton
+        s.armature.show_axes = True
+        
+        # Set ourselves into the pose mode of the armature with nothing selected.
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        for object in bpy.context.selected_objects:
+            object.select_set(False)
+        s.object.select_set(True)
+        bpy.context.view_layer.objects.active = s.object
+        bpy.ops.object.mode_set(mode='POSE')
+        for bone in s.armature.bones:
+            bone.select = False
+        
+        # Pose bones and rest matrices, resolved once for every clip.
+        if s.pose_cache is None or s.pose_cache.object != s.object:
+            s.pose_cache = PoseCache(s)
+        cache = s.pose_cache
+        
+        # Go through each Animation.
+        for animation in z.animations:
+            if animation.name != "Run":
+                continue
+            s.object.animation_data_create();
+            s.object.animation_data.action = bpy.data.actions.new(animation.name)
+            s.object.animation_data.action.use_fake_user = 1
+            # The file's timing, one keyframe per frame here, so ZomboidExport can write it back.
+            s.object.animation_data.action["ZOMBOID_FRAME_TIMES"] = [frame.times[0] if frame.times else 0.0 for frame in animation.frames]
+            s.object.animation_data.action["ZOMBOID_DURATION"]    = animation.time
+            log.info("Building animation: %s", animation.name)
+            
+            # 1) Turn the translation and rotation into a Frame Matrix
+            # 2) Create a World Matrix by multiplying the Parent World Matrix with the Frame Matrix
+            # 3) Create the Product Matrix by multiplying the World Matrix with the Bone Matrix
+            # 4) Solve the pose bone's matrix_basis that puts it there
+            basis = cache.basis_matrices(self.compute_skin_pose_array(animation))
+            
+            last_matrix = np.broadcast_to(np.identity(4), (s.bone_count, 4, 4))
+            for frame_offset in range(0, len(animation.frames)):
+                for bone_index in cache.keyed:
+                    mat = basis[frame_offset, bone_index]
+                    if np.array_equal(mat, last_matrix[bone_index]):
+                        continue
+                    
+                    bone = cache.pose_bones[bone_index]
+                    bone.matrix_basis = Matrix(mat.tolist())
+                    bone.keyframe_insert("location", frame=frame_offset, group=bone.name)
+                    bone.keyframe_insert(rotation_data_path(bone), frame=frame_offset, group=bone.name)
+                    
+                last_matrix = basis[frame_offset]
+        
+        
+    def read_model(self, file):
+        z      = self.z_mesh
+        stats  = self.stats
+        # The offset in the file read
+        offset = 0
+        end_of_file = False
+        while file.readable() and end_of_file == False:
+                if offset == 0:
+                    with stats.stage('read_header'):
+                        self.read_header(file)
+                elif offset == 3:
+                    with stats.stage('read_vertex_buffer'):
+                        self.read_vertex_buffer(file)
+                    stats.count('vertices', len(z.vertices))
+                elif offset == 5:
+                    with stats.stage('read_faces'):
+                        self.read_faces(file)
+                    stats.count('faces', len(z.faces))
+                elif offset == 6:
+                    try:
+                        with stats.stage('read_skeleton'):
+                            self.read_skeleton(file)
+                            z.skeleton.hash = skeleton_hash(z.skeleton)
+                        z.has_armature = True
+                        z.load_armature = True
+                        stats.count('bones', z.skeleton.bone_count)
+                    except:
+                        end_of_file       = True
+                        log.debug("No skeleton in %s", self.filepath, exc_info=True)
+                elif offset == 9:
+                    try:
+                        with stats.stage('read_animations'):
+                            self.read_animations(file)
+                        z.has_animations  = True
+                        stats.count('animations', len(z.animations))
+                        for animation in z.animations:
+                            stats.count('keyframes', animation.frame_count)
+                    except: 
+                        end_of_file = True
+                        log.debug("No animations in %s", self.filepath, exc_info=True)
+                
+                offset+=1
+                if offset > 10 or end_of_file:
+                    break
+        
+        
+    def read_indexed_model(self, file, index):
+        # Same as read_model, but seeks to the sections listed in the .idx
+        # sidecar and leaves out the ones this import does not use.
+        z        = self.z_mesh
+        stats    = self.stats
+        sections = index["sections"]
+        with stats.stage('read_header'):
+            self.read_header(file)
+        
+        if self.load_model:
+            file.seek(sections["vertex_buffer"])
+            with stats.stage('read_vertex_buffer'):
+                self.read_vertex_buffer(file)
+            stats.count('vertices', len(z.vertices))
+            file.seek(sections["faces"])
+            with stats.stage('read_faces'):
+                self.read_faces(file)
+            stats.count('faces', len(z.faces))
+        
+        if "skeleton" in sections:
+            file.seek(sections["skeleton"])
+            with stats.stage('read_skeleton'):
+                self.read_skeleton(file)
+                z.skeleton.hash = skeleton_hash(z.skeleton)
+            z.has_armature  = True
+            z.load_armature = True
+            stats.count('bones', z.skeleton.bone_count)
+        
+        if "animations" in sections and self.load_animations:
+            file.seek(sections["animations"])
+            with stats.stage('read_animations'):
+                self.read_animations(file)
+            z.has_animations = True
+            stats.count('animations', len(z.animations))
+            for animation in z.animations:
+                stats.count('keyframes', animation.frame_count)
+        
+        
+    def compute_skin_pose_array(self, animation):
+        # (frames, bones, 4, 4) skin matrices, laid out like to_blender_matrix().
+        # Bones without a key in a frame keep their previous bone pose.
+        s     = self.z_mesh.skeleton
+        count = len(animation.frames)
+        locs  = np.zeros((count, s.bone_count, 3))
+        rots  = np.zeros((count, s.bone_count, 4))
+        rots[:, :, 0] = 1.0
+        
+        for frame_index, frame in enumerate(animation.frames):
+            if frame_index > 0:
+                locs[frame_index] = locs[frame_index - 1]
+                rots[frame_index] = rots[frame_index - 1]
+            for bone_name, loc in frame.bone_locs.items():
+                bone_index = s.bone_index.get(bone_name)
+                if bone_index is None:
+                    continue
+                rot = frame.bone_rots[bone_name]
+                locs[frame_index, bone_index] = (loc.x, loc.y, loc.z)
+                rots[frame_index, bone_index] = (rot.w, rot.x, rot.y, rot.z)
+        
+        bone_pose = np.zeros((count, s.bone_count, 4, 4))
+        bone_pose[..., :3, :3] = quaternion_matrix_array(rots)
+        bone_pose[..., :3, 3]  = locs
+        bone_pose[..., 3, 3]   = 1.0
+        
+        world_pose = np.empty_like(bone_pose)
+        for bone_index in bone_order(s):
+            parent_index = s.bone_parent[bone_index]
+            if parent_index < 0 or bone_index == 0:
+                world_pose[:, bone_index] = bone_pose[:, bone_index]
+            else:
+                world_pose[:, bone_index] = world_pose[:, parent_index] @ bone_pose[:, bone_index]
+        
+        return world_pose @ s.offset_matrices
+        
+        
+    def execute(self, context):
+        log.setLevel(self.verbosity)
+        trace_memory = profiling_requested(self.memory_profile, "ZOMBOID_MEMORY_PROFILE")
+        self.stats   = StageStats(self.bl_idname, trace_memory=trace_memory)
+        profiler     = None
+        if profiling_requested(self.cprofile, "ZOMBOID_PROFILE"):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        counter      = None
+        if profiling_requested(self.count_operators, "ZOMBOID_COUNT_OPS"):
+            counter = OperatorCounter(self.stats)
+            counter.start()
+        try:
+            result = self.import_model(context)
+            self.release_parse_data()
+        finally:
+            if counter:
+                counter.stop()
+            if profiler:
+                profiler.disable()
+            self.stats.finish()
+        
+        if profiler:
+            write_profile(profiler, self.filepath, self.stats)
+        
+        if self.write_stats or trace_memory or counter:
+            self.stats.write_json(self.filepath + ".stats.json")
+        self.report({'INFO'}, self.stats.summary())
+        
+        return result
+        
+        
+    def release_parse_data(self):
+        # The parsed ZMesh (frames, keyframes, vertex lists) is dead weight once
+        # the Blender data-blocks exist, but the operator instance outlives
+        # execute, so drop it explicitly.
+        reference   = weakref.ref(self.z_mesh)
+        self.z_mesh = ZMesh()
+        if self.stats.trace_memory:
+            self.stats.check_released('z_mesh', reference)
+        
+        
+    def import_model(self, context):
+        
+        self.scene = bpy.context.scene
+        old_cursor = self.scene.cursor.location
+        self.scene.cursor.location = (0.0, 0.0, 0.0)
+        z = self.z_mesh
+        #scene = bpy.context.scene
+
+        index = None
+        if self.use_index:
+            with self.stats.stage('read_index'):
+                index = load_model_index(self.filepath)
+            self.stats.count('index_used', 1 if index else 0)
+        
+        with io.open(self.filepath, 'r') as file:
+            if index:
+                self.read_indexed_model(file, index)
+            else:
+                self.read_model(file)
+            # Close the file.
+            file.close()
+        
+        registry = ArmatureRegistry(self.scene)
+        if z.has_armature and self.load_armature:
+            shared = bone_ids = None
+            if self.reuse_armature:
+                shared, bone_ids = registry.get(z.skeleton.hash)
+            if shared:
+                log.info("Reusing armature %s", shared.name)
+                self.use_armature(shared, bone_ids)
+                self.stats.count('armatures_reused')
+            else:
+                with self.stats.stage('create_armature'):
+                    self.create_armature()
+            registry.add(z.skeleton.object, z.skeleton.hash, z.skeleton.bone_index)
+        if self.load_animations and z.has_animations:
+            with self.stats.stage('create_animations'):
+                self.create_animations()
+            
+        # Check for meshes with Blend data and no armature.
+        if z.has_armature == False and z.has_weights == True:
+            log.debug("Weights without a skeleton, looking for a Zomboid armature")
+            object, bone_ids = registry.active()
+            if object:
+                self.use_armature(object, bone_ids)
+                z.has_armature = True
+                log.info("Using armature %s for bone weights", object.name)
+            else:
+                log.info("No Zomboid armature in the scene, bone weights are skipped")
+                
+        if self.load_model:
+            with self.stats.stage('create_mesh'):
+                bone_names = [bone.name for bone in z.skeleton.armature.bones] if z.has_armature else []
+                z.hash = mesh_hash(z, bone_names, self.optimize_model)
+                self.create_mesh()
+        
+        bpy.context.scene.cursor.location = old_cursor
+        
+        return {'FINISHED'}
+        
+
+    def use_armature(self, object, bone_ids=None):
+        # Points the skeleton at an armature that already exists in the scene.
+        s          = self.z_mesh.skeleton
+        s.object   = object
+        s.armature = object.data
+        s.name     = object.name
+        if bone_ids is None:
+            bone_ids = bone_id_table(object)
+        for bone_name, index in bone_ids.items():
+            s.bone_index[bone_name] = index
+            s.bone_name[index]      = bone_name
+        self.z_mesh.load_armature = True
+        
+
+    def __init__(self):
+        self.z_mesh                             = ZMesh()
+        self.stats                              = None
+
+
+class ZMesh:
+    
+    def __init__(self):
+        
+        self.name             = ''
+        self.hash             = ''      # SEE mesh_hash()
+        self.skeleton         = Skeleton()
+        self.animations       = [ ]
+        self.animation_count  = [ ]
+        
+        #############################
+        # FILE I/O              # # #
+        #############################
+        self.element_count  = 0
+        self.elements       = [ ]
+        self.stride_type    = [ ]
+        self.weight_values  = [ ]
+        self.weight_indexes = [ ]
+        #############################
+        # BLENDER               # # #
+        #############################
+        self.object         = None
+        self.mesh           = None
+        self.faces          = [ ]
+        self.face_uvs       = [ ]
+        self.edges          = [ ]
+        self.vertices       = [ ]
+        self.uvs            = [ ]
+        #############################
+        # FLAGS                 # # #
+        #############################
+        self.has_texture    = False
+        self.has_armature   = False
+        self.load_armature  = False
+        self.has_animations = False
+        self.has_weights    = False
+
+class ModelInfo:
+    """
+    What probe_model() reports about a model file without importing it:
+    header data, element counts, bone names and (name, duration,
+    keyframe count) per clip. influences[n] is the number of vertices with
+    n bone weights, when the sidecar has them or probe_model() was asked to
+    count them; it stays empty otherwise.
+    """
+    
+    def __init__(self, filepath):
+        self.filepath     = filepath
+        self.size         = 0
+        self.mtime        = 0.0
+        self.version      = 0.0
+        self.name         = ''
+        self.stride       = [ ]
+        self.vertex_count = 0
+        self.face_count   = 0
+        self.bone_count   = 0
+        self.bone_names   = [ ]
+        self.clips        = [ ]     # (NAME, DURATION, KEYFRAME_COUNT)
+        self.influences   = [ ]
+        self.from_index   = False
+    
+    def has_weights(self):
+        return "BlendWeightArray" in self.stride
+    
+    def max_influences(self):
+        return len(self.influences) - 1 if self.influences else 0
+    
+    def to_dict(self):
+        info = dict(vars(self))
+        info["clips"]          = [list(clip) for clip in self.clips]
+        info["max_influences"] = self.max_influences()
+        return info
+
+
+class Skeleton:
+    
+    def __init__(self):
+        self.name          = ''
+        #############################
+        # FILE I/O              # # #
+        #############################
+        self.bone_count    = 0      # NUMBER OF BONES.
+        self.hash          = ''     # SEE skeleton_hash()
+        self.bone_index    = dict() # KEY: BONE_NAME
+        self.bind_pose     = dict() # KEY: BONE_ID | BONE_NAME
+        self.bone_pose     = dict() # KEY: BONE_ID | BONE_NAME
+        self.world_pose    = dict() # KEY: BONE_ID
+        self.skin_pose     = dict() # KEY: BONE_ID
+        #   (BONES, 4, 4) ARRAYS, ROWS AS IN THE FILE. KEY: BONE_ID
+        self.bind_matrices         = None # BIND POSE
+        self.inverse_bind_matrices = None # INVERTED BIND POSE
+        self.offset_matrices       = None # SKIN OFFSET
+        self.rest_matrices         = None # INVERTED SKIN OFFSET (EDIT BONES)
+        self.bone_name     = dict() # KEY: BONE_ID
+        self.bone_parent   = dict() # KEY: BONE_ID
+        #############################
+        # BLENDER               # # #
+        #############################
+        self.animations    = [ ]    #
+        self.object        = None   #
+        self.armature      = None   #
+        self.bones         = dict() #
+        self.poses         = dict() #
+        self.pose_cache    = None   # SEE PoseCache
+        #############################
+
+class Animation:
+    def __init__(self,name,time,frame_count):
+        self.name        = name
+        self.time        = time
+        self.frame_count = frame_count
+        self.key_frames  = [ ]
+        self.frames      = [ ]
+
+class Frame:
+    def __init__(self):
+        self.bone_matrices_index = dict()
+        self.bone_transforms     = dict()
+        self.world_transforms    = dict()
+        self.skin_transforms     = dict()
+        self.bone_matrices       = dict()
+        self.key_frames          = [ ]
+        self.bones               = [ ]
+        self.bone_names          = [ ]
+        self.times               = [ ]    
+        self.bone_mats           = [ ]
+        self.bone_locs           = dict()
+        self.bone_rots           = dict()
+           
+class KeyFrame:
+    def __init__(self,bone_index,bone_name,frame_time,mat):
+        self.bone_index = bone_index
+        self.bone_name  = bone_name
+        self.time       = frame_time
+        self.matrix     = mat
+        self.loc        = Vector((0,0,0))
+        self.rot        = Quaternion()
+
+class PoseCache:
+    """
+    Index-aligned pose bones and rest matrices of one armature, so the
+    animation builder does no RNA name lookups per frame. Rest matrices are
+    bone.matrix_local; local_rest is each bone's rest relative to its parent.
+    """
+    
+    def __init__(self, skeleton):
+        self.object     = skeleton.object
+        count           = skeleton.bone_count
+        pose_bones      = self.object.pose.bones
+        self.pose_bones = [None] * count
+        self.parents    = [-1] * count
+        self.order      = bone_order(skeleton)
+        self.rest       = np.tile(np.identity(4), (count, 1, 1))
+        for bone_index in range(0, count):
+            pose_bone = pose_bones.get(skeleton.bone_name[bone_index])
+            if pose_bone is None:
+                continue
+            self.pose_bones[bone_index] = pose_bone
+            self.rest[bone_index]       = np.array(pose_bone.bone.matrix_local)
+            if bone_index != 0:
+                self.parents[bone_index] = skeleton.bone_parent[bone_index]
+        
+        self.rest_inverse = np.linalg.inv(self.rest)
+        self.local_rest   = self.rest.copy()
+        for bone_index, parent_index in enumerate(self.parents):
+            if parent_index >= 0:
+                self.local_rest[bone_index] = self.rest_inverse[parent_index] @ self.rest[bone_index]
+        self.local_rest_inverse = np.linalg.inv(self.local_rest)
+        
+        # Every bone is keyed, the root included, so ZomboidExport gets the
+        # file's root track back rather than the rest pose.
+        self.keyed = [bone_index for bone_index in range(0, count) if self.pose_bones[bone_index] is not None]
+    
+    def basis_matrices(self, skin_poses):
+        """
+        (frames, bones, 4, 4) skin poses -> matrix_basis of every pose bone.
+        A keyed bone goes to skin pose @ rest; in Blender's terms
+        pose = parent pose @ local_rest @ basis, solved here for basis.
+        """
+        pose     = np.empty_like(skin_poses)
+        basis    = np.empty_like(skin_poses)
+        basis[:] = np.identity(4)
+        inverse  = dict() # KEY: BONE_ID, inverted pose of parent bones
+        keyed    = set(self.keyed)
+        for bone_index in self.order:
+            parent_index = self.parents[bone_index]
+            if parent_index >= 0:
+                parent_pose = pose[:, parent_index]
+                if parent_index not in inverse:
+                    inverse[parent_index] = np.linalg.inv(parent_pose)
+                parent_inverse = inverse[parent_index]
+            else:
+                parent_pose = parent_inverse = np.identity(4)
+            if bone_index in keyed:
+                pose[:, bone_index]  = skin_poses[:, bone_index] @ self.rest[bone_index]
+                basis[:, bone_index] = self.local_rest_inverse[bone_index] @ parent_inverse @ pose[:, bone_index]
+            else:
+                pose[:, bone_index]  = parent_pose @ self.local_rest[bone_index]
+        return basis
+
+
+class MeshRegistry:
+    """
+    Mesh content hash -> mesh data-block name, kept in the scene's
+    ZOMBOID_MESHES property. Validated on read like ArmatureRegistry.
+    """
+    
+    KEY = "ZOMBOID_MESHES"
+    
+    def __init__(self, scene):
+        self.scene = scene
+        if self.KEY not in scene:
+            scene[self.KEY] = dict()
+    
+    def add(self, mesh, key):
+        self.scene[self.KEY][key] = mesh.name
+    
+    def get(self, key):
+        entries = self.scene[self.KEY]
+        name    = entries.get(key)
+        if name is None:
+            return None
+        mesh = bpy.data.meshes.get(name)
+        if mesh is None or mesh.get("ZOMBOID_MESH_HASH") != key:
+            del entries[key]
+            return None
+        return mesh
+
+
+class ArmatureRegistry:
+    """
+    Skeleton hash -> armature object name and bone-id table, kept in the
+    scene's ZOMBOID_ARMATURES property so lookups do not scan bpy.data.
+    Entries are validated when read: a deleted, renamed or rebuilt armature
+    simply drops out of the registry.
+    """
+    
+    KEY    = "ZOMBOID_ARMATURES"
+    ACTIVE = "ZOMBOID_ACTIVE_ARMATURE"
+    
+    def __init__(self, scene):
+        self.scene = scene
+        if self.KEY not in scene:
+            scene[self.KEY] = dict()
+            self.migrate()
+    
+    def migrate(self):
+        # Scenes saved before the registry existed: index their Zomboid
+        # armatures once, in name order so the active one is predictable.
+        for object in sorted(bpy.data.objects, key=lambda object: object.name):
+            if object.type != 'ARMATURE' or object.get("ZOMBOID_ARMATURE", -1) == -1:
+                continue
+            key = object.get("ZOMBOID_SKELETON_HASH") or "legacy " + object.name[:48]
+            self.add(object, key, activate=self.ACTIVE not in self.scene)
+    
+    def add(self, object, key, bone_ids=None, activate=True):
+        if bone_ids is None:
+            bone_ids = bone_id_table(object)
+        self.scene[self.KEY][key] = {"object": object.name, "bone_ids": dict(bone_ids)}
+        if activate:
+            self.scene[self.ACTIVE] = key
+    
+    def get(self, key):
+        # Returns (object, bone_ids) or (None, None).
+        entries = self.scene[self.KEY]
+        entry   = entries.get(key)
+        if entry is None:
+            return None, None
+        object = bpy.data.objects.get(entry["object"])
+        if object is None or object.type != 'ARMATURE' or object.get("ZOMBOID_SKELETON_HASH", key) != key:
+            del entries[key]
+            return None, None
+        return object, {bone_name: int(index) for bone_name, index in entry["bone_ids"].items()}
+    
+    def active(self):
+        # The armature most recently imported or reused in this scene, else
+        # the first registered one that is still valid.
+        key = self.scene.get(self.ACTIVE)
+        if key is not None:
+            object, bone_ids = self.get(key)
+            if object:
+                return object, bone_ids
+        for key in sorted(self.scene[self.KEY].keys()):
+            object, bone_ids = self.get(key)
+            if object:
+                self.scene[self.ACTIVE] = key
+                return object, bone_ids
+        return None, None
+
+
+def menu_func_import(self, context):
+    self.layout.operator(ZomboidImport.bl_idname, text="Zomboid Mesh (.txt)")
+    
+def register():
+    bpy.utils.register_class(ZomboidImport)
+    bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
+
+def unregister():
+    bpy.utils.unregister_class(ZomboidImport)
+    bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
+
+#####################################################################################
+###                                                                               ###
+###   File I/O methods                                                            ###
+###                                                                               ###
+#####################################################################################                   
+          
+def read_line(file):
+    string = '#'
+    while string.startswith("#"):
+        string = str(file.readline().strip())
+    return string
+  
+                  
+def read_int(file):
+    return int(read_line(file))
+
+
+def read_float(file):
+    return float(read_line(file))
+
+
+def read_vector(file):
+    line = read_line(file)
+    split = line.split(", ")
+    var = Vector((float(split[0]), float(split[1]), float(split[2])))
+    return var
+
+
+def read_quaternion(file):
+    line = read_line(file)
+    split = line.split(", ")
+    
+    x = float(split[0])
+    y = float(split[1])
+    z = float(split[2])
+    w = float(split[3])
+    return Quaternion((w,x,y,z))
+
+def normalise(q):
+    len = length(q)
+    if len != 0.0:
+        l = 1.0 / len
+        scale(q,l)
+
+def scale(q,l):
+    q.x = q.x * l
+    q.y = q.y * l
+    q.z = q.z * l
+    q.w = q.w * l
+
+def length(q):
+    return math.sqrt(length_squared(q))
+
+def length_squared(q):
+    return (q.x * q.x + q.y * q.y + q.z * q.z + q.w * q.w)
+
+def create_from_quaternion(q):
+    
+    if length(q) > 0.0:
+        normalise(q)
+    
+    xx = q.x * q.x
+    xy = q.x * q.y
+    xz = q.x * q.z
+    wx = q.x * q.w
+    yy = q.y * q.y
+    yz = q.y * q.z
+    wy = q.y * q.w
+    zz = q.z * q.z
+    wz = q.z * q.w
+ 
+    mat = Matrix4f()
+    
+    mat.m00 = 1.0 - 2.0 * (yy + zz)
+    mat.m10 =       2.0 * (xy - wz)
+    mat.m20 =       2.0 * (xz + wy)
+    mat.m30 =       0.0
+    mat.m01 =       2.0 * (xy + wz)
+    mat.m11 = 1.0 - 2.0 * (xx + zz)
+    mat.m21 =       2.0 * (yz - wx) * 1.0
+    mat.m31 =       0.0
+    mat.m02 =       2.0 * (xz - wy)
+    mat.m12 =       2.0 * (yz + wx)
+    mat.m22 = 1.0 - 2.0 * (xx + yy)
+    mat.m32 =       0.0
+    mat.m03 =       0.0
+    mat.m13 =       0.0
+    mat.m23 =       0.0
+    mat.m33 =       1.0
+    mat.m30 =       0.0
+    mat.m31 =       0.0
+    mat.m32 =       0.0
+   
+#    mat = Matrix(
+#          ([m00, m01, m02, m03],
+#           [m10, m11, m12, m13],
+#           [m20, m21, m22, m23],
+#           [m30, m31, m32, m33])).copy().transposed()
+    
+    return transpose(mat,None)    
+
+def create_from_quaternion_position(rotation, position):
+    mat = create_from_quaternion(rotation)
+    mat2 = Matrix4f()
+    mat2 = translate(position, mat2, None)
+    mat2 = transpose(mat2, None)
+    mat3 = Matrix4f()
+    mul(mat, mat2, mat3)
+    return mat3
+
+def read_matrix(file):
+    s1 = read_line(file).split(", ")
+    s2 = read_line(file).split(", ")
+    s3 = read_line(file).split(", ")
+    s4 = read_line(file).split(", ")
+    
+    mat = Matrix4f()
+    
+    mat.m00 = float(s1[0])
+    mat.m01 = float(s1[1])
+    mat.m02 = float(s1[2])
+    mat.m03 = float(s1[3])
+    mat.m10 = float(s2[0])
+    mat.m11 = float(s2[1])
+    mat.m12 = float(s2[2])
+    mat.m13 = float(s2[3])
+    mat.m20 = float(s3[0])
+    mat.m21 = float(s3[1])
+    mat.m22 = float(s3[2])
+    mat.m23 = float(s3[3])
+    mat.m30 = float(s4[0])
+    mat.m31 = float(s4[1])
+    mat.m32 = float(s4[2])
+    mat.m33 = float(s4[3])
+
+    return mat    
+
+def read_matrix_array(file, count):
+    # count blocks of a bone index and 4 matrix rows -> (count, 4, 4) array.
+    array = np.tile(np.identity(4), (count, 1, 1))
+    for index in range(0, count):
+        bone_index = read_int(file)
+        for row in range(0, 4):
+            array[bone_index, row] = [float(value) for value in read_line(file).split(", ")]
+    return array
+
+
+def skip_matrix_array(file, count):
+    # Same layout as read_matrix_array, read without parsing.
+    for index in range(0, count * 5):
+        read_line(file)
+
+
+#    m = Matrix(
+#        ([m00, m01, m02, m03],
+#         [m04, m05, m06, m07],
+#         [m08, m09, m10, m11],
+#         [m12, m13, m14, m15]))
+#
+#    m = Matrix(
+#        ([m00, m10, m20, m30],
+#         [m01, m11, m21, m31],
+#         [m02, m12, m22, m32],
+#         [m03, m13, m23, m33]))
+#         
+#    return m.transposed()
+
+
+def read_model_header(file, z):
+    # Version, name and vertex stride into the ZMesh z. Shared by the
+    # operator and probe_model().
+    z.version       = read_float(file)
+    z.name          = read_line(file)
+    z.element_count = read_int(file)
+    read_int(file)
+    
+    for x in range(0, z.element_count):
+        value = read_line(file)
+        type  = read_line(file)
+        z.stride_type.append(type)
+        
+        if type == "TextureCoordArray":
+            z.has_texture = True
+        elif type == "BlendWeightArray":
+            z.has_weights = True
+
+
+def probe_model(filepath, use_index=True, strict=False, influences=False):
+    """
+    Returns a ModelInfo for a model file without building anything. The
+    header is parsed; with an up to date .idx sidecar everything else comes
+    from it, otherwise blocks are skipped line by line using their declared
+    counts and only bone names and clip headers are read. strict is passed
+    on to load_model_index(). The bone weights per vertex come from the
+    sidecar when it has them; with influences they are counted otherwise,
+    which reads the weight rows.
+    """
+    info       = ModelInfo(filepath)
+    stat       = os.stat(filepath)
+    info.size  = stat.st_size
+    info.mtime = stat.st_mtime
+    index      = load_model_index(filepath, strict) if use_index else None
+    
+    with io.open(filepath, 'r') as file:
+        z = ZMesh()
+        read_model_header(file, z)
+        info.version  = z.version
+        info.name     = z.name
+        info.stride   = z.stride_type
+        element_count = z.element_count
+        
+        if index:
+            counts            = index["counts"]
+            info.vertex_count = counts["vertices"]
+            info.face_count   = counts["faces"]
+            info.bone_count   = counts["bones"]
+            info.bone_names   = list(index.get("bones", []))
+            info.clips        = [(clip["name"], clip["duration"], clip["keyframes"]) for clip in index.get("clips", [])]
+            info.from_index   = True
+            if z.has_weights:
+                info.influences = index.get("influences") or []
+                if influences and not info.influences:
+                    file.seek(index["sections"]["vertex_buffer"])
+                    read_int(file)
+                    info.influences = count_influences(file, info.vertex_count, z.stride_type)
+            return info
+        
+        info.vertex_count = read_int(file)
+        if influences and z.has_weights:
+            info.influences = count_influences(file, info.vertex_count, z.stride_type)
+        else:
+            skip_lines(file, info.vertex_count * element_count)
+        info.face_count = read_int(file)
+        skip_lines(file, info.face_count)
+        
+        # Like read_model, a model may end after its faces or its skeleton.
+        try:
+            info.bone_count = read_int(file)
+        except ValueError:
+            return info
+        names = dict() # KEY: BONE INDEX
+        for x in range(0, info.bone_count):
+            bone_index = read_int(file)
+            read_int(file)
+            names[bone_index] = read_line(file)
+        info.bone_names = [names.get(bone_index, '') for bone_index in range(0, info.bone_count)]
+        # Bind pose, inverse bind pose and skin offsets: an index and 4 rows per bone.
+        skip_lines(file, info.bone_count * 15)
+        
+        try:
+            clip_count = read_int(file)
+        except ValueError:
+            return info
+        for x in range(0, clip_count):
+            name      = read_line(file)
+            duration  = read_float(file)
+            keyframes = read_int(file)
+            info.clips.append((name, duration, keyframes))
+            skip_lines(file, keyframes * 5)
+    return info
+
+
+def skip_lines(file, count):
+    # Moves past count data lines; comment lines do not count.
+    while count > 0:
+        line = file.readline()
+        if not line:
+            break
+        if not line.lstrip().startswith("#"):
+            count -= 1
+
+
+def count_influences(file, vertex_count, stride):
+    # Histogram of used weight slots (not padded with -1.0) per vertex, read
+    # from the vertex buffer with every other element skipped.
+    weight_offset = stride.index("BlendWeightArray")
+    histogram     = [0]
+    for x in range(0, vertex_count):
+        skip_lines(file, weight_offset)
+        used = sum(1 for value in read_line(file).split(",") if float(value) >= 0.0)
+        if used >= len(histogram):
+            histogram += [0] * (used + 1 - len(histogram))
+        histogram[used] += 1
+        skip_lines(file, len(stride) - weight_offset - 1)
+    return histogram
+
+
+def load_model_index(filepath, strict=False):
+    # The exporter's .idx sidecar for filepath, or None when there is none,
+    # it cannot be read or the model changed since it was written. A model
+    # with the recorded size and mtime is taken as unchanged; the SHA-1 is
+    # only checked when the mtime differs (a copy or a touch) or if strict.
+    index_path = filepath + INDEX_EXTENSION
+    if not os.path.exists(index_path):
+        return None
+    try:
+        with io.open(index_path, 'r') as file:
+            index = json.load(file)
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError("unknown version %r" % index.get("version"))
+        for section in ("header", "vertex_buffer", "faces"):
+            int(index["sections"][section])
+        stat    = os.stat(filepath)
+        changed = index["size"] != stat.st_size
+        if not changed and (strict or index.get("mtime_ns") != stat.st_mtime_ns):
+            changed = index["sha1"] != file_sha1(filepath)
+        if changed:
+            log.info("Index %s is out of date, reading the whole model.", index_path)
+            return None
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+        log.warning("Ignoring index %s: %s", index_path, error)
+        return None
+    return index
+
+
+def mesh_hash(z, bone_names, optimized):
+    # Identifies the mesh data create_mesh would build: geometry, UVs,
+    # weights, the vertex group order they refer to and the optimize pass.
+    sha = hashlib.sha1()
+    sha.update(("%d|%d|%s\n" % (len(z.vertices), len(z.faces), optimized)).encode('utf-8'))
+    sha.update("|".join(bone_names).encode('utf-8'))
+    sha.update(np.asarray(z.vertices, dtype='<f8').tobytes())
+    sha.update(np.asarray(z.faces, dtype='<i8').tobytes())
+    if z.has_texture:
+        sha.update(np.asarray(z.uvs, dtype='<f8').tobytes())
+    if z.has_armature:
+        for rows, dtype in ((z.weight_indexes, '<i8'), (z.weight_values, '<f8')):
+            sha.update(np.asarray([len(row) for row in rows], dtype='<i8').tobytes())
+            if rows:
+                sha.update(np.concatenate([np.asarray(row, dtype=dtype) for row in rows]).tobytes())
+    return sha.hexdigest()
+
+
+def skeleton_hash(skeleton):
+    # Identifies a skeleton by bone names, parents and skin offsets, so every
+    # file sharing the Bip01 hierarchy can share one armature. Offsets are
+    # rounded to 5 decimals to ignore float noise from text round trips.
+    sha = hashlib.sha1()
+    for index in range(0, skeleton.bone_count):
+        sha.update(("%s|%d\n" % (skeleton.bone_name[index], skeleton.bone_parent[index])).encode('utf-8'))
+    offsets = np.round(skeleton.offset_matrices, 5) + 0.0
+    sha.update(offsets.astype('<f8').tobytes())
+    return sha.hexdigest()
+
+
+def bone_order(skeleton):
+    # Bone indices with every parent ahead of its children.
+    # Bone 0 is the root whatever its parent says, as in create_armature.
+    depth = dict()
+    for bone_index in range(0, skeleton.bone_count):
+        level  = 0
+        seen   = set([bone_index])
+        parent = skeleton.bone_parent.get(bone_index, -1) if bone_index != 0 else -1
+        while parent >= 0 and parent not in seen:
+            seen.add(parent)
+            level += 1
+            parent = skeleton.bone_parent.get(parent, -1) if parent != 0 else -1
+        depth[bone_index] = level
+    return sorted(range(0, skeleton.bone_count), key=lambda bone_index: (depth[bone_index], bone_index))
+
+
+def quaternion_matrix_array(quaternions):
+    # (..., 4) w, x, y, z -> (..., 3, 3) rotation matrices, normalising like
+    # create_from_quaternion (zero quaternions give the identity).
+    length = np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    q      = np.divide(quaternions, length, out=np.zeros_like(quaternions), where=length > 0.0)
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    matrix = np.empty(q.shape[:-1] + (3, 3))
+    matrix[..., 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    matrix[..., 0, 1] =       2.0 * (x * y - w * z)
+    matrix[..., 0, 2] =       2.0 * (x * z + w * y)
+    matrix[..., 1, 0] =       2.0 * (x * y + w * z)
+    matrix[..., 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    matrix[..., 1, 2] =       2.0 * (y * z - w * x)
+    matrix[..., 2, 0] =       2.0 * (x * z - w * y)
+    matrix[..., 2, 1] =       2.0 * (y * z + w * x)
+    matrix[..., 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    return matrix
+
+
+def rotation_data_path(pose_bone):
+    # The rotation channel keyframe_insert_menu(type='Rotation') would key.
+    if pose_bone.rotation_mode == 'QUATERNION':
+        return "rotation_quaternion"
+    if pose_bone.rotation_mode == 'AXIS_ANGLE':
+        return "rotation_axis_angle"
+    return "rotation_euler"
+
+
+def quat_equals(q1,q2):
+    return q1.w == q2.w and q1.x == q2.x and q1.y == q2.y and q1.z == q2.z
+
+
+quat_transform_y_positive = Euler((pi/2, 0, 0),"XYZ").to_quaternion()
+
+m4 = Matrix(
+        ([1, 0, 0, 0],
+         [0, 0, -1, 0],
+         [0, 1, 0, 0],
+         [0, 0, 0, 1]))
+
+m3 = Matrix(
+        ([1, 0, 0],
+         [0, 0, -1],
+         [0, 1, 0]))
+
+matrix_3_transform_y_positive = Matrix((( 1, 0, 0 )   ,( 0, 0, 1 )   ,( 0,-1, 0 )                  ))
+matrix_4_transform_y_positive = Matrix((( 1, 0, 0, 0 ),( 0, 0, 1, 0 ),( 0,-1, 0, 0 ),( 0, 0, 0, 1 )))
+matrix_3_transform_z_positive = Matrix((( 1, 0, 0 )   ,( 0, 0,-1 )   ,( 0, 1, 0 )                  ))
+matrix_4_transform_z_positive = Matrix((( 1, 0, 0, 0 ),( 0, 0,-1, 0 ),( 0, 1, 0, 0 ),( 0, 0, 0, 1 )))
+
+class Matrix4f():
+    
+    def __init__(self):
+        self.m00 = 1.0
+        self.m01 = 0.0
+        self.m02 = 0.0
+        self.m03 = 0.0
+        self.m10 = 0.0
+        self.m11 = 1.0
+        self.m12 = 0.0
+        self.m13 = 0.0
+        self.m20 = 0.0
+        self.m21 = 0.0
+        self.m22 = 1.0
+        self.m23 = 0.0
+        self.m30 = 0.0
+        self.m31 = 0.0
+        self.m32 = 0.0
+        self.m33 = 1.0
+        
+    def __str__(self):
+        return 'Matrix4f' + '\n[' + efloat(self.m00) + ', ' + efloat(self.m01) + ', ' + efloat(self.m02) + ', ' + efloat(self.m03) + '],\n[' + efloat(self.m10) + ', ' + efloat(self.m11) + ', ' + efloat(self.m12) + ', ' + efloat(self.m13) + '],\n[' + efloat(self.m20) + ', ' + efloat(self.m21) + ', ' + efloat(self.m22) + ', ' + efloat(self.m23) + '],\n[' + efloat(self.m30) + ', ' + efloat(self.m31) + ', ' + efloat(self.m32) + ', ' + efloat(self.m33) + ']'
+        
+    def set_identity(self):
+        self.m00 = 1.0
+        self.m01 = 0.0
+        self.m02 = 0.0
+        self.m03 = 0.0
+        self.m10 = 0.0
+        self.m11 = 1.0
+        self.m12 = 0.0
+        self.m13 = 0.0
+        self.m20 = 0.0
+        self.m21 = 0.0
+        self.m22 = 1.0
+        self.m23 = 0.0
+        self.m30 = 0.0
+        self.m31 = 0.0
+        self.m32 = 0.0
+        self.m33 = 1.0
+        
+    def copy(self):
+        nm = Matrix4f()
+        nm.m00 = self.m00
+        nm.m01 = self.m01
+        nm.m02 = self.m02
+        nm.m03 = self.m03
+        nm.m10 = self.m10
+        nm.m11 = self.m11
+        nm.m12 = self.m12
+        nm.m13 = self.m13
+        nm.m20 = self.m20
+        nm.m21 = self.m21
+        nm.m22 = self.m22
+        nm.m23 = self.m23
+        nm.m30 = self.m30
+        nm.m31 = self.m31
+        nm.m32 = self.m32
+        nm.m33 = self.m33
+        return nm
+    
+    def to_blender_matrix(self):
+        m = Matrix(
+         ([self.m00, self.m10, self.m20, self.m30],
+          [self.m01, self.m11, self.m21, self.m31],
+          [self.m02, self.m12, self.m22, self.m32],
+          [self.m03, self.m13, self.m23, self.m33]))
+        return m.transposed()
+
+def to_lwjgl_matrix(blender_matrix):
+    m = Matrix4f()
+    b = blender_matrix.copy().transposed()
+    m.m00 = b[0][0]
+    m.m01 = b[1][0]
+    m.m02 = b[2][0]
+    m.m03 = b[3][0]
+    m.m10 = b[0][1]
+    m.m11 = b[1][1]
+    m.m12 = b[2][1]
+    m.m13 = b[3][1]
+    m.m20 = b[0][2]
+    m.m21 = b[1][2]
+    m.m22 = b[2][2]
+    m.m23 = b[3][2]
+    m.m30 = b[0][3]
+    m.m31 = b[1][3]
+    m.m32 = b[2][3]
+    m.m33 = b[3][3]
+    return m
+
+def translate(vec, src, dest):
+    if dest == None:
+        dest = Matrix4f()
+    
+    dest.m30 += src.m00 * vec.x + src.m10 * vec.y + src.m20 * vec.z
+    dest.m31 += src.m01 * vec.x + src.m11 * vec.y + src.m21 * vec.z
+    dest.m32 += src.m02 * vec.x + src.m12 * vec.y + src.m22 * vec.z
+    dest.m33 += src.m03 * vec.x + src.m13 * vec.y + src.m23 * vec.z
+    
+    return dest
+
+def mul(left,right,dest):
+    if dest == None:
+        dest = Matrix4f()
+    
+    m00 = left.m00 * right.m00 + left.m10 * right.m01 + left.m20 * right.m02 + left.m30 * right.m03
+    m01 = left.m01 * right.m00 + left.m11 * right.m01 + left.m21 * right.m02 + left.m31 * right.m03
+    m02 = left.m02 * right.m00 + left.m12 * right.m01 + left.m22 * right.m02 + left.m32 * right.m03
+    m03 = left.m03 * right.m00 + left.m13 * right.m01 + left.m23 * right.m02 + left.m33 * right.m03
+    m10 = left.m00 * right.m10 + left.m10 * right.m11 + left.m20 * right.m12 + left.m30 * right.m13
+    m11 = left.m01 * right.m10 + left.m11 * right.m11 + left.m21 * right.m12 + left.m31 * right.m13
+    m12 = left.m02 * right.m10 + left.m12 * right.m11 + left.m22 * right.m12 + left.m32 * right.m13
+    m13 = left.m03 * right.m10 + left.m13 * right.m11 + left.m23 * right.m12 + left.m33 * right.m13
+    m20 = left.m00 * right.m20 + left.m10 * right.m21 + left.m20 * right.m22 + left.m30 * right.m23
+    m21 = left.m01 * right.m20 + left.m11 * right.m21 + left.m21 * right.m22 + left.m31 * right.m23
+    m22 = left.m02 * right.m20 + left.m12 * right.m21 + left.m22 * right.m22 + left.m32 * right.m23
+    m23 = left.m03 * right.m20 + left.m13 * right.m21 + left.m23 * right.m22 + left.m33 * right.m23
+    m30 = left.m00 * right.m30 + left.m10 * right.m31 + left.m20 * right.m32 + left.m30 * right.m33
+    m31 = left.m01 * right.m30 + left.m11 * right.m31 + left.m21 * right.m32 + left.m31 * right.m33
+    m32 = left.m02 * right.m30 + left.m12 * right.m31 + left.m22 * right.m32 + left.m32 * right.m33
+    m33 = left.m03 * right.m30 + left.m13 * right.m31 + left.m23 * right.m32 + left.m33 * right.m33
+    dest.m00 = m00
+    dest.m01 = m01
+    dest.m02 = m02
+    dest.m03 = m03
+    dest.m10 = m10
+    dest.m11 = m11
+    dest.m12 = m12
+    dest.m13 = m13
+    dest.m20 = m20
+    dest.m21 = m21
+    dest.m22 = m22
+    dest.m23 = m23
+    dest.m30 = m30
+    dest.m31 = m31
+    dest.m32 = m32
+    dest.m33 = m33
+    
+    return dest
+
+def transpose(src, dest):
+    if dest == None:
+        dest = Matrix4f()
+    
+    m00 = src.m00
+    m01 = src.m10
+    m02 = src.m20
+    m03 = src.m30
+    m10 = src.m01
+    m11 = src.m11
+    m12 = src.m21
+    m13 = src.m31
+    m20 = src.m02
+    m21 = src.m12
+    m22 = src.m22
+    m23 = src.m32
+    m30 = src.m03
+    m31 = src.m13
+    m32 = src.m23
+    m33 = src.m33
+    dest.m00 = m00
+    dest.m01 = m01
+    dest.m02 = m02
+    dest.m03 = m03
+    dest.m10 = m10
+    dest.m11 = m11
+    dest.m12 = m12
+    dest.m13 = m13
+    dest.m20 = m20
+    dest.m21 = m21
+    dest.m22 = m22
+    dest.m23 = m23
+    dest.m30 = m30
+    dest.m31 = m31
+    dest.m32 = m32
+    dest.m33 = m33
+    
+    return dest
+
+scale_matrix_4 = Matrix(
+                ([-1,0,0,0],
+                 [ 0,1,0,0],
+                 [ 0,0,1,0],
+                 [ 0,0,0,1]))
+  
+def get_keyframes(obj_list):
+    keyframes = []
+    for obj in obj_list:
+        anim = obj.animation_data
+        if anim is not None and anim.action is not None:
+            for fcu in anim.action.fcurves:
+                for keyframe in fcu.keyframe_points:
+                    x, y = keyframe.co
+                    if x not in keyframes:
+                        keyframes.append((math.ceil(x)))
+    return keyframes
+
+def efloat(float, decimals=8):
+    # Shortest fixed-point text that holds the value to the given decimals.
+    text = ("%.*f" % (decimals, float)).rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
@@ -0,0 +1,39 @@
+# Author: Jab (or 40BlocksUnder) | Joshua Edwards
+# Link for more info: http://theindiestone.com/forums/index.php/topic/12864-blender
+# Imports and exports models in Zomboid format.
+
+bl_info = {
+    "name": "Zomboid Import/Export",
+    "description": "Imports and exports models in Zomboid format.",
+    "author": "Runda",
+    "version": (1, 0),
+    "blender": (2, 90, 0),
+    "location": "File > Import, File > Export",
+    "warning": "", # used for warning icon and text in addons panel
+    "wiki_url": "http://theindiestone.com/forums/index.php/topic/12864-blender"
+                "Scripts/My_Script",
+    "tracker_url": "https://developer.blender.org/maniphest/task/edit/form/2/",
+    "support": "COMMUNITY",
+    "category": "Import-Export",
+}
+
+
+# Reloading the add-on (F3 > Reload Scripts) reloads the modules too.
+if "bpy" in locals():
+    import importlib
+    importlib.reload(shared)
+    importlib.reload(ZomboidImportNew)
+    importlib.reload(ZomboidExportNew)
+else:
+    from . import shared, ZomboidImportNew, ZomboidExportNew
+
+import bpy
+
+
+def register():
+    ZomboidImportNew.register()
+    ZomboidExportNew.register()
+
+def unregister():
+    ZomboidExportNew.unregister()
+    ZomboidImportNew.unregister()
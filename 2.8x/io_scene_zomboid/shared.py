@@ -0,0 +1,270 @@
+# Author: Jab (or 40BlocksUnder) | Joshua Edwards
+# Link for more info: http://theindiestone.com/forums/index.php/topic/12864-blender
+# Helpers shared by ZomboidImport and ZomboidExport: logging, stage timing
+# and profiling, operator counting, the .idx sidecar constants and bone ids.
+
+import gc,hashlib,io,json,logging,os,pstats,time,tracemalloc,bpy
+
+from contextlib import contextmanager
+
+# Sidecar ZomboidExport writes next to a model and ZomboidImport reads.
+INDEX_EXTENSION = ".idx"
+INDEX_VERSION   = 1
+
+VERBOSITY_ITEMS = (
+    ('ERROR',   "Errors",   "Only report errors"),
+    ('WARNING', "Warnings", "Report problems with the file, scene or selection"),
+    ('INFO',    "Info",     "Report each import or export step"),
+    ('DEBUG',   "Debug",    "Report every bone and clip (slow on large rigs)"),
+)
+
+
+def get_logger(name):
+    # One leveled logger per operator ("zomboid.import", "zomboid.export")
+    # with its own handler, so the Verbosity option works without touching
+    # Blender's root logger.
+    log = logging.getLogger(name)
+    if not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(name)s: %(levelname)s: %(message)s"))
+        log.addHandler(handler)
+        log.propagate = False
+    return log
+
+
+class StageStats:
+    """
+    Wall-clock timings and element counters for each stage of one operator run.
+    
+    With trace_memory, tracemalloc also records the peak and retained Python
+    heap of every stage and its top allocation sites. Blender's own C data is
+    not traced, and the snapshots slow every stage down, so timings taken in
+    this mode are not comparable with normal runs.
+    """
+    
+    def __init__(self, operator, trace_memory=False, top_sites=10):
+        self.operator     = operator
+        self.stages       = [ ]     # (NAME, SECONDS, DEPTH) IN EXECUTION ORDER.
+        self.counters     = dict()  # KEY: COUNTER_NAME
+        self.memory       = dict()  # KEY: STAGE_INDEX
+        self.released     = dict()  # KEY: STRUCTURE_NAME
+        self.operators    = dict()  # KEY: OPERATOR_IDNAME
+        self.depth        = 0
+        self.trace_memory = trace_memory
+        self.top_sites    = top_sites
+        self.peaks        = [ ]     # RUNNING PEAK OF EACH OPEN STAGE.
+        self.own_tracing  = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.own_tracing = True
+    
+    @contextmanager
+    def stage(self, name):
+        depth      = self.depth
+        index      = len(self.stages)
+        self.depth = depth + 1
+        self.stages.append((name, 0.0, depth))
+        if self.trace_memory:
+            snapshot, current = self.begin_memory()
+        start      = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[index] = (name, time.perf_counter() - start, depth)
+            self.depth = depth
+            if self.trace_memory:
+                self.memory[index] = self.end_memory(snapshot, current)
+    
+    def begin_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        if self.peaks:
+            self.peaks[-1] = max(self.peaks[-1], peak)
+        reset_peak()
+        self.peaks.append(current)
+        return take_snapshot(), current
+    
+    def end_memory(self, snapshot, before):
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(self.peaks.pop(), peak)
+        if self.peaks:
+            self.peaks[-1] = max(self.peaks[-1], peak)
+        sites = take_snapshot().compare_to(snapshot, 'lineno')[:self.top_sites]
+        reset_peak()
+        return {
+            "peak_bytes"     : peak - before,
+            "retained_bytes" : current - before,
+            "top_sites"      : [{"site": str(site.traceback), "size_diff": site.size_diff, "count_diff": site.count_diff} for site in sites],
+        }
+    
+    def check_released(self, name, reference):
+        # reference is a weakref taken before the operator dropped its last use of the structure.
+        gc.collect()
+        self.released[name] = reference() is None
+    
+    def finish(self):
+        if self.own_tracing:
+            tracemalloc.stop()
+            self.own_tracing = False
+    
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+    
+    def total(self):
+        return sum(seconds for name, seconds, depth in self.stages if depth == 0)
+    
+    def to_dict(self):
+        stages = [ ]
+        for index, (name, seconds, depth) in enumerate(self.stages):
+            stage = {"name": name, "seconds": seconds, "depth": depth}
+            if index in self.memory:
+                stage["memory"] = self.memory[index]
+            stages.append(stage)
+        return {
+            "operator"      : self.operator,
+            "total_seconds" : self.total(),
+            "stages"        : stages,
+            "counters"      : dict(self.counters),
+            "released"      : dict(self.released),
+            "operators"     : dict(self.operators),
+        }
+    
+    def write_json(self, filepath):
+        with io.open(filepath, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2, sort_keys=True)
+    
+    def summary(self):
+        stages = ", ".join("%s %.1f ms" % (name, seconds * 1000.0) for name, seconds, depth in self.stages if depth == 0)
+        result = "%s: %.1f ms (%s)" % (self.operator, self.total() * 1000.0, stages)
+        if self.memory:
+            peak   = max(memory["peak_bytes"] for memory in self.memory.values())
+            result = result + ", peak %.1f MB" % (peak / 1048576.0)
+        if 'operator_calls' in self.counters:
+            result = result + ", %d operator calls, %d depsgraph updates, %d undo pushes" % (
+                self.counters['operator_calls'], self.counters['depsgraph_updates'], self.counters['undo_pushes'])
+        leaked = [name for name, released in self.released.items() if not released]
+        if leaked:
+            result = result + ", still referenced: " + ", ".join(leaked)
+        return result
+
+
+class OperatorCounter:
+    """
+    Counts bpy.ops calls by name, depsgraph updates and undo pushes while
+    started, and adds the totals to a StageStats. bpy.ops is swapped for a
+    counting proxy, so operators run by other code at the same time count
+    too. Undo pushes are estimated as calls to operators flagged 'UNDO'.
+    """
+    
+    def __init__(self, stats):
+        self.stats             = stats
+        self.operators         = dict()  # KEY: OPERATOR_IDNAME
+        self.depsgraph_updates = 0
+        self.undo_pushes       = 0
+        self.ops               = None
+    
+    def start(self):
+        self.ops = bpy.ops
+        bpy.ops  = CountingOps(self.ops, self)
+        bpy.app.handlers.depsgraph_update_post.append(self.on_depsgraph_update)
+    
+    def stop(self):
+        if self.ops is None:
+            return
+        bpy.ops  = self.ops
+        self.ops = None
+        if self.on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+            bpy.app.handlers.depsgraph_update_post.remove(self.on_depsgraph_update)
+        self.stats.operators.update(self.operators)
+        self.stats.count('operator_calls', sum(self.operators.values()))
+        self.stats.count('depsgraph_updates', self.depsgraph_updates)
+        self.stats.count('undo_pushes', self.undo_pushes)
+    
+    def on_depsgraph_update(self, *args):
+        self.depsgraph_updates += 1
+    
+    def record(self, idname, operator):
+        self.operators[idname] = self.operators.get(idname, 0) + 1
+        try:
+            if 'UNDO' in operator.bl_options:
+                self.undo_pushes += 1
+        except (AttributeError, KeyError, RuntimeError, TypeError):
+            pass
+
+
+class CountingOps:
+    def __init__(self, ops, counter):
+        self.ops     = ops
+        self.counter = counter
+    
+    def __getattr__(self, module):
+        return CountingOpsModule(module, getattr(self.ops, module), self.counter)
+
+
+class CountingOpsModule:
+    def __init__(self, name, module, counter):
+        self.name    = name
+        self.module  = module
+        self.counter = counter
+    
+    def __getattr__(self, name):
+        operator = getattr(self.module, name)
+        idname   = self.name + "." + name
+        counter  = self.counter
+        
+        def call(*args, **kwargs):
+            counter.record(idname, operator)
+            return operator(*args, **kwargs)
+        return call
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+
+def reset_peak():
+    # tracemalloc.reset_peak() only exists from Python 3.9 (Blender 2.93).
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+
+
+def profiling_requested(flag, variable):
+    # Operator flag, or an environment variable for runs started from menus or scripts.
+    return bool(flag) or os.environ.get(variable, "") not in ("", "0")
+
+def write_profile(profiler, filepath, stats, top=40):
+    # A .pstats file for pstats/snakeviz plus a readable top-N summary, both
+    # tagged with what was processed so field reports can be compared.
+    profiler.dump_stats(filepath + ".pstats")
+    counters = stats.counters
+    size     = os.path.getsize(filepath) if os.path.exists(filepath) else 0
+    with io.open(filepath + ".profile.txt", 'w') as file:
+        file.write("# Operator: %s\n" % stats.operator)
+        file.write("# Blender:  %s\n" % bpy.app.version_string)
+        file.write("# File:     %s (%d bytes)\n" % (os.path.basename(filepath), size))
+        file.write("# Counts:   %d vertices, %d faces, %d bones, %d clips\n" % (
+            counters.get('vertices', 0), counters.get('faces', 0), counters.get('bones', 0), counters.get('animations', 0)))
+        file.write("# Stages:   %s\n\n" % stats.summary())
+        pstats.Stats(profiler, stream=file).sort_stats('cumulative').print_stats(top)
+
+
+def file_sha1(filepath, chunk_size=1 << 20):
+    sha = hashlib.sha1()
+    with io.open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def bone_id_table(armature_object):
+    # Bone name -> Zomboid bone index. Armatures imported before ZOMBOID_BONE_IDS
+    # existed carry one custom property per bone instead.
+    bone_ids = armature_object.get("ZOMBOID_BONE_IDS")
+    if bone_ids is not None:
+        return {bone_name: int(index) for bone_name, index in bone_ids.items()}
+    table = dict()
+    for bone in armature_object.data.bones:
+        try:
+            table[bone.name] = int(armature_object[bone.name])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return table
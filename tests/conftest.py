@@ -0,0 +1,20 @@
+# The add-on package is imported with the bpy/mathutils stand-ins from
+# tools/blender_shim, the same way the command line tools load them.
+
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+import zomboid_common
+
+
+@pytest.fixture(scope="session")
+def exporter():
+    return zomboid_common.load_addon(zomboid_common.EXPORTER)
+
+
+@pytest.fixture(scope="session")
+def importer():
+    return zomboid_common.load_addon(zomboid_common.IMPORTER)
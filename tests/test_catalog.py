@@ -0,0 +1,55 @@
+import os
+
+import zomboid_catalog
+import zomboid_generate
+
+
+def make_library(root):
+    os.makedirs(str(root))
+    zomboid_generate.generate_model(str(root / "static.txt"), vertex_count=100, stride=zomboid_generate.STATIC_STRIDE)
+    zomboid_generate.generate_model(str(root / "four.txt"), vertex_count=100, bone_count=8)
+    zomboid_generate.generate_model(str(root / "six.txt"), vertex_count=100, bone_count=8, max_influences=6)
+
+
+def test_probe_counts_influences(importer, tmp_path):
+    make_library(tmp_path / "mod")
+    six    = importer.probe_model(str(tmp_path / "mod" / "six.txt"), influences=True)
+    static = importer.probe_model(str(tmp_path / "mod" / "static.txt"), influences=True)
+    assert six.influences == [0, 0, 0, 0, 0, 0, 100] and six.max_influences() == 6
+    assert static.influences == [] and static.max_influences() == 0
+    # Counting weights still leaves the reader at the faces.
+    assert six.face_count == importer.probe_model(str(tmp_path / "mod" / "six.txt")).face_count
+
+
+def test_query_models_needing_more_than_four_weights(tmp_path):
+    make_library(tmp_path / "mod")
+    with zomboid_catalog.Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        assert catalog.refresh(str(tmp_path / "mod"), workers=1, influences=True)["added"] == 3
+        assert [os.path.basename(row["path"]) for row in catalog.models(min_influences=5)] == ["six.txt"]
+        assert [row["max_influences"] for row in catalog.models()] == [4, 6, 0]
+
+
+def test_refresh_reads_headers_unless_asked_for_more(importer, tmp_path, monkeypatch):
+    make_library(tmp_path / "mod")
+    def unexpected(*args):
+        raise AssertionError("read more than the headers")
+    with zomboid_catalog.Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        with monkeypatch.context() as patch:
+            patch.setattr(importer, "count_influences", unexpected)
+            patch.setattr(zomboid_catalog, "section_hashes", unexpected)
+            assert catalog.refresh(str(tmp_path / "mod"), workers=1)["added"] == 3
+        assert [row["max_influences"] for row in catalog.models()] == [None, None, 0]
+        assert catalog.duplicates() == []
+        # Asking for counts and hashes later probes the files that lack them.
+        counts = catalog.refresh(str(tmp_path / "mod"), workers=1, influences=True, hashes=True)
+        assert counts["updated"] == 3 and counts["unchanged"] == 0
+        assert [row["max_influences"] for row in catalog.models()] == [4, 6, 0]
+        assert catalog.refresh(str(tmp_path / "mod"), workers=1, influences=True, hashes=True)["unchanged"] == 3
+        assert catalog.sql("SELECT COUNT(DISTINCT path) AS hashed FROM sections") == [{"hashed": 3}]
+
+
+def test_default_database_is_in_the_cache_folder(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    with zomboid_catalog.Catalog() as catalog:
+        assert catalog.path == str(tmp_path / "cache" / "zomboid" / "catalog.sqlite")
+    assert os.path.exists(catalog.path)
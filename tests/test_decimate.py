@@ -0,0 +1,59 @@
+import numpy as np
+
+
+def wavy_grid(exporter, cells):
+    xs, ys = np.meshgrid(np.linspace(0.0, 1.0, cells + 1), np.linspace(0.0, 1.0, cells + 1))
+    xs, ys = xs.ravel(), ys.ravel()
+    buffer = exporter.MeshBuffer(len(xs))
+    buffer.positions = np.column_stack((xs, ys, 0.05 * np.sin(xs * 7.0) * np.cos(ys * 5.0)))
+    buffer.uvs       = np.column_stack((xs, ys))
+    buffer.weights[:, 0]  = 1.0
+    buffer.bone_ids[:, 0] = xs > 0.5
+    buffer.influences[:]  = 1
+    corner = (np.arange(cells)[:, None] * (cells + 1) + np.arange(cells)[None, :]).ravel()
+    buffer.triangles = np.concatenate((
+        np.column_stack((corner, corner + 1, corner + cells + 1)),
+        np.column_stack((corner + 1, corner + cells + 2, corner + cells + 1))))
+    return buffer
+
+
+def on_border(positions):
+    return np.isclose(positions[:, 0], 0.0) | np.isclose(positions[:, 0], 1.0) | np.isclose(positions[:, 1], 0.0) | np.isclose(positions[:, 1], 1.0)
+
+
+def test_decimate_halves_grid(exporter):
+    buffer = wavy_grid(exporter, 120)
+    rounds = []
+    lod    = exporter.decimate(buffer, buffer.face_count() // 2, trace=rounds.append)
+    
+    assert lod.face_count() == buffer.face_count() // 2
+    assert rounds[-1] == lod.face_count()
+    # Border vertices never move, and every kept vertex keeps its own data.
+    assert on_border(lod.positions).sum() == on_border(buffer.positions).sum()
+    np.testing.assert_array_equal(lod.uvs, lod.positions[:, :2])
+    corners = lod.positions[lod.triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    assert (np.linalg.norm(normals, axis=1) > 0.0).all()
+    # Collapses follow the surface: face centres stay close to it.
+    centres = corners.mean(axis=1)
+    assert np.abs(centres[:, 2] - 0.05 * np.sin(centres[:, 0] * 7.0) * np.cos(centres[:, 1] * 5.0)).max() < 1e-3
+
+
+def test_decimate_stops_when_nothing_can_collapse(exporter):
+    buffer = wavy_grid(exporter, 20)
+    lod    = exporter.decimate(buffer, 1)
+    assert 1 < lod.face_count() < buffer.face_count()
+    assert on_border(lod.positions).sum() == on_border(buffer.positions).sum()
+
+
+def test_decimate_rounds_do_not_grow_with_size(exporter):
+    # Each round collapses a share of all edges at once, so halving a mesh
+    # takes the same few rounds however large it is. Collapsing one edge
+    # per step would take one step per two faces removed.
+    counts = []
+    for cells in (20, 120):
+        buffer = wavy_grid(exporter, cells)
+        rounds = []
+        exporter.decimate(buffer, buffer.face_count() // 2, trace=rounds.append)
+        counts.append(len(rounds))
+    assert counts[0] == counts[1] <= 6
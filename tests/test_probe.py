@@ -0,0 +1,91 @@
+import hashlib, io, json, os
+
+import pytest
+
+import zomboid_generate
+
+
+@pytest.fixture
+def model(tmp_path):
+    filepath = str(tmp_path / "model.txt")
+    zomboid_generate.generate_model(filepath, vertex_count=400, bone_count=6, clip_count=2, keyframes_per_clip=5)
+    return filepath
+
+
+def sha1(filepath):
+    with io.open(filepath, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def write_index(importer, filepath, **changes):
+    stat  = os.stat(filepath)
+    index = {
+        "version"  : importer.INDEX_VERSION,
+        "size"     : stat.st_size,
+        "mtime_ns" : stat.st_mtime_ns,
+        "sha1"     : sha1(filepath),
+        "sections" : {"header": 0, "vertex_buffer": 0, "faces": 0},
+        "counts"   : {"vertices": 1, "faces": 2, "bones": 3, "animations": 0},
+    }
+    index.update(changes)
+    with io.open(filepath + importer.INDEX_EXTENSION, 'w') as file:
+        json.dump(index, file)
+
+
+@pytest.fixture
+def hashed(importer, monkeypatch):
+    calls = []
+    original = importer.file_sha1
+    def file_sha1(filepath):
+        calls.append(filepath)
+        return original(filepath)
+    monkeypatch.setattr(importer, "file_sha1", file_sha1)
+    return calls
+
+
+def test_probe_scans_like_read_model(importer, model):
+    reader = importer.ZomboidImport()
+    reader.stats = importer.StageStats("test")
+    with io.open(model, 'r') as file:
+        reader.read_model(file)
+    z    = reader.z_mesh
+    info = importer.probe_model(model)
+    assert (info.name, info.version, info.stride) == (z.name, z.version, z.stride_type)
+    assert (info.vertex_count, info.face_count, info.bone_count) == (len(z.vertices), len(z.faces), z.skeleton.bone_count)
+    assert [clip[0] for clip in info.clips] == [animation.name for animation in z.animations]
+    assert not info.from_index
+
+
+def test_index_with_same_size_and_mtime_is_not_hashed(importer, model, hashed):
+    write_index(importer, model, sha1="0" * 40)
+    info = importer.probe_model(model)
+    assert info.from_index and info.vertex_count == 1
+    assert hashed == []
+
+
+def test_strict_probe_hashes_the_model(importer, model, hashed):
+    write_index(importer, model, sha1="0" * 40)
+    info = importer.probe_model(model, strict=True)
+    assert not info.from_index and info.vertex_count == 400
+    assert hashed == [model]
+
+
+def test_index_with_other_mtime_falls_back_to_the_hash(importer, model, hashed):
+    write_index(importer, model, mtime_ns=1)
+    assert importer.probe_model(model).from_index
+    assert hashed == [model]
+    write_index(importer, model, mtime_ns=1, sha1="0" * 40)
+    assert not importer.probe_model(model).from_index
+
+
+def test_index_with_other_size_is_ignored(importer, model, hashed):
+    write_index(importer, model, size=1)
+    assert not importer.probe_model(model).from_index
+    assert hashed == []
+
+
+def test_index_influences_are_used_without_counting(importer, model, monkeypatch):
+    write_index(importer, model, influences=[0, 0, 1])
+    monkeypatch.setattr(importer, "count_influences", None)
+    info = importer.probe_model(model)
+    assert info.from_index and info.max_influences() == 2
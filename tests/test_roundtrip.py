@@ -0,0 +1,150 @@
+import copy, json, io, os, re
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import zomboid_generate
+import zomboid_roundtrip
+
+
+TOLERANCES = {"position": 1e-5, "normal": 0.02, "tangent": 0.05, "uv": 1e-5, "weight": 1e-5,
+              "matrix": 1e-5, "pose": 1e-4, "time": 1e-5}
+
+
+@pytest.fixture(scope="module")
+def animated(tmp_path_factory):
+    filepath = str(tmp_path_factory.mktemp("roundtrip") / "animated.txt")
+    zomboid_generate.generate_model(filepath, vertex_count=200, bone_count=5, clip_count=2, keyframes_per_clip=4,
+                                    clip_names=("Run", "Walk"))
+    return zomboid_roundtrip.read_reference(filepath)
+
+
+def test_reference_reader_reads_every_section(animated):
+    assert animated["stride"] == list(zomboid_generate.DEFAULT_STRIDE)
+    assert all(len(values) == 200 for values in animated["elements"].values())
+    assert [bone[2] for bone in animated["bones"]][:2] == ["Bip01", "Bip01_Bone001"]
+    assert sorted(animated["matrices"]) == sorted(zomboid_roundtrip.MATRIX_BLOCKS)
+    assert [clip["name"] for clip in animated["clips"]] == ["Run", "Walk"]
+    assert len(animated["clips"][0]["frames"]) == 4 and len(animated["clips"][0]["frames"][0]) == 5
+
+
+def test_identical_models_agree(animated):
+    assert zomboid_roundtrip.compare_models(animated, animated, TOLERANCES) == []
+
+
+def changed(model, change):
+    model = copy.deepcopy(model)
+    change(model)
+    return model
+
+
+@pytest.mark.parametrize("change, expected", [
+    (lambda model: model["elements"]["NormalArray"][3].__setitem__(0, 0.5), "normal"),
+    (lambda model: model["elements"]["TangentArray"][3].__setitem__(2, 0.5), "tangent"),
+    (lambda model: model["elements"]["BlendWeightArray"][3].__setitem__(0, 0.9), "weights"),
+    (lambda model: model["elements"]["BlendIndexArray"][3].__setitem__(0, 4.0), "bone ids"),
+    (lambda model: model["stride"].remove("TangentArray"), "TangentArray is missing"),
+    (lambda model: model["bones"].__setitem__(1, (1, 0, "Renamed")), "bones"),
+    (lambda model: model["matrices"]["skin_offsets"][2][0].__setitem__(3, 9.0), "skin_offsets"),
+    (lambda model: model["clips"].pop(), "clips"),
+    (lambda model: model["clips"][0].__setitem__("duration", 1.0), "duration"),
+    (lambda model: model["clips"][0]["frames"].pop(), "frames"),
+    (lambda model: model["clips"][0]["frames"][1].__setitem__("Bip01", (0.0, [0.0, 0.0, 0.0], [0.0, 0.0, 0.0, 1.0])), "Bip01"),
+])
+def test_differences_are_reported(animated, change, expected):
+    problems = zomboid_roundtrip.compare_models(animated, changed(animated, change), TOLERANCES)
+    assert problems and expected in problems[0]
+
+
+def test_only_imported_clips_are_expected_back(animated):
+    exported = changed(animated, lambda model: model["clips"].pop())
+    assert zomboid_roundtrip.compare_models(animated, exported, TOLERANCES, zomboid_roundtrip.IMPORTED_CLIPS) == []
+    assert zomboid_roundtrip.compare_models(animated, animated, TOLERANCES, zomboid_roundtrip.IMPORTED_CLIPS) != []
+
+
+def without_poses(model):
+    for clip in model["clips"]:
+        clip["frames"] = [dict((name, (time, None, None)) for name, (time, location, rotation) in frame.items())
+                          for frame in clip["frames"]]
+
+
+def test_scene_frames_compare_times_only(animated):
+    scene = changed(animated, without_poses)
+    assert zomboid_roundtrip.compare_models(animated, scene, TOLERANCES) == []
+
+
+def test_baseline_matches_the_generated_fixtures(tmp_path):
+    with io.open(zomboid_roundtrip.DEFAULT_BASELINE, 'r') as file:
+        baseline = json.load(file)
+    assert sorted(baseline) == sorted(zomboid_roundtrip.GENERATED_CORPUS)
+    for name, parameters in zomboid_roundtrip.GENERATED_CORPUS.items():
+        path   = str(tmp_path / (name + ".txt"))
+        counts = zomboid_generate.generate_model(path, name=name, **parameters)
+        assert baseline[name]["fixture"] == zomboid_roundtrip.fixture(path, counts)
+
+
+def blender_poses(cache, basis):
+    """Armature space poses of the keyed basis matrices, pose = parent pose @ local_rest @ basis."""
+    poses = np.empty_like(basis)
+    for bone_index in cache.order:
+        parent_index = cache.parents[bone_index]
+        parent_pose  = poses[:, parent_index] if parent_index >= 0 else np.identity(4)
+        poses[:, bone_index] = parent_pose @ cache.local_rest[bone_index] @ basis[:, bone_index]
+    return poses
+
+
+def test_imported_clip_survives_export(importer, exporter, tmp_path):
+    # The generator animates every bone, the root included.
+    path = str(tmp_path / "animated.txt")
+    zomboid_generate.generate_model(path, vertex_count=50, bone_count=5, clip_count=1, keyframes_per_clip=4,
+                                    clip_names=("Run",))
+    reader       = importer.ZomboidImport()
+    reader.stats = importer.StageStats("test")
+    with io.open(path, 'r') as file:
+        reader.read_model(file)
+    skeleton  = reader.z_mesh.skeleton
+    animation = reader.z_mesh.animations[0]
+    # Pose bones at the rest matrices create_armature gives them.
+    skeleton.object = SimpleNamespace(pose=SimpleNamespace(bones=dict(
+        (skeleton.bone_name[index], SimpleNamespace(bone=SimpleNamespace(matrix_local=skeleton.rest_matrices[index])))
+        for index in range(skeleton.bone_count))))
+    cache = importer.PoseCache(skeleton)
+    assert cache.keyed == list(range(skeleton.bone_count))
+    poses = blender_poses(cache, cache.basis_matrices(reader.compute_skin_pose_array(animation)))
+    
+    # ZomboidExport.prepare_skeleton on the imported armature.
+    writer               = exporter.ZomboidExport()
+    writer.bone_parents  = [skeleton.bone_parent[index] if index else -1 for index in range(skeleton.bone_count)]
+    writer.pose_to_world = np.linalg.inv(cache.rest) @ np.linalg.inv(skeleton.offset_matrices)
+    locs, rots = writer.local_poses(poses)
+    for frame_index, frame in enumerate(animation.frames):
+        for bone_index in range(skeleton.bone_count):
+            name = skeleton.bone_name[bone_index]
+            loc, rot = frame.bone_locs[name], frame.bone_rots[name]
+            assert np.allclose(locs[frame_index, bone_index], (loc.x, loc.y, loc.z), atol=1e-6), name
+            # q and -q are the same rotation.
+            expected = np.array((rot.x, rot.y, rot.z, rot.w))
+            assert min(np.abs(rots[frame_index, bone_index] - expected).max(),
+                       np.abs(rots[frame_index, bone_index] + expected).max()) < 1e-6, name
+
+
+def test_skeleton_and_clips_are_written_in_fixed_point(exporter, tmp_path):
+    writer              = exporter.ZomboidExport()
+    writer.bone_names   = ["Bip01", "Bip01_Pelvis"]
+    writer.bone_parents = [-1, 0]
+    matrices            = np.tile(np.identity(4), (2, 1, 1))
+    matrices[1, 0, 3]   = 1e-5
+    writer.bind_matrices = writer.inverse_bind_matrices = writer.offset_matrices = matrices
+    locs = np.full((2, 2, 3), 1e-5)
+    rots = np.zeros((2, 2, 4))
+    rots[..., 3] = -1.0
+    path = str(tmp_path / "skeleton.txt")
+    with io.open(path, 'w') as file:
+        writer.write_skeleton(file)
+        writer.write_animations(file, [("Run", 2e-5, [0.0, 1e-5], locs, rots)])
+    with io.open(path, 'r') as file:
+        text = file.read()
+    assert re.search(r"\de[-+]?\d", text) is None
+    assert "\n1, 0, 0, 0.00001\n" in text and "\n0.00002\n" in text
+    assert text.count("\n0.00001, 0.00001, 0.00001\n0, 0, 0, -1\n") == 4
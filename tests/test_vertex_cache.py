@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def grid_triangles(columns, rows):
+    triangles = []
+    for row in range(rows):
+        for column in range(columns):
+            a = row * (columns + 1) + column
+            b = a + 1
+            c = a + columns + 1
+            d = c + 1
+            triangles += [(a, b, c), (b, d, c)]
+    return triangles
+
+
+def expected_scores(triangles, vertex_count, order, cache_size):
+    """Vertex scores rebuilt from scratch by replaying the drawn triangles through an LRU cache."""
+    remaining = [0] * vertex_count
+    for triangle in triangles:
+        for vert_id in triangle:
+            remaining[vert_id] += 1
+    cache = []
+    for triangle_index in order:
+        triangle = triangles[triangle_index]
+        for vert_id in triangle:
+            remaining[vert_id] -= 1
+        cache = (list(triangle) + [vert_id for vert_id in cache if vert_id not in triangle])[:cache_size]
+    
+    scores = []
+    for vert_id in range(vertex_count):
+        if remaining[vert_id] == 0:
+            scores.append(-1.0)
+            continue
+        score = 2.0 * remaining[vert_id] ** -0.5
+        if vert_id in cache:
+            position = cache.index(vert_id)
+            score += 0.75 if position < 3 else (1.0 - (position - 3) / float(cache_size - 3)) ** 1.5
+        scores.append(score)
+    return scores
+
+
+def test_forsyth_scores_match_recomputation(exporter):
+    # A small cache so vertices get evicted on every row of the grid.
+    cache_size   = 8
+    triangles    = grid_triangles(12, 6)
+    vertex_count = 13 * 7
+    steps        = []
+    
+    def check(order, score, triangle_score):
+        expected = expected_scores(triangles, vertex_count, order, cache_size)
+        np.testing.assert_allclose(score, expected, atol=1e-9, err_msg="after %d triangles" % len(order))
+        drawn = set(order)
+        for triangle_index, triangle in enumerate(triangles):
+            if triangle_index not in drawn:
+                assert abs(triangle_score[triangle_index] - sum(expected[vert_id] for vert_id in triangle)) < 1e-9
+        steps.append(len(order))
+    
+    order = exporter.forsyth_triangle_order(triangles, vertex_count, cache_size, trace=check)
+    assert sorted(order) == list(range(len(triangles)))
+    assert steps == list(range(1, len(triangles) + 1))
+
+
+def test_forsyth_improves_cache_misses(exporter):
+    triangles = grid_triangles(40, 40)
+    shuffled  = [triangles[index] for index in np.random.RandomState(7).permutation(len(triangles))]
+    order     = exporter.forsyth_triangle_order(shuffled, 41 * 41)
+    before    = exporter.cache_statistics(shuffled, 41 * 41)[0]
+    after     = exporter.cache_statistics([shuffled[index] for index in order], 41 * 41)[0]
+    assert after < before
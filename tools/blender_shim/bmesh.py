@@ -0,0 +1,10 @@
+# bmesh stand-in. Mesh editing needs Blender; these only fail loudly.
+
+
+def _unavailable(*args, **kwargs):
+    raise RuntimeError("bmesh is not available outside Blender")
+
+
+new             = _unavailable
+from_edit_mesh  = _unavailable
+update_edit_mesh = _unavailable
@@ -0,0 +1,85 @@
+# Stand-in for the parts of Blender's bpy module that the Zomboid add-ons
+# touch at import time or in their parsing and formatting code. Anything
+# that needs real Blender data (bpy.ops, bpy.data content) raises instead of
+# pretending to work.
+
+from . import app, props, types, utils
+
+
+class _Namespace:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class _Collection(list):
+    """bpy.data collections: a list with name lookups."""
+
+    def get(self, name, default=None):
+        for block in self:
+            if getattr(block, "name", None) == name:
+                return block
+        return default
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            block = self.get(key)
+            if block is None:
+                raise KeyError("bpy_prop_collection[key]: key \"%s\" not found" % key)
+            return block
+        return list.__getitem__(self, key)
+
+    def new(self, *args, **kwargs):
+        raise RuntimeError("bpy.data is not available outside Blender")
+
+    def remove(self, block, **kwargs):
+        list.remove(self, block)
+
+
+class _OpsModule:
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, name):
+        idname = self._name + "." + name
+
+        def operator(*args, **kwargs):
+            raise RuntimeError("bpy.ops.%s is not available outside Blender" % idname)
+        operator.__name__ = name
+        return operator
+
+
+class _Ops:
+    def __getattr__(self, name):
+        return _OpsModule(name)
+
+
+data = _Namespace(
+    objects    = _Collection(),
+    meshes     = _Collection(),
+    armatures  = _Collection(),
+    actions    = _Collection(),
+    scenes     = _Collection(),
+    collections= _Collection(),
+    filepath   = "",
+)
+
+_scene = _Namespace(
+    name          = "Scene",
+    frame_current = 0,
+    frame_start   = 1,
+    frame_end     = 250,
+    render        = _Namespace(fps=24, fps_base=1.0),
+    cursor        = _Namespace(location=(0.0, 0.0, 0.0)),
+    objects       = _Collection(),
+)
+data.scenes.append(_scene)
+
+context = _Namespace(
+    scene         = _scene,
+    view_layer    = _Namespace(objects=_Namespace(active=None), update=lambda: None),
+    collection    = _Namespace(objects=_Collection()),
+    active_object = None,
+    object        = None,
+)
+
+ops = _Ops()
@@ -0,0 +1,18 @@
+# bpy.app stand-in. An empty binary_path tells tools they are not in Blender.
+
+version        = (2, 90, 0)
+version_string = "shim (no Blender)"
+binary_path    = ""
+background     = True
+
+
+class _Handlers:
+    def __init__(self):
+        self.depsgraph_update_pre  = []
+        self.depsgraph_update_post = []
+        self.undo_pre              = []
+        self.undo_post             = []
+        self.load_post             = []
+
+
+handlers = _Handlers()
@@ -0,0 +1,30 @@
+# bpy.props stand-in. Each property evaluates to its default, so operator
+# instances created outside Blender see the same values as a fresh dialog.
+
+
+def _property(default):
+    def factory(**kwargs):
+        return kwargs.get("default", default)
+    return factory
+
+
+BoolProperty        = _property(False)
+BoolVectorProperty  = _property((False, False, False))
+IntProperty         = _property(0)
+IntVectorProperty   = _property((0, 0, 0))
+FloatProperty       = _property(0.0)
+FloatVectorProperty = _property((0.0, 0.0, 0.0))
+StringProperty      = _property("")
+PointerProperty     = _property(None)
+CollectionProperty  = _property(())
+
+
+def EnumProperty(**kwargs):
+    if "default" in kwargs:
+        return kwargs["default"]
+    items = kwargs.get("items") or ()
+    if callable(items) or not items:
+        return ""
+    if "ENUM_FLAG" in kwargs.get("options", ()):
+        return set()
+    return items[0][0]
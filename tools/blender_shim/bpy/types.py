@@ -0,0 +1,57 @@
+# bpy.types stand-in: plain Python bases for the classes the add-ons subclass.
+
+
+class Operator:
+    bl_idname  = ""
+    bl_label   = ""
+    bl_options = set()
+
+    def __init_subclass__(cls, **kwargs):
+        # Operator properties are annotations; each stand-in evaluated to its
+        # default, which becomes the class attribute Blender would expose.
+        super().__init_subclass__(**kwargs)
+        for name, default in cls.__dict__.get("__annotations__", dict()).items():
+            if name not in cls.__dict__:
+                setattr(cls, name, default)
+
+    def report(self, type, message):
+        # Blender shows these in the status bar; here they are kept for inspection.
+        if not hasattr(self, "reports"):
+            self.reports = []
+        self.reports.append((set(type), message))
+
+
+class Panel:
+    pass
+
+
+class _Menu:
+    _draw_functions = None
+
+    @classmethod
+    def append(cls, function):
+        cls._draw_functions = (cls._draw_functions or []) + [function]
+
+    @classmethod
+    def remove(cls, function):
+        cls._draw_functions = [draw for draw in (cls._draw_functions or []) if draw is not function]
+
+
+class Menu(_Menu):
+    pass
+
+
+class TOPBAR_MT_file_import(_Menu):
+    pass
+
+
+class TOPBAR_MT_file_export(_Menu):
+    pass
+
+
+class INFO_MT_file_import(_Menu):
+    pass
+
+
+class INFO_MT_file_export(_Menu):
+    pass
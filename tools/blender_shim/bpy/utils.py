@@ -0,0 +1,9 @@
+# bpy.utils stand-in. Registration is a no-op outside Blender.
+
+
+def register_class(cls):
+    pass
+
+
+def unregister_class(cls):
+    pass
@@ -0,0 +1 @@
+# bpy_extras stand-in.
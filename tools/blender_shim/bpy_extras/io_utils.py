@@ -0,0 +1,10 @@
+# bpy_extras.io_utils stand-in: the file browser mixins only carry a filepath.
+
+
+class ImportHelper:
+    filepath = ""
+
+
+class ExportHelper:
+    filepath = ""
+    check_extension = True
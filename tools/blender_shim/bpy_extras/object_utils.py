@@ -0,0 +1,9 @@
+# bpy_extras.object_utils stand-in.
+
+
+class AddObjectHelper:
+    pass
+
+
+def object_data_add(context, obdata, operator=None, name=None):
+    raise RuntimeError("object_data_add is not available outside Blender")
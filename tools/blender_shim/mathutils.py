@@ -0,0 +1,466 @@
+# NumPy backed stand-in for the subset of Blender's mathutils used by the
+# Zomboid add-ons. Semantics follow Blender 2.8x: '@' is the matrix/vector
+# product and '*' is element-wise.
+
+import math
+import numpy as np
+
+
+def _array(values):
+    if isinstance(values, (Vector, Quaternion, Euler)):
+        return values._data.copy()
+    if isinstance(values, Matrix):
+        return values._data.copy()
+    return np.array(values, dtype=np.float64)
+
+
+def _format(values):
+    return ", ".join("%.4f" % value for value in values)
+
+
+class Vector:
+    __slots__ = ("_data",)
+
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        self._data = _array(values).reshape(-1)
+
+    @classmethod
+    def _wrap(cls, data):
+        # Shares data (a row of a Matrix, for example) instead of copying it.
+        vector = cls.__new__(cls)
+        vector._data = data
+        return vector
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._data[index].tolist()
+        return float(self._data[index])
+
+    def __setitem__(self, index, value):
+        self._data[index] = value
+
+    def __repr__(self):
+        return "<Vector (%s)>" % _format(self._data)
+
+    def _axis(index):
+        return property(lambda self: float(self._data[index]),
+                        lambda self, value: self._data.__setitem__(index, value))
+
+    x = _axis(0)
+    y = _axis(1)
+    z = _axis(2)
+    w = _axis(3)
+    del _axis
+
+    def copy(self):
+        return Vector(self._data)
+
+    def to_tuple(self, precision=-1):
+        if precision < 0:
+            return tuple(self._data.tolist())
+        return tuple(round(value, precision) for value in self._data.tolist())
+
+    def to_3d(self):
+        data = np.zeros(3)
+        data[:min(3, len(self._data))] = self._data[:3]
+        return Vector(data)
+
+    def to_4d(self):
+        data = np.array([0.0, 0.0, 0.0, 1.0])
+        data[:min(3, len(self._data))] = self._data[:3]
+        return Vector(data)
+
+    @property
+    def length(self):
+        return float(np.sqrt(np.dot(self._data, self._data)))
+
+    @property
+    def length_squared(self):
+        return float(np.dot(self._data, self._data))
+
+    def normalized(self):
+        length = self.length
+        return Vector(self._data / length if length else self._data)
+
+    def normalize(self):
+        length = self.length
+        if length:
+            self._data /= length
+
+    def dot(self, other):
+        return float(np.dot(self._data, _array(other)))
+
+    def cross(self, other):
+        return Vector(np.cross(self._data, _array(other)))
+
+    def __eq__(self, other):
+        if not isinstance(other, Vector):
+            return NotImplemented
+        return self._data.shape == other._data.shape and bool(np.all(self._data == other._data))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __neg__(self):
+        return Vector(-self._data)
+
+    def __add__(self, other):
+        return Vector(self._data + _array(other))
+
+    def __sub__(self, other):
+        return Vector(self._data - _array(other))
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return Vector(self._data * other)
+        return Vector(self._data * _array(other))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return Vector(self._data / other)
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            return Vector(self._data @ other._data)
+        return float(np.dot(self._data, _array(other)))
+
+
+class Quaternion:
+    __slots__ = ("_data",)
+
+    def __init__(self, values=(1.0, 0.0, 0.0, 0.0)):
+        self._data = _array(values).reshape(4)
+
+    def __len__(self):
+        return 4
+
+    def __iter__(self):
+        return iter(self._data.tolist())
+
+    def __getitem__(self, index):
+        return float(self._data[index])
+
+    def __setitem__(self, index, value):
+        self._data[index] = value
+
+    def __repr__(self):
+        return "<Quaternion (w=%.4f, x=%.4f, y=%.4f, z=%.4f)>" % tuple(self._data)
+
+    def _axis(index):
+        return property(lambda self: float(self._data[index]),
+                        lambda self, value: self._data.__setitem__(index, value))
+
+    w = _axis(0)
+    x = _axis(1)
+    y = _axis(2)
+    z = _axis(3)
+    del _axis
+
+    def copy(self):
+        return Quaternion(self._data)
+
+    @property
+    def magnitude(self):
+        return float(np.sqrt(np.dot(self._data, self._data)))
+
+    def normalized(self):
+        magnitude = self.magnitude
+        return Quaternion(self._data / magnitude if magnitude else self._data)
+
+    def normalize(self):
+        magnitude = self.magnitude
+        if magnitude:
+            self._data /= magnitude
+
+    def conjugated(self):
+        w, x, y, z = self._data
+        return Quaternion((w, -x, -y, -z))
+
+    def inverted(self):
+        return Quaternion(self.conjugated()._data / np.dot(self._data, self._data))
+
+    def to_matrix(self):
+        w, x, y, z = self.normalized()._data
+        return Matrix((
+            (1.0 - 2.0 * (y * y + z * z),       2.0 * (x * y - w * z),       2.0 * (x * z + w * y)),
+            (      2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z),       2.0 * (y * z - w * x)),
+            (      2.0 * (x * z - w * y),       2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y)),
+        ))
+
+    def to_euler(self, order="XYZ"):
+        return self.to_matrix().to_euler(order)
+
+    def __eq__(self, other):
+        if not isinstance(other, Quaternion):
+            return NotImplemented
+        return bool(np.all(self._data == other._data))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return Quaternion(self._data * other)
+        return Quaternion(self._data * _array(other))
+
+    def __matmul__(self, other):
+        if isinstance(other, Vector):
+            return self.to_matrix() @ other
+        w1, x1, y1, z1 = self._data
+        w2, x2, y2, z2 = _array(other)
+        return Quaternion((
+            w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+            w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+            w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+            w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+        ))
+
+
+class Euler:
+    __slots__ = ("_data", "order")
+
+    def __init__(self, values=(0.0, 0.0, 0.0), order="XYZ"):
+        self._data = _array(values).reshape(3)
+        self.order = order
+
+    def __iter__(self):
+        return iter(self._data.tolist())
+
+    def __getitem__(self, index):
+        return float(self._data[index])
+
+    def __repr__(self):
+        return "<Euler (x=%.4f, y=%.4f, z=%.4f), order='%s'>" % (tuple(self._data) + (self.order,))
+
+    x = property(lambda self: float(self._data[0]))
+    y = property(lambda self: float(self._data[1]))
+    z = property(lambda self: float(self._data[2]))
+
+    def copy(self):
+        return Euler(self._data, self.order)
+
+    def to_matrix(self):
+        matrices = {
+            "X": Matrix.Rotation(self._data[0], 3, "X"),
+            "Y": Matrix.Rotation(self._data[1], 3, "Y"),
+            "Z": Matrix.Rotation(self._data[2], 3, "Z"),
+        }
+        # The first axis of the order is applied first.
+        result = Matrix.Identity(3)
+        for axis in self.order:
+            result = matrices[axis] @ result
+        return result
+
+    def to_quaternion(self):
+        return self.to_matrix().to_quaternion()
+
+
+class Matrix:
+    __slots__ = ("_data",)
+
+    def __init__(self, rows=None):
+        if rows is None:
+            self._data = np.identity(4)
+        else:
+            self._data = _array(rows)
+            if self._data.ndim != 2:
+                raise ValueError("Matrix expects a sequence of rows")
+
+    @classmethod
+    def _wrap(cls, data):
+        matrix = cls.__new__(cls)
+        matrix._data = data
+        return matrix
+
+    @staticmethod
+    def Identity(size):
+        return Matrix(np.identity(size))
+
+    @staticmethod
+    def Translation(vector):
+        data = np.identity(4)
+        data[:3, 3] = _array(vector)[:3]
+        return Matrix(data)
+
+    @staticmethod
+    def Scale(factor, size, axis=None):
+        data = np.identity(size)
+        if axis is None:
+            data[:3, :3] *= factor
+        else:
+            for index, value in enumerate(_array(axis)[:3]):
+                data[index, index] = 1.0 + (factor - 1.0) * value
+        return Matrix(data)
+
+    @staticmethod
+    def Rotation(angle, size, axis):
+        c = math.cos(angle)
+        s = math.sin(angle)
+        if axis == "X":
+            rotation = ((1.0, 0.0, 0.0), (0.0, c, -s), (0.0, s, c))
+        elif axis == "Y":
+            rotation = ((c, 0.0, s), (0.0, 1.0, 0.0), (-s, 0.0, c))
+        elif axis == "Z":
+            rotation = ((c, -s, 0.0), (s, c, 0.0), (0.0, 0.0, 1.0))
+        else:
+            x, y, z = Vector(axis).normalized()
+            t = 1.0 - c
+            rotation = ((t * x * x + c,     t * x * y - s * z, t * x * z + s * y),
+                        (t * x * y + s * z, t * y * y + c,     t * y * z - s * x),
+                        (t * x * z - s * y, t * y * z + s * x, t * z * z + c    ))
+        data = np.identity(size)
+        data[:3, :3] = rotation
+        return Matrix(data)
+
+    def __len__(self):
+        return self._data.shape[0]
+
+    def __iter__(self):
+        return (Vector._wrap(row) for row in self._data)
+
+    def __getitem__(self, index):
+        return Vector._wrap(self._data[index])
+
+    def __setitem__(self, index, value):
+        self._data[index] = _array(value)
+
+    def __repr__(self):
+        rows = ",\n        ".join("(%s)" % _format(row) for row in self._data)
+        return "Matrix((%s))" % rows
+
+    @property
+    def row(self):
+        return self
+
+    @property
+    def col(self):
+        return Matrix._wrap(self._data.T)
+
+    @property
+    def translation(self):
+        return Vector._wrap(self._data[:3, 3])
+
+    @translation.setter
+    def translation(self, value):
+        self._data[:3, 3] = _array(value)[:3]
+
+    def copy(self):
+        return Matrix(self._data)
+
+    def to_3x3(self):
+        return Matrix(self._data[:3, :3])
+
+    def to_4x4(self):
+        data = np.identity(4)
+        size = min(4, self._data.shape[0])
+        data[:size, :size] = self._data[:size, :size]
+        return Matrix(data)
+
+    def to_translation(self):
+        return Vector(self._data[:3, 3])
+
+    def to_scale(self):
+        return Vector(np.linalg.norm(self._data[:3, :3], axis=0))
+
+    def to_quaternion(self):
+        m = self._data[:3, :3] / self.to_scale()._data
+        trace = m[0, 0] + m[1, 1] + m[2, 2]
+        if trace > 0.0:
+            s = math.sqrt(trace + 1.0) * 2.0
+            q = (0.25 * s, (m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s)
+        elif m[0, 0] > m[1, 1] and m[0, 0] > m[2, 2]:
+            s = math.sqrt(1.0 + m[0, 0] - m[1, 1] - m[2, 2]) * 2.0
+            q = ((m[2, 1] - m[1, 2]) / s, 0.25 * s, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s)
+        elif m[1, 1] > m[2, 2]:
+            s = math.sqrt(1.0 + m[1, 1] - m[0, 0] - m[2, 2]) * 2.0
+            q = ((m[0, 2] - m[2, 0]) / s, (m[0, 1] + m[1, 0]) / s, 0.25 * s, (m[1, 2] + m[2, 1]) / s)
+        else:
+            s = math.sqrt(1.0 + m[2, 2] - m[0, 0] - m[1, 1]) * 2.0
+            q = ((m[1, 0] - m[0, 1]) / s, (m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, 0.25 * s)
+        quaternion = Quaternion(q)
+        if quaternion.w < 0.0:
+            quaternion = Quaternion(-quaternion._data)
+        return quaternion
+
+    def to_euler(self, order="XYZ"):
+        if order != "XYZ":
+            raise NotImplementedError("Only XYZ euler order is supported by the shim")
+        m  = self._data[:3, :3]
+        cy = math.hypot(m[0, 0], m[1, 0])
+        if cy > 1e-9:
+            return Euler((math.atan2(m[2, 1], m[2, 2]), math.atan2(-m[2, 0], cy), math.atan2(m[1, 0], m[0, 0])))
+        return Euler((math.atan2(-m[1, 2], m[1, 1]), math.atan2(-m[2, 0], cy), 0.0))
+
+    def decompose(self):
+        return self.to_translation(), self.to_quaternion(), self.to_scale()
+
+    def transposed(self):
+        return Matrix(self._data.T)
+
+    def transpose(self):
+        self._data = self._data.T.copy()
+
+    def inverted(self, fallback=None):
+        try:
+            return Matrix(np.linalg.inv(self._data))
+        except np.linalg.LinAlgError:
+            if fallback is None:
+                raise ValueError("Matrix.inverted(): matrix does not have an inverse")
+            return fallback
+
+    def invert(self):
+        self._data = np.linalg.inv(self._data)
+
+    def inverted_safe(self):
+        return Matrix(np.linalg.pinv(self._data))
+
+    def identity(self):
+        self._data = np.identity(self._data.shape[0])
+
+    def determinant(self):
+        return float(np.linalg.det(self._data))
+
+    def __eq__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self._data.shape == other._data.shape and bool(np.all(self._data == other._data))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return Matrix(self._data + other._data)
+
+    def __sub__(self, other):
+        return Matrix(self._data - other._data)
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return Matrix(self._data * other)
+        return Matrix(self._data * _array(other))
+
+    __rmul__ = __mul__
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            return Matrix(self._data @ other._data)
+        vector = _array(other)
+        if len(vector) == 3 and self._data.shape[0] == 4:
+            return Vector((self._data @ np.append(vector, 1.0))[:3])
+        return Vector(self._data @ vector)
@@ -0,0 +1,267 @@
+# Scaling benchmark for the Zomboid import/export add-ons.
+#
+# Generates synthetic models across a size sweep and times every stage
+# reported by the operators' StageStats. Results are written as CSV and
+# JSON, plus a throughput plot when matplotlib is available.
+#
+# Inside Blender (headless) every stage is measured:
+#   blender -b --factory-startup -P tools/zomboid_bench.py -- --sweep vertices --sizes 1000,10000,50000
+# In plain CPython the add-ons load on top of tools/blender_shim and the
+# parser, pose math, export formatting and LOD decimation are timed; building Blender data
+# needs the real thing:
+#   python tools/zomboid_bench.py --sweep keyframes --sizes 10,40,160
+
+import argparse, csv, io, json, math, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import zomboid_common
+import zomboid_generate
+
+
+SWEEPS = ("vertices", "bones", "clips", "keyframes")
+
+
+def model_parameters(args, sweep, size):
+    parameters = {
+        "vertex_count"       : args.vertices,
+        "bone_count"         : args.bones,
+        "hierarchy_depth"    : args.depth,
+        "clip_count"         : args.clips,
+        "keyframes_per_clip" : args.keyframes,
+    }
+    key = {
+        "vertices"  : "vertex_count",
+        "bones"     : "bone_count",
+        "clips"     : "clip_count",
+        "keyframes" : "keyframes_per_clip",
+    }[sweep]
+    parameters[key] = size
+    return parameters
+
+
+def clear_scene():
+    import bpy
+    for collection in (bpy.data.objects, bpy.data.meshes, bpy.data.armatures, bpy.data.actions):
+        for block in list(collection):
+            collection.remove(block)
+
+
+def read_stats(filepath):
+    with io.open(filepath + ".stats.json", 'r') as file:
+        return json.load(file)
+
+
+def run_blender_stages(model_path, export_path):
+    """Runs the real operators and returns their stage reports."""
+    import bpy
+    clear_scene()
+    bpy.ops.zomboid.import_model(filepath=model_path, write_stats=True)
+    reports = [read_stats(model_path)]
+
+    meshes = [object for object in bpy.context.scene.objects if object.type == 'MESH']
+    if meshes:
+        for object in bpy.context.scene.objects:
+            object.select_set(False)
+        meshes[0].select_set(True)
+        bpy.context.view_layer.objects.active = meshes[0]
+        bpy.ops.zomboid.export_model(filepath=export_path, write_stats=True)
+        reports.append(read_stats(export_path))
+    return reports
+
+
+def run_cpython_stages(model_path, export_path):
+    """Parse, pose math, export formatting and LOD decimation on top of the shim."""
+    importer = zomboid_common.load_addon(zomboid_common.IMPORTER)
+    exporter = zomboid_common.load_addon(zomboid_common.EXPORTER)
+
+    reader       = importer.ZomboidImport()
+    reader.stats = stats = importer.StageStats("shim")
+    with io.open(model_path, 'r') as file:
+        reader.read_model(file)
+
+    z = reader.z_mesh
+    with stats.stage('pose_math'):
+        for animation in z.animations:
+            reader.compute_skin_pose_array(animation)
+
+    with stats.stage('export_format'):
+        writer = exporter_from_mesh(exporter, z)
+        with io.open(export_path, 'w') as file:
+            with stats.stage('write_header'):
+                writer.write_header(file)
+            with stats.stage('write_vertex_buffer'):
+                writer.write_vertex_buffer(file, writer.buffer)
+            with stats.stage('write_faces'):
+                writer.write_faces(file, writer.buffer)
+
+    with stats.stage('decimate'):
+        exporter.decimate(writer.buffer, max(1, writer.buffer.face_count() // 2))
+    return [stats.to_dict()]
+
+
+def exporter_from_mesh(exporter, z):
+    """Fills a ZomboidExport with the parsed mesh the way process_mesh would."""
+    writer           = exporter.ZomboidExport()
+    writer.mesh_name = z.name
+    writer.mesh_has_uv_mapping   = z.has_texture
+    writer.mesh_has_bone_weights = z.has_weights and len(z.weight_indexes) == len(z.vertices)
+    writer.mesh_has_tangent_array = writer.mesh_has_bone_weights
+    writer.vertex_stride_element_count += (1 if writer.mesh_has_uv_mapping else 0) + (3 if writer.mesh_has_bone_weights else 0)
+
+    buffer = writer.buffer = exporter.MeshBuffer(len(z.vertices))
+    buffer.positions = np.array([list(co) for co in z.vertices], dtype=np.float64).reshape(-1, 3)
+    if writer.mesh_has_uv_mapping:
+        buffer.uvs = np.array([list(uv) for uv in z.uvs], dtype=np.float64).reshape(-1, 2)
+    if writer.mesh_has_bone_weights:
+        buffer.weights    = np.array(z.weight_values, dtype=np.float64)
+        buffer.bone_ids   = np.array(z.weight_indexes, dtype=np.int64)
+        buffer.influences = np.count_nonzero(buffer.weights >= 0.0, axis=1)
+    buffer.triangles = np.array(z.faces, dtype=np.int64).reshape(-1, 3)
+    return writer
+
+
+def benchmark(args):
+    workdir = args.workdir or tempfile.mkdtemp(prefix="zomboid_bench_")
+    blender = zomboid_common.in_blender()
+    if blender:
+        zomboid_common.register_addons()
+    else:
+        print("Running on the bpy/mathutils shim: Blender data stages are not timed.")
+
+    rows = []
+    for size in args.sizes:
+        parameters  = model_parameters(args, args.sweep, size)
+        model_path  = os.path.join(workdir, "bench_%s_%d.txt" % (args.sweep, size))
+        export_path = os.path.join(workdir, "bench_%s_%d_export.txt" % (args.sweep, size))
+
+        for repeat in range(args.repeat):
+            start  = time.perf_counter()
+            counts = zomboid_generate.generate_model(model_path, seed=repeat, **parameters)
+            rows.append(result_row(args.sweep, size, repeat, "generate", "generate", time.perf_counter() - start, counts))
+
+            if blender:
+                reports = run_blender_stages(model_path, export_path)
+            else:
+                reports = run_cpython_stages(model_path, export_path)
+            for report in reports:
+                for stage in report["stages"]:
+                    rows.append(result_row(args.sweep, size, repeat, report["operator"], stage["name"], stage["seconds"], counts))
+        print("%s=%d done" % (args.sweep, size))
+    return rows
+
+
+def result_row(sweep, size, repeat, operator, stage, seconds, counts):
+    return {
+        "sweep"      : sweep,
+        "size"       : size,
+        "repeat"     : repeat,
+        "operator"   : operator,
+        "stage"      : stage,
+        "seconds"    : seconds,
+        "vertices"   : counts["vertices"],
+        "faces"      : counts["faces"],
+        "bones"      : counts["bones"],
+        "keyframes"  : counts["keyframes"],
+        "throughput" : size / seconds if seconds > 0.0 else float("inf"),
+    }
+
+
+def best_times(rows):
+    """Fastest repeat per (operator, stage, size)."""
+    best = dict()
+    for row in rows:
+        key = (row["operator"], row["stage"], row["size"])
+        if key not in best or row["seconds"] < best[key]["seconds"]:
+            best[key] = row
+    return best
+
+
+def scaling_exponents(rows):
+    """Fits time ~ size^k between the smallest and largest size of each stage."""
+    series = dict()
+    for (operator, stage, size), row in best_times(rows).items():
+        series.setdefault((operator, stage), []).append((size, row["seconds"]))
+
+    exponents = dict()
+    for key, points in series.items():
+        points.sort()
+        (n0, t0), (n1, t1) = points[0], points[-1]
+        if n1 > n0 and t0 > 0.0 and t1 > 0.0:
+            exponents[key] = math.log(t1 / t0) / math.log(float(n1) / n0)
+    return exponents
+
+
+def write_results(rows, exponents, output_dir):
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    with io.open(os.path.join(output_dir, "bench.csv"), 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    with io.open(os.path.join(output_dir, "bench.json"), 'w') as file:
+        json.dump({
+            "rows"      : rows,
+            "exponents" : [{"operator": operator, "stage": stage, "exponent": exponent} for (operator, stage), exponent in sorted(exponents.items())],
+        }, file, indent=2)
+
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plot
+    except ImportError:
+        print("matplotlib is not available: skipping the throughput plot.")
+        return
+
+    series = dict()
+    for (operator, stage, size), row in sorted(best_times(rows).items()):
+        series.setdefault("%s %s" % (operator.split(".")[-1], stage), []).append((size, row["throughput"]))
+
+    figure, axes = plot.subplots(figsize=(10, 6))
+    for label, points in sorted(series.items()):
+        axes.plot([point[0] for point in points], [point[1] for point in points], marker="o", label=label)
+    axes.set_xscale("log")
+    axes.set_yscale("log")
+    axes.set_xlabel(rows[0]["sweep"])
+    axes.set_ylabel("%s per second" % rows[0]["sweep"])
+    axes.legend(fontsize="small")
+    figure.tight_layout()
+    figure.savefig(os.path.join(output_dir, "bench.png"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time Zomboid import/export stages across a size sweep.")
+    parser.add_argument("--sweep",     choices=SWEEPS, default="vertices")
+    parser.add_argument("--sizes",     type=lambda value: [int(size) for size in value.split(",")], default=[1000, 5000, 20000])
+    parser.add_argument("--vertices",  type=int, default=5000)
+    parser.add_argument("--bones",     type=int, default=60)
+    parser.add_argument("--depth",     type=int, default=8)
+    parser.add_argument("--clips",     type=int, default=1)
+    parser.add_argument("--keyframes", type=int, default=30)
+    parser.add_argument("--repeat",    type=int, default=1)
+    parser.add_argument("--max-exponent", type=float, default=1.3,
+                        help="Flag stages whose time grows faster than size^k.")
+    parser.add_argument("--workdir",   default=None, help="Where generated models are written.")
+    parser.add_argument("--output",    default="bench_output")
+    args = parser.parse_args(zomboid_common.script_args() if argv is None else argv)
+
+    rows      = benchmark(args)
+    exponents = scaling_exponents(rows)
+    write_results(rows, exponents, args.output)
+
+    flagged = 0
+    for (operator, stage), exponent in sorted(exponents.items()):
+        marker = ""
+        if exponent > args.max_exponent:
+            marker  = "  <-- superlinear"
+            flagged += 1
+        print("%-24s %-22s k=%.2f%s" % (operator, stage, exponent, marker))
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+# SQLite catalog of a folder of Zomboid models.
+#
+# Every model under a folder is probed (see zomboid_probe.py) and its
+# metadata, bone names and clips are stored in a database under the user's
+# cache folder (or --db). Only headers and block counts are read, so a first
+# refresh of a large tree stays fast. Bone weight counts come from .idx
+# sidecars, or from reading the weight rows with --influences; per-section
+# SHA-1s (for 'duplicates') need --hashes, which reads every file whole.
+# Later refreshes only probe files whose mtime or size changed, or that
+# lack data a flag asks for, and drop files that disappeared, so refreshing
+# a large tree mostly costs a directory walk.
+#
+# Usage:
+#   python tools/zomboid_catalog.py refresh path/to/mod
+#   python tools/zomboid_catalog.py query --bone Bip01 --skinned
+#   python tools/zomboid_catalog.py query --min-faces 10000
+#   python tools/zomboid_catalog.py refresh path/to/mod --influences
+#   python tools/zomboid_catalog.py query --min-influences 5
+#   python tools/zomboid_catalog.py refresh path/to/mod --hashes
+#   python tools/zomboid_catalog.py duplicates --section vertex_buffer
+#   python tools/zomboid_catalog.py sql "SELECT name, face_count FROM models ORDER BY face_count DESC LIMIT 10"
+
+import argparse, hashlib, io, json, os, sqlite3, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import zomboid_common
+import zomboid_probe
+
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    path           TEXT PRIMARY KEY,
+    mtime          REAL,
+    size           INTEGER,
+    name           TEXT,
+    version        REAL,
+    stride         TEXT,
+    has_weights    INTEGER,
+    vertex_count   INTEGER,
+    face_count     INTEGER,
+    bone_count     INTEGER,
+    clip_count     INTEGER,
+    max_influences INTEGER,
+    influences     TEXT,
+    error          TEXT
+);
+CREATE TABLE IF NOT EXISTS bones (
+    path       TEXT REFERENCES models(path) ON DELETE CASCADE,
+    bone_index INTEGER,
+    name       TEXT
+);
+CREATE TABLE IF NOT EXISTS clips (
+    path       TEXT REFERENCES models(path) ON DELETE CASCADE,
+    clip_index INTEGER,
+    name       TEXT,
+    duration   REAL,
+    keyframes  INTEGER
+);
+CREATE TABLE IF NOT EXISTS sections (
+    path   TEXT REFERENCES models(path) ON DELETE CASCADE,
+    name   TEXT,
+    offset INTEGER,
+    size   INTEGER,
+    sha1   TEXT
+);
+CREATE INDEX IF NOT EXISTS bones_name    ON bones(name);
+CREATE INDEX IF NOT EXISTS bones_path    ON bones(path);
+CREATE INDEX IF NOT EXISTS clips_name    ON clips(name);
+CREATE INDEX IF NOT EXISTS clips_path    ON clips(path);
+CREATE INDEX IF NOT EXISTS sections_path ON sections(path);
+CREATE INDEX IF NOT EXISTS sections_sha1 ON sections(sha1);
+"""
+
+# The comment line ZomboidExport writes at the start of each section.
+SECTION_MARKERS = (
+    ("vertex_buffer", b"# Vertex Count:"),
+    ("faces",         b"# Number of Faces:"),
+    ("skeleton",      b"# Number of Bones:"),
+    ("animations",    b"# Number of Animations:"),
+)
+
+
+#####################################################################################
+###                                                                               ###
+###   Probing                                                                     ###
+###                                                                               ###
+#####################################################################################
+
+def section_hashes(filepath):
+    """(name, offset, size, sha1) of the header and each section found by its marker comment."""
+    with io.open(filepath, 'rb') as file:
+        data = file.read()
+    starts = [("header", 0)]
+    for name, marker in SECTION_MARKERS:
+        offset = data.find(marker, starts[-1][1])
+        if offset >= 0:
+            starts.append((name, offset))
+    sections = []
+    for position, (name, offset) in enumerate(starts):
+        end = starts[position + 1][1] if position + 1 < len(starts) else len(data)
+        sections.append((name, offset, end - offset, hashlib.sha1(data[offset:end]).hexdigest()))
+    return sections
+
+
+def default_database():
+    """catalog.sqlite in a 'zomboid' folder under the user's cache folder."""
+    cache = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache, "zomboid", "catalog.sqlite")
+
+
+def catalog_entry(filepath, influences=False, hashes=False):
+    """
+    Probe result for one file, with bone weight counts and section hashes
+    when asked for; runs in the worker processes.
+    """
+    info = zomboid_probe.probe_file(filepath, influences=influences)
+    if "error" not in info and hashes:
+        try:
+            info["sections"] = section_hashes(filepath)
+        except OSError as error:
+            info["error"] = "%s: %s" % (type(error).__name__, error)
+    if "error" in info:
+        try:
+            stat = os.stat(filepath)
+            info["size"], info["mtime"] = stat.st_size, stat.st_mtime
+        except OSError:
+            info["size"], info["mtime"] = 0, 0.0
+    return info
+
+
+#####################################################################################
+###                                                                               ###
+###   Catalog                                                                     ###
+###                                                                               ###
+#####################################################################################
+
+class Catalog:
+    """
+    A SQLite database of probed models, keyed by absolute path. refresh()
+    brings one folder up to date; the query methods return rows as dicts.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_database()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            with self.connection:
+                for table in ("sections", "clips", "bones", "models"):
+                    self.connection.execute("DROP TABLE IF EXISTS " + table)
+                self.connection.executescript(SCHEMA)
+                self.connection.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def refresh(self, root, workers=None, influences=False, hashes=False):
+        """
+        Probes new and changed models under root and forgets removed ones.
+        With influences, skinned models without bone weight counts are
+        probed again and their weight rows counted; with hashes, models
+        without section hashes are hashed. Returns a dict with the added,
+        updated, removed and unchanged counts.
+        """
+        root  = os.path.abspath(root)
+        found = dict() # KEY: PATH, VALUE: (MTIME, SIZE)
+        for filepath in zomboid_probe.model_files([root]):
+            stat = os.stat(filepath)
+            found[filepath] = (stat.st_mtime, stat.st_size)
+
+        prefix = os.path.join(root, "")
+        known  = dict()
+        for row in self.connection.execute(
+                "SELECT path, mtime, size, error, has_weights AND max_influences IS NULL AS uncounted, "
+                "path NOT IN (SELECT path FROM sections) AS unhashed FROM models WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix)):
+            missing = row["error"] is None and ((influences and row["uncounted"]) or (hashes and row["unhashed"]))
+            known[row["path"]] = None if missing else (row["mtime"], row["size"])
+
+        changed = sorted(path for path, state in found.items() if known.get(path, False) != state)
+        removed = sorted(path for path in known if path not in found)
+        entries = self.probe(changed, workers, influences, hashes)
+
+        with self.connection:
+            for path in removed:
+                self.connection.execute("DELETE FROM models WHERE path = ?", (path,))
+            for info in entries:
+                self.store(info)
+        return {
+            "added"     : sum(1 for path in changed if path not in known),
+            "updated"   : sum(1 for path in changed if path in known),
+            "removed"   : len(removed),
+            "unchanged" : len(found) - len(changed),
+        }
+
+    def probe(self, files, workers=None, influences=False, hashes=False, chunksize=16):
+        if workers == 1 or len(files) < 2:
+            return [catalog_entry(filepath, influences, hashes) for filepath in files]
+        repeat = [[value] * len(files) for value in (influences, hashes)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(catalog_entry, files, *repeat, chunksize=chunksize))
+
+    def store(self, info):
+        path   = info["filepath"]
+        # Bone weight counts of a skinned model stay NULL until counted.
+        counts = info.get("influences") or None
+        if counts is None and "BlendWeightArray" in info.get("stride", []):
+            maximum = None
+        else:
+            maximum = info.get("max_influences")
+        self.connection.execute("DELETE FROM models WHERE path = ?", (path,))
+        self.connection.execute(
+            "INSERT INTO models VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, info["mtime"], info["size"], info.get("name"), info.get("version"),
+             ", ".join(info.get("stride", [])), int("BlendWeightArray" in info.get("stride", [])),
+             info.get("vertex_count"), info.get("face_count"), info.get("bone_count"),
+             len(info.get("clips", [])), maximum, json.dumps(counts) if counts else None,
+             info.get("error")))
+        self.connection.executemany("INSERT INTO bones VALUES (?, ?, ?)",
+            [(path, index, name) for index, name in enumerate(info.get("bone_names", []))])
+        self.connection.executemany("INSERT INTO clips VALUES (?, ?, ?, ?, ?)",
+            [(path, index, name, duration, keyframes) for index, (name, duration, keyframes) in enumerate(info.get("clips", []))])
+        self.connection.executemany("INSERT INTO sections VALUES (?, ?, ?, ?, ?)",
+            [(path,) + tuple(section) for section in info.get("sections", [])])
+
+    def models(self, bone=None, clip=None, skinned=None, min_faces=None, max_faces=None,
+               min_vertices=None, name=None, limit=None, min_influences=None):
+        """
+        Models matching every given filter. name is a SQL LIKE pattern;
+        min_influences keeps models with a vertex weighted to at least that
+        many bones, among those whose weights were counted.
+        """
+        where      = []
+        parameters = []
+        if bone is not None:
+            where.append("path IN (SELECT path FROM bones WHERE name = ?)")
+            parameters.append(bone)
+        if clip is not None:
+            where.append("path IN (SELECT path FROM clips WHERE name = ?)")
+            parameters.append(clip)
+        if skinned is not None:
+            where.append("has_weights = ?")
+            parameters.append(int(skinned))
+        for column, operator, value in (("face_count", ">=", min_faces), ("face_count", "<=", max_faces),
+                                        ("vertex_count", ">=", min_vertices), ("max_influences", ">=", min_influences)):
+            if value is not None:
+                where.append("%s %s ?" % (column, operator))
+                parameters.append(value)
+        if name is not None:
+            where.append("name LIKE ?")
+            parameters.append(name)
+        query = "SELECT * FROM models"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY path"
+        if limit is not None:
+            query += " LIMIT %d" % int(limit)
+        return self.sql(query, parameters)
+
+    def bones(self, path):
+        return [row["name"] for row in self.connection.execute("SELECT name FROM bones WHERE path = ? ORDER BY bone_index", (path,))]
+
+    def clips(self, path):
+        return self.sql("SELECT name, duration, keyframes FROM clips WHERE path = ? ORDER BY clip_index", (path,))
+
+    def duplicates(self, section="vertex_buffer"):
+        """Groups of models whose given section is byte for byte the same, among the hashed ones."""
+        groups = dict()
+        for row in self.connection.execute(
+                "SELECT sha1, path FROM sections WHERE name = ? AND sha1 IN "
+                "(SELECT sha1 FROM sections WHERE name = ? GROUP BY sha1 HAVING COUNT(*) > 1) ORDER BY sha1, path",
+                (section, section)):
+            groups.setdefault(row["sha1"], []).append(row["path"])
+        return list(groups.values())
+
+    def sql(self, query, parameters=()):
+        return [dict(row) for row in self.connection.execute(query, parameters)]
+
+
+#####################################################################################
+###                                                                               ###
+###   Main                                                                        ###
+###                                                                               ###
+#####################################################################################
+
+def print_rows(rows, as_json):
+    for row in rows:
+        if as_json:
+            print(json.dumps(row, sort_keys=True))
+        elif "path" in row and "face_count" in row:
+            print("%s: %s, %s vertices, %s faces, %s bones, %s clips" % (
+                row["path"], row["name"], row["vertex_count"], row["face_count"], row["bone_count"], row["clip_count"]))
+        else:
+            print(" | ".join(str(value) for value in row.values()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query a SQLite catalog of Zomboid models.")
+    parser.add_argument("--db", default=None, help="Catalog database file (default: %s)." % default_database())
+    commands = parser.add_subparsers(dest="command")
+
+    refresh = commands.add_parser("refresh", help="Probe new and changed models under a folder.")
+    refresh.add_argument("root")
+    refresh.add_argument("--workers", type=int, default=None)
+    refresh.add_argument("--influences", action="store_true", help="Count bone weights per vertex of skinned models without a sidecar (reads the weight rows).")
+    refresh.add_argument("--hashes",  action="store_true", help="Hash each section for 'duplicates' (reads every file whole).")
+
+    query = commands.add_parser("query", help="List models matching filters.")
+    query.add_argument("--bone",         default=None, help="Has a bone with this name.")
+    query.add_argument("--clip",         default=None, help="Has a clip with this name.")
+    query.add_argument("--skinned",      action="store_const", const=True,  default=None, help="Has bone weights.")
+    query.add_argument("--static",       action="store_const", const=False, dest="skinned", help="Has no bone weights.")
+    query.add_argument("--min-faces",    type=int, default=None)
+    query.add_argument("--max-faces",    type=int, default=None)
+    query.add_argument("--min-vertices", type=int, default=None)
+    query.add_argument("--min-influences", type=int, default=None, help="Has a vertex with at least this many bone weights (after refresh --influences).")
+    query.add_argument("--name",         default=None, help="SQL LIKE pattern on the model name.")
+    query.add_argument("--limit",        type=int, default=None)
+    query.add_argument("--json",         action="store_true")
+
+    duplicates = commands.add_parser("duplicates", help="Models sharing a byte-identical section (after refresh --hashes).")
+    duplicates.add_argument("--section", default="vertex_buffer", choices=["header"] + [name for name, marker in SECTION_MARKERS])
+
+    sql = commands.add_parser("sql", help="Run a SQL query against the catalog.")
+    sql.add_argument("query")
+    sql.add_argument("--json", action="store_true")
+
+    args = parser.parse_args(zomboid_common.script_args() if argv is None else argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+
+    with Catalog(args.db) as catalog:
+        if args.command == "refresh":
+            start  = time.perf_counter()
+            counts = catalog.refresh(args.root, args.workers, args.influences, args.hashes)
+            print("%(added)d added, %(updated)d updated, %(removed)d removed, %(unchanged)d unchanged" % counts
+                  + " in %.2f s" % (time.perf_counter() - start))
+        elif args.command == "query":
+            print_rows(catalog.models(args.bone, args.clip, args.skinned, args.min_faces, args.max_faces,
+                                      args.min_vertices, args.name, args.limit, args.min_influences), args.json)
+        elif args.command == "duplicates":
+            for group in catalog.duplicates(args.section):
+                print("\n".join(group) + "\n")
+        elif args.command == "sql":
+            print_rows(catalog.sql(args.query), args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# Shared helpers for the command line tools in this folder.
+#
+# The add-on package lives in a version folder ('2.8x') that is not on
+# sys.path, so the tools put that folder on sys.path and import the package
+# from it. Inside Blender the real bpy is used; outside of it the stand-ins
+# in tools/blender_shim are put on sys.path first, so parsing and formatting
+# code runs under plain CPython.
+
+import atexit, importlib, os, sys
+
+
+TOOLS_DIR  = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR   = os.path.dirname(TOOLS_DIR)
+ADDON_DIR  = os.path.join(REPO_DIR, "2.8x")
+SHIM_DIR   = os.path.join(TOOLS_DIR, "blender_shim")
+
+PACKAGE    = "io_scene_zomboid"
+IMPORTER   = "ZomboidImportNew"
+EXPORTER   = "ZomboidExportNew"
+
+_registered = set()
+
+
+def in_blender():
+    try:
+        import bpy
+    except ImportError:
+        return False
+    # The Blender binary, or Blender built as a Python module (pip install bpy).
+    return not os.path.abspath(getattr(bpy, "__file__", "") or "").startswith(SHIM_DIR)
+
+
+def use_shim():
+    """Makes bpy/mathutils importable outside Blender. Returns True if the shim is in use."""
+    try:
+        import bpy
+        return not in_blender()
+    except ImportError:
+        pass
+    if SHIM_DIR not in sys.path:
+        sys.path.insert(0, SHIM_DIR)
+    return True
+
+
+def load_addon(name=None, addon_dir=ADDON_DIR):
+    """Imports the add-on package from addon_dir, or its module name, and returns it."""
+    use_shim()
+    if addon_dir not in sys.path:
+        sys.path.insert(0, addon_dir)
+    return importlib.import_module(PACKAGE if name is None else PACKAGE + "." + name)
+
+
+def register_addons():
+    """Registers both operators with Blender so bpy.ops.zomboid.* can be called."""
+    if PACKAGE not in _registered:
+        load_addon().register()
+        _registered.add(PACKAGE)
+        import bpy
+        # Blender built as a Python module crashes on exit with classes still registered.
+        if not bpy.app.binary_path:
+            atexit.register(unregister_addons)
+
+
+def unregister_addons():
+    if PACKAGE in _registered:
+        load_addon().unregister()
+        _registered.discard(PACKAGE)
+
+
+def script_args(argv=None):
+    """Returns the arguments meant for the tool, also when run as 'blender -b -P tool.py -- args'."""
+    argv = sys.argv if argv is None else argv
+    if "--" in argv:
+        return argv[argv.index("--") + 1:]
+    return argv[1:]
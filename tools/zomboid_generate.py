@@ -0,0 +1,282 @@
+# Writes synthetic Project Zomboid model files (.txt) for benchmarks and tests.
+#
+# The layout follows exactly what ZomboidImport reads: read_header,
+# read_vertex_buffer, read_faces, read_skeleton and read_animations, with the
+# same '#' comment lines the exporter writes in between sections.
+#
+# Usage:
+#   python tools/zomboid_generate.py out.txt --vertices 5000 --bones 60 --clips 4
+
+import argparse, io, math, random
+
+
+DEFAULT_STRIDE = (
+    "VertexArray",
+    "NormalArray",
+    "TangentArray",
+    "TextureCoordArray",
+    "BlendWeightArray",
+    "BlendIndexArray",
+)
+
+STATIC_STRIDE = (
+    "VertexArray",
+    "NormalArray",
+    "TextureCoordArray",
+)
+
+# Byte offsets of each stride element, as written by ZomboidExport.
+STRIDE_SIZE = {
+    "VertexArray"       : 12,
+    "NormalArray"       : 12,
+    "TangentArray"      : 12,
+    "TextureCoordArray" : 8,
+    "BlendWeightArray"  : 16,
+    "BlendIndexArray"   : 0,
+}
+
+
+def generate_model(filepath, vertex_count=1000, face_count=None, stride=DEFAULT_STRIDE,
+                   bone_count=0, hierarchy_depth=4, clip_count=0, keyframes_per_clip=30,
+                   name=None, seed=0, max_influences=4, clip_names=None):
+    """
+    Writes a valid Zomboid model to filepath and returns a dict with the
+    counts that were actually written.
+
+    Vertices lie on a grid, faces triangulate that grid (extra faces beyond
+    the grid capacity are random triangles over existing vertices). Bones
+    form chains of at most hierarchy_depth levels below 'Bip01' and each
+    vertex is weighted to up to max_influences of them. Each clip holds
+    keyframes_per_clip poses, each keying every bone once; clips are named
+    from clip_names, then Clip00, Clip01, ...
+    """
+    rng          = random.Random(seed)
+    stride       = tuple(stride)
+    name         = name or "Synthetic_%d" % vertex_count
+    vertex_count = max(3, int(vertex_count))
+    columns      = max(2, int(math.ceil(math.sqrt(vertex_count))))
+    has_bones    = bone_count > 0 and "BlendIndexArray" in stride
+
+    if face_count is None:
+        face_count = grid_face_capacity(vertex_count, columns)
+
+    with io.open(filepath, 'w') as file:
+        out = file.write
+
+        # Header
+        out("# Project Zomboid Skinned Mesh\n")
+        out("# File Version:\n1.0\n")
+        out("# Model Name:\n%s\n" % name)
+        out("# Vertex Stride Element Count:\n%d\n" % len(stride))
+        out("# Vertex Stride Size (in bytes):\n76\n")
+        out("# Vertex Stride Data:\n# (Int)    Offset\n# (String) Type\n")
+        offset = 0
+        for element in stride:
+            out("%d\n%s\n" % (offset, element))
+            offset += STRIDE_SIZE.get(element, 0)
+
+        # Vertex Buffer
+        out("# Vertex Count:\n%d\n" % vertex_count)
+        out("# Vertex Buffer:\n")
+        lines = []
+        for index in range(vertex_count):
+            row, column = divmod(index, columns)
+            x = column * 0.01
+            y = row    * 0.01
+            z = math.sin(x * 7.0) * math.cos(y * 5.0) * 0.05
+            # Slopes of z, for the exact normal and the tangent along +u (= +x).
+            dx = math.cos(x * 7.0) * math.cos(y * 5.0) * 0.35
+            dy = -math.sin(x * 7.0) * math.sin(y * 5.0) * 0.25
+            n  = math.sqrt(dx * dx + dy * dy + 1.0)
+            t  = math.sqrt(dx * dx + 1.0)
+            weights, indexes = influences(rng, bone_count if has_bones else 1, max_influences)
+            for element in stride:
+                if element == "VertexArray":
+                    lines.append("%.6f, %.6f, %.6f" % (x, y, z))
+                elif element == "NormalArray":
+                    lines.append("%.6f, %.6f, %.6f" % (-dx / n, -dy / n, 1.0 / n))
+                elif element == "TangentArray":
+                    lines.append("%.6f, %.6f, %.6f" % (1.0 / t, 0.0, dx / t))
+                elif element == "TextureCoordArray":
+                    lines.append("%.6f, %.6f" % (column / float(columns), row / float(columns)))
+                elif element == "BlendWeightArray":
+                    lines.append(weights)
+                elif element == "BlendIndexArray":
+                    lines.append(indexes)
+                else:
+                    lines.append("0.0, 0.0, 0.0")
+        out("\n".join(lines))
+        out("\n")
+
+        # Faces
+        out("# Number of Faces:\n%d\n" % face_count)
+        out("# Face Data:\n")
+        lines = []
+        for face in grid_faces(vertex_count, columns):
+            if len(lines) == face_count:
+                break
+            lines.append("%d, %d, %d" % face)
+        while len(lines) < face_count:
+            lines.append("%d, %d, %d" % tuple(rng.sample(range(vertex_count), 3)))
+        out("\n".join(lines))
+        out("\n")
+
+        if bone_count <= 0:
+            return summary(name, vertex_count, face_count, 0, 0, 0)
+
+        # Skeleton
+        parents   = bone_parents(bone_count, hierarchy_depth)
+        names     = ["Bip01"] + ["Bip01_Bone%03d" % index for index in range(1, bone_count)]
+        positions = [(rng.uniform(-0.5, 0.5), rng.uniform(-0.5, 0.5), rng.uniform(0.0, 1.8)) for index in range(bone_count)]
+        angles    = [rng.uniform(-math.pi, math.pi) for index in range(bone_count)]
+
+        out("# Number of Bones:\n%d\n" % bone_count)
+        out("# Skeleton Hierarchy:\n")
+        for index in range(bone_count):
+            out("%d\n%d\n%s\n" % (index, parents[index], names[index]))
+
+        out("# Bind Pose:\n")
+        for index in range(bone_count):
+            out("%d\n%s\n" % (index, format_matrix(rest_matrix(positions[index], angles[index]))))
+        out("# Inv Bind Pose:\n")
+        for index in range(bone_count):
+            out("%d\n%s\n" % (index, format_matrix(offset_matrix(positions[index], angles[index]))))
+        out("# Skin Offset Matrices:\n")
+        for index in range(bone_count):
+            out("%d\n%s\n" % (index, format_matrix(offset_matrix(positions[index], angles[index]))))
+
+        # Animations
+        clip_names = list(clip_names or [])[:clip_count]
+        clip_names += ["Clip%02d" % clip for clip in range(len(clip_names), clip_count)]
+        out("# Number of Animations:\n%d\n" % clip_count)
+        for clip in range(clip_count):
+            frames = max(1, int(keyframes_per_clip))
+            out("# Animation Name:\n%s\n" % clip_names[clip])
+            out("# Animation Duration:\n%.6f\n" % (frames / 30.0))
+            out("# Keyframe Count:\n%d\n" % (frames * bone_count))
+            lines = []
+            for frame in range(frames):
+                time = frame / 30.0
+                for index in range(bone_count):
+                    angle = math.sin(frame * 0.2 + index) * 0.5
+                    lines.append("%d\n%s\n%.6f\n%.6f, %.6f, %.6f\n%.6f, %.6f, %.6f, %.6f" % (
+                        index, names[index], time,
+                        positions[index][0] * 0.1, positions[index][1] * 0.1, positions[index][2] * 0.1,
+                        0.0, 0.0, math.sin(angle / 2.0), math.cos(angle / 2.0)))
+            out("\n".join(lines))
+            out("\n")
+
+    return summary(name, vertex_count, face_count, bone_count, clip_count, clip_count * max(1, int(keyframes_per_clip)) * bone_count)
+
+
+def summary(name, vertex_count, face_count, bone_count, clip_count, keyframe_count):
+    return {
+        "name"      : name,
+        "vertices"  : vertex_count,
+        "faces"     : face_count,
+        "bones"     : bone_count,
+        "clips"     : clip_count,
+        "keyframes" : keyframe_count,
+    }
+
+
+def grid_face_capacity(vertex_count, columns):
+    return sum(1 for face in grid_faces(vertex_count, columns))
+
+
+def grid_faces(vertex_count, columns):
+    rows = int(math.ceil(vertex_count / float(columns)))
+    for row in range(rows - 1):
+        for column in range(columns - 1):
+            a = row * columns + column
+            b = a + 1
+            c = a + columns
+            d = c + 1
+            if d < vertex_count:
+                yield (a, b, c)
+                yield (b, d, c)
+
+
+def bone_parents(bone_count, hierarchy_depth):
+    # Chains hang off the root and restart once they reach hierarchy_depth levels.
+    hierarchy_depth = max(2, int(hierarchy_depth))
+    parents = [-1]
+    depth   = [0]
+    for index in range(1, bone_count):
+        if depth[index - 1] + 1 < hierarchy_depth:
+            parent = index - 1
+        else:
+            parent = 0
+        parents.append(parent)
+        depth.append(depth[parent] + 1)
+    return parents
+
+
+def influences(rng, bone_count, max_influences=4):
+    # Up to max_influences distinct bones per vertex, padded to four slots the
+    # way ZomboidExport pads them.
+    count   = min(max_influences, bone_count)
+    bones   = rng.sample(range(bone_count), count)
+    weights = [rng.random() + 0.01 for i in range(count)]
+    total   = sum(weights)
+    weights = ["%.6f" % (weight / total) for weight in weights] + ["-1.0"] * (4 - count)
+    indexes = [str(bone) for bone in bones] + ["0"] * (4 - count)
+    return ", ".join(weights), ", ".join(indexes)
+
+
+def rest_matrix(position, angle):
+    c = math.cos(angle)
+    s = math.sin(angle)
+    return (( c,  -s, 0.0, position[0]),
+            ( s,   c, 0.0, position[1]),
+            (0.0, 0.0, 1.0, position[2]),
+            (0.0, 0.0, 0.0, 1.0))
+
+
+def offset_matrix(position, angle):
+    # Inverse of rest_matrix: transposed rotation, rotated and negated translation.
+    c = math.cos(angle)
+    s = math.sin(angle)
+    x, y, z = position
+    return (( c,   s, 0.0, -( c * x + s * y)),
+            (-s,   c, 0.0, -(-s * x + c * y)),
+            (0.0, 0.0, 1.0, -z),
+            (0.0, 0.0, 0.0, 1.0))
+
+
+def format_matrix(matrix):
+    # Rows are m00..m03, m10..m13, ... in the order read_matrix parses them.
+    return "\n".join(", ".join("%.6f" % value for value in row) for row in matrix)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic Zomboid model file.")
+    parser.add_argument("filepath")
+    parser.add_argument("--vertices",  type=int, default=1000)
+    parser.add_argument("--faces",     type=int, default=None)
+    parser.add_argument("--bones",     type=int, default=0)
+    parser.add_argument("--depth",     type=int, default=4,  help="Maximum bone hierarchy depth.")
+    parser.add_argument("--clips",     type=int, default=0)
+    parser.add_argument("--keyframes", type=int, default=30, help="Poses per clip; each keys every bone.")
+    parser.add_argument("--influences", type=int, default=4, help="Most bone weights per vertex.")
+    parser.add_argument("--static",    action="store_true",  help="Write a stride without tangents and weights.")
+    parser.add_argument("--seed",      type=int, default=0)
+    args = parser.parse_args(argv)
+
+    result = generate_model(
+        args.filepath,
+        vertex_count       = args.vertices,
+        face_count         = args.faces,
+        stride             = STATIC_STRIDE if args.static else DEFAULT_STRIDE,
+        bone_count         = args.bones,
+        hierarchy_depth    = args.depth,
+        clip_count         = args.clips,
+        keyframes_per_clip = args.keyframes,
+        seed               = args.seed,
+        max_influences     = args.influences,
+    )
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
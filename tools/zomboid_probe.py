@@ -0,0 +1,87 @@
+# Header-only metadata for Zomboid model files.
+#
+# Prints name, stride, vertex/face/bone counts and clip names per model using
+# ZomboidImport's probe_model(), which skips vertex, face, matrix and
+# keyframe blocks by their declared counts (or reads an up to date .idx
+# sidecar) instead of importing. Folders are scanned recursively and the
+# files spread over a process pool.
+#
+# Usage:
+#   python tools/zomboid_probe.py path/to/models --json > models.jsonl
+#   python tools/zomboid_probe.py model.txt other.txt
+
+import argparse, glob, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import zomboid_common
+
+
+# Written next to models by the add-ons, not models themselves.
+SKIPPED_SUFFIXES = (".profile.txt",)
+
+
+def model_files(paths):
+    """Expands folders (recursively) into the .txt models below them."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = glob.glob(os.path.join(path, "**", "*.txt"), recursive=True)
+        else:
+            found = [path]
+        files.extend(sorted(name for name in found if not name.endswith(SKIPPED_SUFFIXES)))
+    return files
+
+
+def probe_file(filepath, use_index=True, strict=False, influences=False):
+    """probe_model() as a dict; failures are reported in 'error' instead of raised."""
+    importer = zomboid_common.load_addon(zomboid_common.IMPORTER)
+    try:
+        return importer.probe_model(filepath, use_index, strict, influences).to_dict()
+    except Exception as error:
+        return {"filepath": filepath, "error": "%s: %s" % (type(error).__name__, error)}
+
+
+def probe_files(files, workers=None, use_index=True, strict=False, influences=False, chunksize=16):
+    """Probes files in a process pool (in this process for workers=1), keeping their order."""
+    if workers == 1 or len(files) < 2:
+        return [probe_file(filepath, use_index, strict, influences) for filepath in files]
+    repeat = [[value] * len(files) for value in (use_index, strict, influences)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(probe_file, files, *repeat, chunksize=chunksize))
+
+
+def describe(info):
+    if "error" in info:
+        return "%s: %s" % (info["filepath"], info["error"])
+    clips = ", ".join(clip[0] for clip in info["clips"])
+    weights = ", up to %d weights per vertex" % info["max_influences"] if info["influences"] else ""
+    return "%s: %s, %d vertices, %d faces, %d bones%s, %d clips%s%s" % (
+        info["filepath"], info["name"], info["vertex_count"], info["face_count"], info["bone_count"], weights,
+        len(info["clips"]), " (" + clips + ")" if clips else "", " [index]" if info["from_index"] else "")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print metadata of Zomboid models without importing them.")
+    parser.add_argument("paths",      nargs="+", help="Model files or folders to scan.")
+    parser.add_argument("--workers",  type=int, default=None, help="Processes to use (default: one per CPU).")
+    parser.add_argument("--no-index", action="store_true", help="Ignore .idx sidecars and always scan the files.")
+    parser.add_argument("--strict",   action="store_true", help="Check the SHA-1 of models with a sidecar even when size and mtime match.")
+    parser.add_argument("--influences", action="store_true", help="Count bone weights per vertex (reads the weight rows without a sidecar).")
+    parser.add_argument("--json",     action="store_true", help="Print one JSON object per model.")
+    args = parser.parse_args(zomboid_common.script_args() if argv is None else argv)
+
+    start  = time.perf_counter()
+    files  = model_files(args.paths)
+    infos  = probe_files(files, args.workers, not args.no_index, args.strict, args.influences)
+    errors = 0
+    for info in infos:
+        errors += "error" in info
+        print(json.dumps(info, sort_keys=True) if args.json else describe(info))
+    print("%d models probed in %.2f s, %d failed" % (len(infos), time.perf_counter() - start, errors), file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,545 @@
+# Round-trip fidelity and performance regression harness.
+#
+# Every model of the corpus is imported with ZomboidImport, exported again
+# with ZomboidExport and re-imported. The exported file is compared against
+# the original, and the re-imported scene against the exported file, within
+# tolerances: every stride element and the bone weights corner by corner,
+# the bone hierarchy and matrices, and the clips frame by frame. Each
+# operator stage is timed and its peak Python memory recorded. Results are
+# checked against the baseline in tools/roundtrip_baseline.json; the run
+# fails when a model loses fidelity, has no baseline timings, or any stage
+# regresses by more than --max-regression percent.
+#
+# Needs Blender, run headless:
+#   blender -b --factory-startup -P tools/zomboid_roundtrip.py -- --corpus path/to/models
+#   blender -b --factory-startup -P tools/zomboid_roundtrip.py -- --update-baseline
+# The generated fixtures' fingerprints in the baseline are refreshed without
+# Blender:
+#   python tools/zomboid_roundtrip.py --update-fixtures
+
+import argparse, glob, hashlib, io, json, os, sys, tempfile, time, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import zomboid_common
+import zomboid_generate
+
+
+DEFAULT_BASELINE = os.path.join(zomboid_common.TOOLS_DIR, "roundtrip_baseline.json")
+
+# Generated part of the corpus: name -> generate_model() parameters.
+GENERATED_CORPUS = {
+    "static_small"   : dict(vertex_count=500,   stride=zomboid_generate.STATIC_STRIDE),
+    "static_large"   : dict(vertex_count=20000, stride=zomboid_generate.STATIC_STRIDE),
+    "skinned_medium" : dict(vertex_count=5000,  bone_count=60, hierarchy_depth=8),
+    "animated_small" : dict(vertex_count=1000,  bone_count=30, hierarchy_depth=6, clip_count=2, keyframes_per_clip=20,
+                            clip_names=("Run", "Walk")),
+}
+
+
+#####################################################################################
+###                                                                               ###
+###   Reference reader                                                            ###
+###                                                                               ###
+#####################################################################################
+
+# A deliberately independent reader, so a bug in the importer's parser cannot
+# hide the same bug in the comparison.
+
+# Only clips with these names are built by ZomboidImport (create_animations),
+# so only they can come back from a round trip.
+IMPORTED_CLIPS = ("Run",)
+
+MATRIX_BLOCKS = ("bind_pose", "inverse_bind_pose", "skin_offsets")
+
+
+def read_lines(filepath):
+    with io.open(filepath, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line.startswith("#"):
+                yield line
+
+
+def read_floats(line):
+    return [float(value) for value in line.split(",")]
+
+
+def read_reference(filepath):
+    """
+    Everything in a model file: stride elements per vertex, faces, the bone
+    hierarchy, its three matrix blocks and the clips. A clip has a name,
+    duration and a list of frames, each a dict of bone name -> (time,
+    location, rotation), split where the bone index goes down.
+    """
+    lines  = read_lines(filepath)
+    take   = lambda: next(lines)
+    model  = {"stride": [], "elements": dict(), "faces": [], "bones": [], "matrices": dict(), "clips": []}
+
+    take()                                  # Version
+    model["name"] = take()
+    element_count = int(take())
+    take()                                  # Stride size
+    for index in range(element_count):
+        take()                              # Offset
+        model["stride"].append(take())
+    for element in model["stride"]:
+        model["elements"][element] = []
+
+    vertex_count = int(take())
+    for index in range(vertex_count):
+        for element in model["stride"]:
+            model["elements"][element].append(read_floats(take()))
+
+    face_count = int(take())
+    for index in range(face_count):
+        model["faces"].append([int(value) for value in take().split(", ")])
+
+    try:
+        bone_count = int(take())
+    except (StopIteration, ValueError):
+        return model
+    for index in range(bone_count):
+        model["bones"].append((int(take()), int(take()), take()))
+    for block in MATRIX_BLOCKS:
+        matrices = []
+        for index in range(bone_count):
+            take()                          # Bone index
+            matrices.append([read_floats(take()) for row in range(4)])
+        model["matrices"][block] = matrices
+
+    try:
+        clip_count = int(take())
+    except (StopIteration, ValueError):
+        return model
+    for index in range(clip_count):
+        clip   = {"name": take(), "duration": float(take()), "frames": []}
+        last   = None
+        for keyframe in range(int(take())):
+            bone_index = int(take())
+            if last is None or bone_index < last:
+                clip["frames"].append(dict())
+            last = bone_index
+            name = take()
+            clip["frames"][-1][name] = (float(take()), read_floats(take()), read_floats(take()))
+        model["clips"].append(clip)
+    return model
+
+
+#####################################################################################
+###                                                                               ###
+###   Comparison                                                                  ###
+###                                                                               ###
+#####################################################################################
+
+def corner_weights(model, vertex):
+    weights = model["elements"].get("BlendWeightArray")
+    indexes = model["elements"].get("BlendIndexArray")
+    if weights is None or indexes is None:
+        return dict()
+    result = dict()
+    for weight, index in zip(weights[vertex], indexes[vertex]):
+        if weight > 0.0:
+            result[int(index)] = result.get(int(index), 0.0) + weight
+    return result
+
+
+def difference(a, b):
+    return max(abs(x - y) for x, y in zip(a, b)) if len(a) == len(b) else float("inf")
+
+
+# Stride element -> (label, tolerance key) of the per-corner checks.
+CORNER_CHECKS = (
+    ("VertexArray",       "position", "position"),
+    ("NormalArray",       "normal",   "normal"),
+    ("TangentArray",      "tangent",  "tangent"),
+    ("TextureCoordArray", "uv",       "uv"),
+)
+
+
+def compare_models(original, exported, tolerances, clips=None):
+    """
+    Returns a list of human readable mismatches (empty when the models
+    agree): every stride element and the bone weights corner by corner, the
+    bone hierarchy and matrices, and the clips named in clips (default: all
+    of the original's) frame by frame. Parts missing from exported (a
+    re-imported scene has no matrix blocks, for one) are only compared
+    when the original has them too.
+    """
+    problems = []
+    def report(problem):
+        problems.append(problem)
+        return len(problems) >= 20
+    
+    if len(original["faces"]) != len(exported["faces"]):
+        return ["face count %d != %d" % (len(original["faces"]), len(exported["faces"]))]
+    for element in original["stride"]:
+        if element not in exported["stride"]:
+            problems.append("%s is missing" % element)
+
+    checks = [(element, label, tolerances[key]) for element, label, key in CORNER_CHECKS
+              if element in original["elements"] and element in exported["elements"]]
+    for face_index, (face_a, face_b) in enumerate(zip(original["faces"], exported["faces"])):
+        for corner, (a, b) in enumerate(zip(face_a, face_b)):
+            for element, label, tolerance in checks:
+                value_a = original["elements"][element][a]
+                value_b = exported["elements"][element][b]
+                if difference(value_a, value_b) > tolerance:
+                    if report("face %d corner %d %s %s != %s" % (face_index, corner, label, value_a, value_b)):
+                        return problems + ["..."]
+
+            weights_a = corner_weights(original, a)
+            weights_b = corner_weights(exported, b)
+            if set(weights_a) != set(weights_b):
+                if report("face %d corner %d bone ids %s != %s" % (face_index, corner, sorted(weights_a), sorted(weights_b))):
+                    return problems + ["..."]
+            elif any(abs(weights_a[bone] - weights_b[bone]) > tolerances["weight"] for bone in weights_a):
+                if report("face %d corner %d weights %s != %s" % (face_index, corner, weights_a, weights_b)):
+                    return problems + ["..."]
+
+    problems += compare_skeletons(original, exported, tolerances)
+    problems += compare_clips(original, exported, tolerances, clips)
+    return problems
+
+
+def compare_skeletons(original, exported, tolerances):
+    if original["bones"] != exported["bones"]:
+        return ["bones (index, parent, name) %s != %s" % (original["bones"][:5], exported["bones"][:5])]
+    problems = []
+    for block in MATRIX_BLOCKS:
+        if block not in original["matrices"] or block not in exported["matrices"]:
+            continue
+        for (index, parent, name), a, b in zip(original["bones"], original["matrices"][block], exported["matrices"][block]):
+            if max(difference(row_a, row_b) for row_a, row_b in zip(a, b)) > tolerances["matrix"]:
+                problems.append("%s of %s %s != %s" % (block, name, a, b))
+                break
+    return problems
+
+
+def compare_clips(original, exported, tolerances, names=None):
+    wanted   = [clip for clip in original["clips"] if names is None or clip["name"] in names]
+    clips    = dict((clip["name"], clip) for clip in exported["clips"])
+    problems = []
+    if sorted(clip["name"] for clip in wanted) != sorted(clips):
+        return ["clips %s != %s" % (sorted(clip["name"] for clip in wanted), sorted(clips))]
+    for clip_a in wanted:
+        clip_b = clips[clip_a["name"]]
+        if abs(clip_a["duration"] - clip_b["duration"]) > tolerances["time"]:
+            problems.append("clip %s duration %s != %s" % (clip_a["name"], clip_a["duration"], clip_b["duration"]))
+        if len(clip_a["frames"]) != len(clip_b["frames"]):
+            problems.append("clip %s has %d frames, not %d" % (clip_a["name"], len(clip_b["frames"]), len(clip_a["frames"])))
+            continue
+        for frame_index, (frame_a, frame_b) in enumerate(zip(clip_a["frames"], clip_b["frames"])):
+            problem = compare_frame(frame_a, frame_b, tolerances)
+            if problem:
+                problems.append("clip %s frame %d %s" % (clip_a["name"], frame_index, problem))
+                break
+    return problems
+
+
+def compare_frame(frame_a, frame_b, tolerances):
+    # Frames read back from a scene have times but no poses (None).
+    for name, (time, location, rotation) in frame_a.items():
+        if name not in frame_b:
+            return "has no key for %s" % name
+        other_time, other_location, other_rotation = frame_b[name]
+        if abs(time - other_time) > tolerances["time"]:
+            return "%s time %s != %s" % (name, time, other_time)
+        if other_location is None:
+            continue
+        if difference(location, other_location) > tolerances["pose"]:
+            return "%s location %s != %s" % (name, location, other_location)
+        # q and -q are the same rotation.
+        if min(difference(rotation, other_rotation), difference(rotation, [-value for value in other_rotation])) > tolerances["pose"]:
+            return "%s rotation %s != %s" % (name, rotation, other_rotation)
+    return None
+
+
+#####################################################################################
+###                                                                               ###
+###   Blender stages                                                              ###
+###                                                                               ###
+#####################################################################################
+
+def clear_scene():
+    import bpy
+    for collection in (bpy.data.objects, bpy.data.meshes, bpy.data.armatures, bpy.data.actions):
+        for block in list(collection):
+            collection.remove(block)
+
+
+def measured(call, stats_path):
+    """Runs an operator call under tracemalloc; returns its stage report plus peak bytes."""
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    with io.open(stats_path + ".stats.json", 'r') as file:
+        report = json.load(file)
+    report["peak_bytes"] = peak
+    return report
+
+
+def select_only(object):
+    import bpy
+    for other in bpy.context.scene.objects:
+        other.select_set(False)
+    object.select_set(True)
+    bpy.context.view_layer.objects.active = object
+
+
+def round_trip(model_path, export_path):
+    """
+    Import, export and re-import one model. Returns (reports, problems,
+    scene), scene being the re-imported data as scene_model() reads it.
+    """
+    import bpy
+    problems = []
+    reports  = []
+    # optimize_model would merge vertices and make quads, so faces no longer line up.
+    options  = dict(write_stats=True, optimize_model=False, unique_mesh=True)
+
+    clear_scene()
+    reports.append(("import", measured(lambda: bpy.ops.zomboid.import_model(filepath=model_path, **options), model_path)))
+    meshes = [object for object in bpy.context.scene.objects if object.type == 'MESH']
+    if not meshes:
+        return reports, ["import produced no mesh"], None
+
+    select_only(meshes[0])
+    reports.append(("export", measured(lambda: bpy.ops.zomboid.export_model(filepath=export_path, write_stats=True), export_path)))
+
+    clear_scene()
+    reports.append(("reimport", measured(lambda: bpy.ops.zomboid.import_model(filepath=export_path, **options), export_path)))
+    meshes = [object for object in bpy.context.scene.objects if object.type == 'MESH']
+    if not meshes:
+        return reports, ["re-import produced no mesh"], None
+
+    return reports, problems, scene_model(meshes[0])
+
+
+def scene_model(object):
+    """
+    A mesh object, its armature and the actions in read_reference()'s
+    layout: per-vertex position, normal, tangent, UV (flipped back to the
+    file's v) and weights, the bone hierarchy and stored matrices, and clip
+    timing. Clip poses are not sampled here; they are compared on the
+    exported file.
+    """
+    import bpy
+    mesh     = object.data
+    elements = dict()
+    model    = {"name": object.name, "stride": [], "elements": elements, "bones": [], "matrices": dict(), "clips": [],
+                "faces": [list(polygon.vertices) for polygon in mesh.polygons]}
+
+    elements["VertexArray"] = [list(vertex.co) for vertex in mesh.vertices]
+    elements["NormalArray"] = [list(vertex.normal) for vertex in mesh.vertices]
+    if mesh.uv_layers:
+        # calc_tangents can reallocate the UV data, so the layer is looked up after it.
+        mesh.calc_tangents(uvmap=mesh.uv_layers[-1].name)
+        layer    = mesh.uv_layers[-1]
+        uvs      = [[0.0, 0.0] for vertex in mesh.vertices]
+        tangents = [[0.0, 0.0, 0.0] for vertex in mesh.vertices]
+        for loop in mesh.loops:
+            uv = layer.data[loop.index].uv
+            uvs[loop.vertex_index]      = [uv[0], 1.0 - uv[1]]
+            tangents[loop.vertex_index] = list(loop.tangent)
+        elements["TextureCoordArray"] = uvs
+        elements["TangentArray"]      = tangents
+
+    armature = object.parent if object.parent is not None and object.parent.type == 'ARMATURE' else None
+    if armature is not None:
+        ids    = armature["ZOMBOID_BONE_IDS"].to_dict()
+        groups = dict((group.index, ids.get(group.name)) for group in object.vertex_groups)
+        weights, indexes = [], []
+        for vertex in mesh.vertices:
+            used = [(groups[element.group], element.weight) for element in vertex.groups if groups.get(element.group) is not None]
+            indexes.append([bone_id for bone_id, weight in used])
+            weights.append([weight for bone_id, weight in used])
+        elements["BlendWeightArray"] = weights
+        elements["BlendIndexArray"]  = indexes
+
+        bones = armature.data.bones
+        model["bones"] = sorted((ids[bone.name], ids[bone.parent.name] if bone.parent else -1, bone.name) for bone in bones)
+        for block, key in (("bind_pose", "ZOMBOID_BIND_POSE"), ("skin_offsets", "ZOMBOID_SKIN_OFFSETS")):
+            values = list(armature[key])
+            model["matrices"][block] = [[values[start + row * 4:start + row * 4 + 4] for row in range(4)]
+                                        for start in range(0, len(values), 16)]
+        for action in sorted(bpy.data.actions, key=lambda action: action.name):
+            times = list(action.get("ZOMBOID_FRAME_TIMES", []))
+            model["clips"].append({"name": action.name, "duration": action.get("ZOMBOID_DURATION", 0.0),
+                                   "frames": [dict((bone.name, (time, None, None)) for bone in bones) for time in times]})
+    model["stride"] = list(elements)
+    return model
+
+
+#####################################################################################
+###                                                                               ###
+###   Baselines                                                                   ###
+###                                                                               ###
+#####################################################################################
+
+def flatten(reports):
+    """(pass, report) pairs -> {'import/read_faces': seconds, ..., 'import/peak_bytes': bytes}."""
+    metrics = dict()
+    for name, report in reports:
+        for stage in report["stages"]:
+            metrics["%s/%s" % (name, stage["name"])] = stage["seconds"]
+        metrics["%s/peak_bytes" % name] = report["peak_bytes"]
+    return metrics
+
+
+def best_of(runs):
+    best = dict()
+    for metrics in runs:
+        for key, value in metrics.items():
+            best[key] = min(value, best.get(key, value))
+    return best
+
+
+def fixture(path, counts):
+    """Fingerprint of a generated model, stored next to its baseline timings."""
+    with io.open(path, 'rb') as file:
+        counts = dict(counts, sha1=hashlib.sha1(file.read()).hexdigest())
+    return counts
+
+
+def regressions(current, baseline, max_regression, min_seconds):
+    found = []
+    for key, value in sorted(current.items()):
+        if key not in baseline:
+            continue
+        reference = baseline[key]
+        limit     = reference * (1.0 + max_regression / 100.0)
+        if key.endswith("peak_bytes"):
+            if value > limit:
+                found.append("%s %d -> %d bytes" % (key, reference, value))
+        elif value > limit and value - reference > min_seconds:
+            found.append("%s %.4f -> %.4f s (+%.0f%%)" % (key, reference, value, (value / reference - 1.0) * 100.0))
+    return found
+
+
+#####################################################################################
+###                                                                               ###
+###   Main                                                                        ###
+###                                                                               ###
+#####################################################################################
+
+def build_corpus(args, workdir):
+    """(name, path, fixture) per model; fixture is None for real models."""
+    corpus = []
+    if not args.no_generated:
+        for name, parameters in sorted(GENERATED_CORPUS.items()):
+            path = os.path.join(workdir, name + ".txt")
+            counts = zomboid_generate.generate_model(path, name=name, **parameters)
+            corpus.append((name, path, fixture(path, counts)))
+    for directory in args.corpus:
+        for path in sorted(glob.glob(os.path.join(directory, "**", "*.txt"), recursive=True)):
+            corpus.append((os.path.relpath(path, directory), path, None))
+    return corpus
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return dict()
+    with io.open(path, 'r') as file:
+        return json.load(file)
+
+
+def save_baseline(path, baseline):
+    with io.open(path, 'w') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write("\n")
+    print("Baseline written to " + path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round-trip Zomboid models and check fidelity and stage timings.")
+    parser.add_argument("--corpus",         action="append", default=[], help="Folder of real .txt models (repeatable).")
+    parser.add_argument("--no-generated",   action="store_true", help="Skip the generated part of the corpus.")
+    parser.add_argument("--baseline",       default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--update-fixtures", action="store_true",
+                        help="Only store the generated fixtures' fingerprints in the baseline (no Blender needed).")
+    parser.add_argument("--max-regression", type=float, default=25.0, help="Allowed slowdown per stage, in percent.")
+    parser.add_argument("--min-seconds",    type=float, default=0.005, help="Ignore regressions smaller than this.")
+    parser.add_argument("--repeat",         type=int,   default=3,     help="Timings keep the best of N runs.")
+    parser.add_argument("--position-tolerance", type=float, default=1e-5)
+    parser.add_argument("--normal-tolerance",   type=float, default=0.02, help="Blender recomputes normals from the faces.")
+    parser.add_argument("--tangent-tolerance",  type=float, default=0.05, help="Blender recomputes tangents (MikkTSpace).")
+    parser.add_argument("--uv-tolerance",       type=float, default=1e-5)
+    parser.add_argument("--weight-tolerance",   type=float, default=1e-5)
+    parser.add_argument("--matrix-tolerance",   type=float, default=1e-5)
+    parser.add_argument("--pose-tolerance",     type=float, default=1e-4)
+    parser.add_argument("--time-tolerance",     type=float, default=1e-5)
+    parser.add_argument("--workdir",        default=None)
+    args = parser.parse_args(zomboid_common.script_args() if argv is None else argv)
+
+    workdir  = args.workdir or tempfile.mkdtemp(prefix="zomboid_roundtrip_")
+    os.makedirs(workdir, exist_ok=True)
+    baseline = load_baseline(args.baseline)
+    if args.update_fixtures:
+        for name, path, generated in build_corpus(argparse.Namespace(no_generated=False, corpus=[]), workdir):
+            baseline.setdefault(name, dict())["fixture"] = generated
+            baseline[name].setdefault("metrics", dict())
+        save_baseline(args.baseline, baseline)
+        return 0
+
+    if not zomboid_common.in_blender():
+        print("The round-trip harness needs Blender: blender -b -P tools/zomboid_roundtrip.py -- ...")
+        return 2
+    zomboid_common.register_addons()
+    import bpy
+
+    tolerances = {"position": args.position_tolerance, "normal": args.normal_tolerance, "tangent": args.tangent_tolerance,
+                  "uv": args.uv_tolerance, "weight": args.weight_tolerance, "matrix": args.matrix_tolerance,
+                  "pose": args.pose_tolerance, "time": args.time_tolerance}
+
+    results  = dict()
+    failures = 0
+    for name, path, generated in build_corpus(args, workdir):
+        export_path = os.path.join(workdir, name.replace(os.sep, "_") + ".roundtrip.txt")
+        runs        = []
+        problems    = []
+        for repeat in range(max(1, args.repeat)):
+            reports, problems, scene = round_trip(path, export_path)
+            runs.append(flatten(reports))
+            if problems:
+                break
+        if not problems:
+            exported  = read_reference(export_path)
+            problems  = ["exported: " + problem for problem in compare_models(read_reference(path), exported, tolerances, IMPORTED_CLIPS)]
+            problems += ["re-imported: " + problem for problem in compare_models(exported, scene, tolerances)]
+
+        results[name] = {"fixture": generated, "blender": bpy.app.version_string, "metrics": best_of(runs)}
+        stored        = baseline.get(name, dict())
+        notes         = []
+        if generated is not None and stored.get("fixture") not in (None, generated):
+            notes.append("the generated model differs from the baseline's, timings may not compare")
+        if stored.get("blender") not in (None, bpy.app.version_string):
+            notes.append("the baseline was recorded with Blender %s, timings may not compare" % stored["blender"])
+        if not stored.get("metrics") and not args.update_baseline:
+            problems.append("no baseline timings, record them with --update-baseline")
+        slower = regressions(results[name]["metrics"], stored.get("metrics", dict()), args.max_regression, args.min_seconds)
+
+        status = "ok"
+        if problems or (slower and not args.update_baseline):
+            status    = "FAIL"
+            failures += 1
+        print("%-4s %s" % (status, name))
+        for problem in problems:
+            print("     fidelity: " + problem)
+        for regression in slower:
+            print("     slower:   " + regression)
+        for note in notes:
+            print("     note:     " + note)
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())